@@ -0,0 +1,79 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import PlainTextResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.metrics import registry
+from app.core.llm_metrics import get_assessment_usage, get_test_usage
+from app.core.security import get_current_user
+from app.db.database import get_db
+from app.db.models import Test, CandidateAssessment, User
+
+router = APIRouter()
+
+# totals reported for tests/assessments with no recorded LLM calls
+_NO_USAGE = {"calls": 0, "errors": 0, "retries": 0, "prompt_tokens": 0, "completion_tokens": 0,
+             "cost_usd": 0.0, "duration_seconds": 0.0, "by_node": {}}
+
+
+@router.get('/metrics', response_class=PlainTextResponse)
+async def metrics():
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+
+async def get_recruiter_test(test_id: str, current_user: User, db: AsyncSession) -> Test:
+    if current_user.role != 'recruiter':
+        raise HTTPException(
+            status_code=403, detail="Only recruiters can view LLM usage")
+    test = await db.execute(select(Test).where(Test.test_id == test_id))
+    test = test.scalar_one_or_none()
+    if not test or test.recruiter_uid != current_user.uid:
+        raise HTTPException(status_code=404, detail="Test not found")
+    return test
+
+
+@router.get('/metrics/usage/assessment/{assessment_id}')
+async def assessment_usage(assessment_id: str, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+    """Every LLM call made for one assessment, with totals per node."""
+    assessment = await db.execute(select(CandidateAssessment).where(
+        CandidateAssessment.assessment_id == assessment_id))
+    assessment = assessment.scalar_one_or_none()
+    if not assessment:
+        raise HTTPException(status_code=404, detail="Assessment not found")
+    await get_recruiter_test(assessment.test_id, current_user, db)
+    usage = get_assessment_usage(assessment_id)
+    return usage or {"assessment_id": assessment_id, "test_id": assessment.test_id, **_NO_USAGE, "calls_log": []}
+
+
+@router.get('/metrics/usage/test/{test_id}')
+async def test_usage(test_id: str, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+    """LLM usage of a test (question pool included), broken down by assessment."""
+    test = await get_recruiter_test(test_id, current_user, db)
+    assessments = await db.execute(select(CandidateAssessment.assessment_id).where(
+        CandidateAssessment.test_id == test_id))
+    by_assessment = {}
+    for assessment_id in assessments.scalars().all():
+        usage = get_assessment_usage(assessment_id)
+        if usage:
+            usage.pop("calls_log", None)
+            by_assessment[assessment_id] = usage
+    usage = get_test_usage(test_id) or {"test_id": test_id, **_NO_USAGE}
+    return {**usage, "recruiter_uid": test.recruiter_uid, "assessments": by_assessment}
+
+
+@router.get('/metrics/usage/recruiter')
+async def recruiter_usage(current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+    """LLM usage of all of the current recruiter's tests."""
+    if current_user.role != 'recruiter':
+        raise HTTPException(
+            status_code=403, detail="Only recruiters can view LLM usage")
+    tests = await db.execute(select(Test.test_id).where(Test.recruiter_uid == current_user.uid))
+    totals = {k: v for k, v in _NO_USAGE.items() if k != "by_node"}
+    by_test = {}
+    for test_id in tests.scalars().all():
+        usage = get_test_usage(test_id)
+        if not usage:
+            continue
+        by_test[test_id] = {k: v for k, v in usage.items() if k != "by_node"}
+        for key in totals:
+            totals[key] += usage[key]
+    return {"recruiter_uid": current_user.uid, **totals, "tests": by_test}
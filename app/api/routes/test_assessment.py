@@ -2,24 +2,41 @@ from langgraph.types import Command
 import json
 from app.langgraph.other.parse_resume import parse_resume
 from typing import List
-from sqlalchemy import select
-from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import select, delete
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
 from fastapi.security import OAuth2PasswordBearer
 from app.core.security import get_current_user
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.langgraph.models import userstate_initializer, JobDescription, Resume
-from app.db.models import Test, CandidateAssessment,  Candidate, User
+from app.langgraph.models import userstate_initializer, JobDescription, Resume, LevelProgress
+from app.db.models import Test, CandidateAssessment,  Candidate, User, QuestionPool, SubmissionJob, LevelSubmission, AnswerKeyOverride
 from pydantic import BaseModel
-from typing import Optional, List
+from typing import Dict, Optional, List, Union
 import uuid
 from datetime import datetime
 import csv
-from app.core.security import hash_password
-from app.core.security import generate_password
+from collections import Counter
 from app.db.database import get_db
-from app.worker.queue import enqueue_resume_task
+from app.db.onboarding import ADDED, CREATED, onboard_candidates
+from app.db.queries import list_candidate_tests_page, list_recruiter_tests_page, parse_fields
+from app.core.candidate_tests_cache import candidate_tests_cache
+from app.worker.queue import enqueue_resume_tasks
 from app.langgraph.other.parse_jd import parse_jd
-from app.langgraph.graph.main import main_graph
+from app.langgraph.graph.main import get_async_main_graph
+from app.core.checkpointer import thread_lock
+from app.core.checkpoint_gc import delete_checkpoint_threads
+from app.core.state_cache import get_state, state_cache
+from app.langgraph.other.question_pool import sample_level1_questions
+from app.langgraph.other.bulk_grading import regrade_test
+from app.langgraph.other.answer_key import compile_answer_key
+from app.worker.question_pool_worker import build_level1_pool
+from app.core.config import LEVEL1_QUESTIONS_PER_SKILL, LEVEL2_PREFETCH_ENABLED, CHECKPOINT_DURING, SUBMISSION_LONG_POLL_MAX_SECONDS
+from app.langgraph.other.submission_jobs import (
+    FAILED, PENDING, READY, create_submission_job, graph_config, mark_completed_if_finished,
+    schedule_submission_job, submission_result, wait_for_submission_job)
+from app.langgraph.other.level2_prefetch import discard_level2_prefetch, schedule_level2_prefetch
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
 router = APIRouter()
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/login")
 # Use async session for async endpoints
@@ -50,6 +67,7 @@ class CreateTestInput(BaseModel):
 @router.post("/create-test")
 async def create_test(
     test_input: CreateTestInput,
+    background_tasks: BackgroundTasks,
     session: AsyncSession = Depends(get_db),
     user: User = Depends(get_current_user),
 ):
@@ -59,7 +77,7 @@ async def create_test(
             status_code=403, detail="Not authorized to create tests")
 
     # process the jd_text
-    parsed_jd = parse_jd(test_input.jd_text)
+    parsed_jd = await run_in_threadpool(parse_jd, test_input.jd_text)
     print(parsed_jd)
     if not parsed_jd:
         raise HTTPException(
@@ -78,8 +96,13 @@ async def create_test(
     )
 
     session.add(test)
+    session.add(QuestionPool(test_id=test.test_id, level=1, status="pending"))
     await session.commit()
 
+    # pre-generate the shared level 1 question pool once the response is sent
+    background_tasks.add_task(
+        build_level1_pool, test.test_id, json.loads(parsed_jd).get("required_skills") or [])
+
     return {
         "message": "Test created successfully",
         "test_id": test.test_id,
@@ -87,70 +110,68 @@ async def create_test(
 
 
 @router.get('/recruiter/tests')
-async def list_recruiter_tests(current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+async def list_recruiter_tests(
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    A page of the recruiter's tests, newest first, with candidate counts by
+    assessment status. Pass `next_cursor` back as `cursor` for the next page.
+    `fields` picks the test columns (comma separated); jd_text is left out
+    unless asked for.
+    """
     if current_user.role != 'recruiter':
         raise HTTPException(
             status_code=403, detail="Only recruiters can view tests")
-    tests = await db.execute(select(Test).filter_by(recruiter_uid=current_user.uid))
-    tests = tests.scalars().all()
-    result = []
-    for t in tests:
-        total_candidates = await db.execute(select(CandidateAssessment).filter_by(test_id=t.test_id))
-        total_candidates = total_candidates.scalars().all()
-        total_candidates = len(total_candidates)
-        duration = None
-        if t.scheduled_start and t.scheduled_end:
-            # duration in minutes
-            duration = (t.scheduled_end -
-                        t.scheduled_start).total_seconds() // 60
-        result.append({
-            "test_id": t.test_id,
-            "title": t.title,
-            "jd_text": t.jd_text,
-            "created_at": t.created_at,
-            "updated_at": t.updated_at,
-            "scheduled_end": t.scheduled_end,
-            "scheduled_start": t.scheduled_start,
-            "total_candidates": total_candidates,
-            "duration_minutes": duration
-        })
-    return result
+    try:
+        return await list_recruiter_tests_page(
+            db, current_user.uid, limit=limit, cursor=cursor, fields=parse_fields(fields))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 
 @router.get('/candidate/tests')
-async def list_candidate_tests(current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+async def list_candidate_tests(
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    A page of the candidate's tests, newest first, with their assessment id
+    and status. Paginated and projected like /recruiter/tests.
+    """
     if current_user.role != 'candidate':
         raise HTTPException(
             status_code=403, detail="Only candidates can view tests")
-
-    assessments = await db.execute(select(CandidateAssessment).filter_by(candidate_uid=current_user.uid))
-    assessments = assessments.scalars().all()
-    result = []
-    for assessment in assessments:
-        test = await db.execute(select(Test).filter_by(test_id=assessment.test_id))
-        test = test.scalar_one_or_none()
-        if not test:
-            continue
-
-        result.append({
-            "test_id": test.test_id,
-            "title": test.title,
-            "jd_text": test.jd_text,
-            "created_at": test.created_at,
-            "assessment_id": assessment.assessment_id,
-            "status": assessment.status,
-            "scheduled_end": test.scheduled_end,
-            "scheduled_start": test.scheduled_start,
-
-        })
-    return result
+    try:
+        fields = parse_fields(fields)
+        key = (limit, cursor, fields)
+        page = candidate_tests_cache.get(current_user.uid, key)
+        if page is None:
+            page = await list_candidate_tests_page(
+                db, current_user.uid, limit=limit, cursor=cursor, fields=fields)
+            candidate_tests_cache.put(current_user.uid, key, page)
+        return page
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+async def get_own_test(test_id: str, current_user: User, db: AsyncSession) -> Test:
+    test = await db.execute(select(Test).filter_by(test_id=test_id))
+    test = test.scalar_one_or_none()
+    if not test or test.recruiter_uid != current_user.uid:
+        raise HTTPException(status_code=404, detail="Test not found")
+    return test
 
 
 @router.put('/recruiter/test/{test_id}')
-async def update_test(test_id: str, update: TestUpdate, db: AsyncSession = Depends(get_db)):
-    test = await db.execute(db.query(Test).filter_by(test_id=test_id)).first()
-    if not test:
-        raise HTTPException(status_code=404, detail="Test not found")
+async def update_test(test_id: str, update: TestUpdate, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+    test = await get_own_test(test_id, current_user, db)
     if update.title:
         test.title = update.title
     if update.jd_text:
@@ -165,15 +186,48 @@ async def update_test(test_id: str, update: TestUpdate, db: AsyncSession = Depen
 
 
 @router.delete('/recruiter/test/{test_id}')
-async def delete_test(test_id: str, db: AsyncSession = Depends(get_db)):
-    test = await db.execute(db.query(Test).filter_by(test_id=test_id)).first()
-    if not test:
-        raise HTTPException(status_code=404, detail="Test not found")
+async def delete_test(test_id: str, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+    test = await get_own_test(test_id, current_user, db)
+    assessments = await db.execute(select(
+        CandidateAssessment.assessment_id, CandidateAssessment.candidate_uid).filter_by(test_id=test_id))
+    assessments = assessments.all()
+    assessment_ids = [assessment_id for assessment_id, _ in assessments]
+    # rows referencing the test go first
+    await db.execute(delete(SubmissionJob).where(SubmissionJob.assessment_id.in_(assessment_ids)))
+    await db.execute(delete(LevelSubmission).filter_by(test_id=test_id))
+    await db.execute(delete(AnswerKeyOverride).filter_by(test_id=test_id))
+    await db.execute(delete(CandidateAssessment).filter_by(test_id=test_id))
+    await db.execute(delete(QuestionPool).filter_by(test_id=test_id))
     await db.delete(test)
     await db.commit()
+    candidate_tests_cache.invalidate(*{candidate_uid for _, candidate_uid in assessments})
+    discard_level2_prefetch(*assessment_ids)
+    # the assessments' graph state goes with them (the checkpoint GC would
+    # otherwise pick the orphaned threads up on its next pass)
+    await delete_checkpoint_threads(assessment_ids)
     return {"msg": "Test deleted"}
 
 
+class RegradeRequest(BaseModel):
+    # question_id -> corrected key: the correct option, or a list of them for MSQs
+    answer_keys: Optional[Dict[str, Union[str, List[str]]]] = None
+    msq_partial_credit: bool = True
+    # every candidate's level and skill scores in the response
+    details: bool = False
+
+
+@router.post('/recruiter/test/{test_id}/regrade')
+async def regrade_test_assessments(test_id: str, regrade: RegradeRequest, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+    """Rescore every submitted assessment of the test and store the new scores."""
+    await get_own_test(test_id, current_user, db)
+    return await regrade_test(
+        test_id,
+        answer_keys=regrade.answer_keys,
+        msq_partial_credit=regrade.msq_partial_credit,
+        details=regrade.details,
+    )
+
+
 class CandidateInput(BaseModel):
     email: str
     resume_link: str
@@ -185,100 +239,39 @@ async def add_candidates(
     candidates: List[CandidateInput],
     session: AsyncSession = Depends(get_db),
 ):
+    """
+    Add candidates to the test, creating accounts for new emails. Every row
+    gets an outcome: created, added, already_added, duplicate or error.
+    """
     # Step 1: Check if Test exists
-    test = await session.execute(select(Test).where(Test.test_id == test_id))
-    test = test.scalar_one_or_none()
-    if not test:
+    test = await session.execute(select(Test.test_id).where(Test.test_id == test_id))
+    if test.scalar_one_or_none() is None:
         raise HTTPException(status_code=404, detail="Test not found")
-    created_or_updated_candidates = []
-
-    for candidate_data in candidates:
-        # Step 1: Check if User already exists
-        query = await session.execute(select(User).where(User.email == candidate_data.email))
-        existing_user = query.scalar_one_or_none()
-
-        if existing_user:
-            candidate_uid = existing_user.uid
-
-            query_candidate = await session.execute(select(Candidate).where(Candidate.uid == candidate_uid))
-            candidate_profile = query_candidate.scalar_one_or_none()
-
-            if not candidate_profile:
-                raise HTTPException(
-                    status_code=400, detail=f"Candidate profile missing for {candidate_data.email}")
-
-            # Use the async function version
-            await enqueue_resume_task(candidate_uid=candidate_uid, resume_link=candidate_data.resume_link)
-
-            candidate_info = {
-                "email": candidate_data.email,
-                "candidate_uid": candidate_uid,
-                "is_new_user": False
-            }
-
-        else:
-            # New candidate
-            random_password = generate_password()
-            user = User(
-                uid=str(uuid.uuid4()),
-                email=candidate_data.email,
-                password_hash=hash_password(random_password),
-                role="candidate",
-                name=candidate_data.email.split(
-                    '@')[0],  # Default name from email
-                created_at=datetime.utcnow(),
-                updated_at=datetime.utcnow()
-            )
-            session.add(user)
-            await session.flush()
-
-            candidate = Candidate(
-                uid=user.uid,
-                resume_text="Waiting for resume parsing",
-                created_at=datetime.utcnow()
-            )
-            session.add(candidate)
-
-            # Use the async function version
-            await enqueue_resume_task(candidate_uid=user.uid, resume_link=candidate_data.resume_link)
-
-            candidate_uid = user.uid
-
-            candidate_info = {
-                "email": candidate_data.email,
-                "candidate_uid": candidate_uid,
-                "is_new_user": True,
-                "password": random_password  # Include password for new users for testing purposes
-            }
-
-        # Step 2: Create CandidateAssessment entry
-        assessment = CandidateAssessment(
-            assessment_id=str(uuid.uuid4()),
-            candidate_uid=candidate_uid,
-            test_id=test_id,
-            started_at=datetime.utcnow(),
-            updated_at=datetime.utcnow(),
-            status="not_started"
-        )
-        session.add(assessment)
-
-        candidate_info["assessment_id"] = assessment.assessment_id
-        created_or_updated_candidates.append(candidate_info)
 
+    outcomes = await onboard_candidates(session, test_id, [c.model_dump() for c in candidates])
     await session.commit()
 
+    # enqueued after the commit, the worker can't see uncommitted candidates
+    resume_tasks = [outcome.pop("resume_task") for outcome in outcomes if "resume_task" in outcome]
+    candidate_tests_cache.invalidate(*{candidate_uid for candidate_uid, _ in resume_tasks})
+    await enqueue_resume_tasks(resume_tasks)
+
+    counts = Counter(outcome["status"] for outcome in outcomes)
     return {
-        "message": f"{len(created_or_updated_candidates)} candidates processed",
-        "candidates": created_or_updated_candidates
+        "message": f"{counts[CREATED] + counts[ADDED]} candidates processed",
+        "counts": counts,
+        "candidates": outcomes
     }
 
 
 # candidate
 
 
-@router.post('/candidate/test/{test_id}/start')
-async def start_test(test_id: str, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
-
+async def prepare_test_start(test_id: str, current_user: User, db: AsyncSession):
+    """
+    Load the test, assessment and candidate profile and build the initial
+    UserState for the graph. Shared by the JSON and streaming start endpoints.
+    """
     test = await db.execute(
         select(Test).where(Test.test_id == test_id)
     )
@@ -318,9 +311,7 @@ async def start_test(test_id: str, current_user: User = Depends(get_current_user
     parsed_jd = json.loads(test.jd_text)
     parsed_resume = json.loads(candidate_resume)
 
-    config = {
-        "thread_id": assessment.assessment_id,
-    }
+    config = graph_config(assessment.assessment_id, assessment.test_id)
     userState = userstate_initializer()
     userState.user_id = current_user.uid
     userState.job_description = JobDescription(
@@ -340,29 +331,62 @@ async def start_test(test_id: str, current_user: User = Depends(get_current_user
         summary=parsed_resume.get("summary")
     )
 
+    # serve level 1 from the test's pre-generated pool when it is ready,
+    # the graph only generates the skills the pool doesn't cover
+    question_pool = await db.execute(select(QuestionPool).where(
+        QuestionPool.test_id == test_id,
+        QuestionPool.level == 1,
+        QuestionPool.status == "ready"
+    ))
+    question_pool = question_pool.scalar_one_or_none()
+    if question_pool and question_pool.questions:
+        pooled_questions = sample_level1_questions(
+            json.loads(question_pool.questions),
+            userState.job_description.required_skills,
+            LEVEL1_QUESTIONS_PER_SKILL
+        )
+        if pooled_questions:
+            userState.progress = {1: LevelProgress(
+                level=1, questions=pooled_questions, answers={})}
+            userState.answer_keys = {1: compile_answer_key(pooled_questions)}
+
+    return assessment, userState, config
+
+
+@router.post('/candidate/test/{test_id}/start')
+async def start_test(test_id: str, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+    assessment, userState, config = await prepare_test_start(test_id, current_user, db)
+
     # get the questio
     # n for the test from langraph
-    questions = main_graph.invoke(
-        userState,
-        config=config,
-    )
+    main_graph = await get_async_main_graph()
+    async with thread_lock(assessment.assessment_id):
+        state_cache.invalidate(assessment.assessment_id)
+        questions = await main_graph.ainvoke(
+            userState,
+            config=config,
+            checkpoint_during=CHECKPOINT_DURING,
+        )
+
+    # level 1 is out, generate level 2 while the candidate answers it
+    if LEVEL2_PREFETCH_ENABLED:
+        schedule_level2_prefetch(
+            assessment.assessment_id, userState, test_id=assessment.test_id)
 
     # Start the test
     # update the status of the assessment
     assessment.status = "in_progress"
     assessment.started_at = datetime.utcnow()
     await db.commit()
+    candidate_tests_cache.invalidate(current_user.uid)
     return {"message": "Test started", "test_id": test_id, "questions": questions}
 
 
-@router.post("/candidate/test/{test_id}/level/{level}/submit")
-async def submit_level1_test(
-    test_id: str,
-    level: int,
-    answers: List[dict[str, str]],
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
-):
+async def prepare_level_submit(test_id: str, level: int, current_user: User, db: AsyncSession):
+    """
+    Load the candidate's assessment and its graph config. Shared by the JSON
+    and streaming submit endpoints.
+    """
     # Check if the candidate has an assessment for this test
     assessment = await db.execute(
         select(CandidateAssessment).where(
@@ -380,12 +404,16 @@ async def submit_level1_test(
         raise HTTPException(
             status_code=400, detail="Assessment already completed")
 
-    # get the state from the checkpointer
-    config = {
-        "thread_id": assessment.assessment_id,
-    }
-    state = main_graph.get_state(config=config)
-    if not state:
+    config = graph_config(assessment.assessment_id, assessment.test_id)
+    return assessment, config
+
+
+async def check_current_level(config: dict, level: int):
+    """Raise unless the assessment is waiting on answers for `level`."""
+    # get the state, from memory unless the thread was written since
+    main_graph = await get_async_main_graph()
+    state = await get_state(main_graph, config)
+    if not state or not state.values:
         raise HTTPException(
             status_code=404, detail="State not found for this assessment")
 
@@ -395,10 +423,176 @@ async def submit_level1_test(
         raise HTTPException(
             status_code=400, detail=f"Current level is {current_level}, not {level}")
 
-    # invoke the graph with updated answers
-    result = main_graph.invoke(
-        Command(resume=answers, config=config)
+
+@router.post("/candidate/test/{test_id}/level/{level}/submit", status_code=202)
+async def submit_level1_test(
+    test_id: str,
+    level: int,
+    answers: List[Dict[str, Union[str, List[str]]]],
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    assessment, config = await prepare_level_submit(test_id, level, current_user, db)
+    # fail fast with a 400, checked again by the job once it holds the thread,
+    # so a second submit of the same level can't resume the next level
+    await check_current_level(config, level)
+
+    # store the answers and resume the graph in the background; grading and
+    # generating the next level outlive the request
+    job = await create_submission_job(db, assessment.assessment_id, level, answers)
+    schedule_submission_job(job, config)
+    return {"message": f"Level {level} answers submitted", "job_id": job.job_id, "status": job.status}
+
+
+@router.get("/candidate/test/{test_id}/submission/{job_id}")
+async def get_submission_status(
+    test_id: str,
+    job_id: str,
+    wait: float = 0,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Status of a level submission: queued, grading, generating_next_level,
+    ready (with the next level's questions) or failed. With `wait`, hold
+    the request up to that many seconds until the status changes.
+    """
+    result = await db.execute(select(SubmissionJob).join(
+        CandidateAssessment, CandidateAssessment.assessment_id == SubmissionJob.assessment_id
+    ).where(
+        SubmissionJob.job_id == job_id,
+        CandidateAssessment.test_id == test_id,
+        CandidateAssessment.candidate_uid == current_user.uid,
+    ))
+    job = result.scalar_one_or_none()
+    if not job:
+        raise HTTPException(status_code=404, detail="Submission not found")
+    # done with the session, don't hold its connection while waiting
+    await db.close()
+
+    if wait > 0 and job.status in PENDING:
+        job = await wait_for_submission_job(
+            job_id, job.status, min(wait, SUBMISSION_LONG_POLL_MAX_SECONDS))
+    response = {"job_id": job.job_id, "level": job.level, "status": job.status}
+    if job.status == FAILED:
+        response["error"] = job.error
+    if job.status == READY:
+        response.update(await submission_result(graph_config(job.assessment_id, test_id)))
+    return response
+
+
+# streaming variants: questions are pushed over server-sent events as each
+# skill worker's batch is validated instead of after the whole fan-out
+
+
+def question_time_seconds(question) -> float:
+    try:
+        return float((question.metadata or {}).get("max_time_required") or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+def sse_event(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(jsonable_encoder(data))}\n\n"
+
+
+async def stream_level_questions(graph_input, config: dict, initial_questions: Optional[list] = None, level: Optional[int] = None):
+    """
+    Run the graph in streaming mode and yield a `questions` event as soon as
+    questions are validated (one per question while the LLM streams), followed
+    by a final `level` event once the graph pauses or ends. With `level`, the
+    assessment must still be waiting on that level once the thread is locked.
+    """
+    main_graph = await get_async_main_graph()
+    try:
+        async with thread_lock(config["configurable"]["thread_id"]):
+            if level is not None:
+                await check_current_level(config, level)
+            async for event in _stream_locked(main_graph, graph_input, config, initial_questions):
+                yield event
+            if level is not None:
+                await mark_completed_if_finished(config)
+    except HTTPException as e:
+        yield sse_event("error", {"detail": e.detail})
+    except Exception as e:
+        print(f"Error while streaming questions: {e}")
+        yield sse_event("error", {"detail": str(e)})
+    finally:
+        if level == 1:
+            # taken by level 2 once the graph got there, a no-op then
+            discard_level2_prefetch(config["configurable"]["thread_id"])
+
+
+async def _stream_locked(main_graph, graph_input, config: dict, initial_questions: Optional[list]):
+    # questions already in the input (e.g. sampled from the test's pool)
+    by_skill = {}
+    for q in initial_questions or []:
+        by_skill.setdefault((q.level, (q.metadata or {}).get("skill")), []).append(q)
+    for (level, skill), questions in by_skill.items():
+        yield sse_event("questions", {"level": level, "skill": skill, "questions": questions})
+
+    state_cache.invalidate(config["configurable"]["thread_id"])
+    async for _namespace, mode, chunk in main_graph.astream(
+        graph_input,
+        config=config,
+        stream_mode=["custom", "updates"],
+        subgraphs=True,
+        checkpoint_during=CHECKPOINT_DURING,
+    ):
+        if mode == "custom" and isinstance(chunk, dict) and "questions" in chunk:
+            yield sse_event("questions", chunk)
+
+    state = await get_state(main_graph, config)
+    values = state.values
+    current_level = values.get("current_level")
+    progress = values.get("progress", {}).get(current_level)
+    questions = progress.questions if progress else []
+    yield sse_event("level", {
+        "level": current_level,
+        "unlocked_levels": values.get("unlocked_levels"),
+        "total_questions": len(questions),
+        "skills": sorted({(q.metadata or {}).get("skill") for q in questions} - {None}),
+        "total_time_seconds": sum(question_time_seconds(q) for q in questions),
+        "status": "awaiting_answers" if state.next else "completed",
+    })
+
+
+@router.post('/candidate/test/{test_id}/start/stream')
+async def start_test_stream(test_id: str, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+    assessment, userState, config = await prepare_test_start(test_id, current_user, db)
+
+    # mark the test as started before streaming, the session is gone once
+    # the response has been handed to the client
+    assessment.status = "in_progress"
+    assessment.started_at = datetime.utcnow()
+    await db.commit()
+    candidate_tests_cache.invalidate(current_user.uid)
+
+    initial_questions = userState.progress[1].questions if 1 in userState.progress else []
+
+    async def events():
+        async for event in stream_level_questions(userState, config, initial_questions):
+            yield event
+        # level 1 is out, generate level 2 while the candidate answers it
+        if LEVEL2_PREFETCH_ENABLED:
+            schedule_level2_prefetch(
+                assessment.assessment_id, userState, test_id=assessment.test_id)
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+@router.post("/candidate/test/{test_id}/level/{level}/submit/stream")
+async def submit_level_test_stream(
+    test_id: str,
+    level: int,
+    answers: List[Dict[str, Union[str, List[str]]]],
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    assessment, config = await prepare_level_submit(test_id, level, current_user, db)
+    # fail fast with a 400, checked again once the stream holds the thread
+    await check_current_level(config, level)
+    return StreamingResponse(
+        stream_level_questions(Command(resume=answers), config, level=level),
+        media_type="text/event-stream",
     )
-    print(result)
-    return {"message": "Level 1 test submitted", "result": result}
-    # Update the answers in the database
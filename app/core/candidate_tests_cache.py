@@ -0,0 +1,64 @@
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional, Tuple
+import time
+from app.core.config import CANDIDATE_TESTS_CACHE_TTL_SECONDS, CANDIDATE_TESTS_CACHE_MAX_ENTRIES
+from app.core.metrics import registry
+
+# The test listing is the first call every candidate makes after login, and
+# it only changes when one of their assessments is created, started,
+# completed or deleted. Pages are kept per candidate for a short TTL and
+# dropped by those writes. Invalidation only reaches this process, so with
+# several API processes a listing can be up to the TTL out of date.
+
+candidate_tests_cache_requests = registry.counter(
+    "candidate_tests_cache_requests_total",
+    "Candidate test listing lookups, by result (hit, miss)",
+    ["result"])
+
+
+class CandidateTestsCache:
+    """Listing pages per candidate for ttl_seconds, LRU by candidate."""
+
+    def __init__(self, ttl_seconds: float, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        # candidate_uid -> (expires_at, page key -> page)
+        self._entries: "OrderedDict[str, Tuple[float, Dict[Hashable, dict]]]" = OrderedDict()
+
+    def get(self, candidate_uid: str, key: Hashable) -> Optional[dict]:
+        if not self.ttl_seconds:
+            return None
+        entry = self._entries.get(candidate_uid)
+        if entry is not None and entry[0] <= time.monotonic():
+            del self._entries[candidate_uid]
+            entry = None
+        page = entry[1].get(key) if entry is not None else None
+        if page is None:
+            candidate_tests_cache_requests.inc(result="miss")
+            return None
+        self._entries.move_to_end(candidate_uid)
+        candidate_tests_cache_requests.inc(result="hit")
+        return page
+
+    def put(self, candidate_uid: str, key: Hashable, page: dict):
+        if not self.ttl_seconds:
+            return
+        entry = self._entries.get(candidate_uid)
+        if entry is None:
+            # pages cached later expire with the first one
+            entry = self._entries[candidate_uid] = (time.monotonic() + self.ttl_seconds, {})
+        entry[1][key] = page
+        self._entries.move_to_end(candidate_uid)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, *candidate_uids: str):
+        for candidate_uid in candidate_uids:
+            self._entries.pop(candidate_uid, None)
+
+    def stats(self) -> dict:
+        return {"candidates": len(self._entries), "ttl_seconds": self.ttl_seconds}
+
+
+candidate_tests_cache = CandidateTestsCache(
+    CANDIDATE_TESTS_CACHE_TTL_SECONDS, CANDIDATE_TESTS_CACHE_MAX_ENTRIES)
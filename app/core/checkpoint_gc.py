@@ -0,0 +1,356 @@
+import asyncio
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+from sqlalchemy import select
+from app.core.checkpointer import CHECKPOINT_DB_PATH, get_async_memory, thread_lock
+from app.core.config import (
+    CHECKPOINT_BACKEND,
+    CHECKPOINT_GC_INTERVAL_SECONDS,
+    CHECKPOINT_ABANDONED_AFTER_SECONDS,
+    CHECKPOINT_VACUUM_INTERVAL_SECONDS,
+    CHECKPOINT_VACUUM_STEP_PAGES,
+)
+from app.core.metrics import registry
+from app.db.database import AsyncSessionLocal
+from app.db.models import CandidateAssessment
+
+# Every step of every assessment leaves a checkpoint (and its writes) behind.
+# Once an assessment is completed, or abandoned past
+# CHECKPOINT_ABANDONED_AFTER_SECONDS, only the latest checkpoint of each
+# namespace is kept; that is all get_state (and resuming) reads. Threads
+# without a CandidateAssessment, e.g. of deleted tests, are removed
+# entirely. Every CHECKPOINT_VACUUM_INTERVAL_SECONDS the freed space is
+# given back (SQLite: incremental vacuum steps, Postgres: VACUUM ANALYZE).
+# The latest checkpoint is found through the (thread_id, checkpoint_ns,
+# checkpoint_id) primary key, so active lookups don't slow down as the
+# tables grow; the job keeps them from growing.
+
+gc_deleted_rows = registry.counter(
+    "checkpoint_gc_deleted_rows_total",
+    "Checkpoint rows deleted by the compaction job",
+    ["table", "reason"])
+gc_deleted_bytes = registry.counter(
+    "checkpoint_gc_deleted_bytes_total",
+    "Serialized checkpoint bytes deleted by the compaction job",
+    ["reason"])
+gc_reclaimed_bytes = registry.counter(
+    "checkpoint_gc_reclaimed_bytes_total",
+    "Bytes given back by WAL checkpoints and vacuums")
+
+THREAD_BATCH_SIZE = 500
+
+_last_report: Optional[dict] = None
+# updated_at of the assessments covered by the previous pass
+_watermark: Optional[datetime] = None
+_last_vacuum: Optional[float] = None
+
+
+class _SqliteStore:
+    # writes are kept for the remaining checkpoints and their parents, the
+    # parent's writes hold the sends pending for the next step
+    COMPACT = {
+        "checkpoints": """DELETE FROM checkpoints WHERE thread_id = ? AND checkpoint_id < (
+            SELECT max(c.checkpoint_id) FROM checkpoints c
+            WHERE c.thread_id = checkpoints.thread_id AND c.checkpoint_ns = checkpoints.checkpoint_ns)
+            RETURNING length(checkpoint) + length(metadata)""",
+        "writes": """DELETE FROM writes WHERE thread_id = ? AND NOT EXISTS (
+            SELECT 1 FROM checkpoints c
+            WHERE c.thread_id = writes.thread_id AND c.checkpoint_ns = writes.checkpoint_ns
+            AND writes.checkpoint_id IN (c.checkpoint_id, c.parent_checkpoint_id))
+            RETURNING length(value)""",
+    }
+    DELETE = {
+        "checkpoints": "DELETE FROM checkpoints WHERE thread_id = ? RETURNING length(checkpoint) + length(metadata)",
+        "writes": "DELETE FROM writes WHERE thread_id = ? RETURNING length(value)",
+    }
+
+    def __init__(self, saver):
+        self.saver = saver
+
+    async def _execute(self, statements: Dict[str, str], thread_id: str, stats: dict):
+        async with self.saver.lock:
+            for table, sql in statements.items():
+                async with self.saver.conn.execute(sql, (thread_id,)) as cursor:
+                    sizes = [row[0] or 0 for row in await cursor.fetchall()]
+                stats["rows"][table] = stats["rows"].get(table, 0) + len(sizes)
+                stats["bytes"] += sum(sizes)
+            await self.saver.conn.commit()
+
+    async def thread_ids(self) -> List[str]:
+        await self.saver.setup()
+        async with self.saver.conn.execute("SELECT DISTINCT thread_id FROM checkpoints") as cursor:
+            return [row[0] for row in await cursor.fetchall()]
+
+    async def compact(self, thread_id: str, stats: dict):
+        await self._execute(self.COMPACT, thread_id, stats)
+
+    async def delete(self, thread_id: str, stats: dict):
+        await self._execute(self.DELETE, thread_id, stats)
+
+    async def _file_bytes(self) -> int:
+        wal = CHECKPOINT_DB_PATH + "-wal"
+        return os.path.getsize(CHECKPOINT_DB_PATH) + (os.path.getsize(wal) if os.path.exists(wal) else 0)
+
+    async def _pragma(self, sql: str):
+        async with self.saver.conn.execute(sql) as cursor:
+            return await cursor.fetchone()
+
+    async def vacuum(self) -> int:
+        # A full VACUUM rewrites the file while holding the saver's lock,
+        # stalling every active assessment. Free pages are given back a step
+        # at a time instead, the lock is released between steps.
+        await self.saver.setup()
+        before = await self._file_bytes()
+        async with self.saver.lock:
+            auto_vacuum = (await self._pragma("PRAGMA auto_vacuum"))[0]
+        if auto_vacuum != 2:
+            # files created before auto_vacuum=INCREMENTAL, their free pages
+            # are still reused for new checkpoints
+            print("Checkpoint GC: auto_vacuum isn't incremental, see the Readme to convert the file")
+            return 0
+        while True:
+            async with self.saver.lock:
+                # executescript steps the pragma until all its pages are freed
+                await self.saver.conn.executescript(
+                    f"PRAGMA incremental_vacuum({CHECKPOINT_VACUUM_STEP_PAGES});")
+                # doesn't wait for readers or writers
+                await self._pragma("PRAGMA wal_checkpoint(PASSIVE)")
+                free_pages = (await self._pragma("PRAGMA freelist_count"))[0]
+            if not free_pages:
+                break
+            await asyncio.sleep(0)
+        return max(before - await self._file_bytes(), 0)
+
+    def running_elsewhere(self):
+        # one API process per SQLite file
+        return _NullLock()
+
+
+class _PostgresStore:
+    COMPACT = {
+        "checkpoints": """DELETE FROM checkpoints WHERE thread_id = %(t)s AND checkpoint_id < (
+            SELECT max(c.checkpoint_id) FROM checkpoints c
+            WHERE c.thread_id = checkpoints.thread_id AND c.checkpoint_ns = checkpoints.checkpoint_ns)
+            RETURNING pg_column_size(checkpoint) + pg_column_size(metadata) AS size""",
+        "checkpoint_writes": """DELETE FROM checkpoint_writes w WHERE thread_id = %(t)s AND NOT EXISTS (
+            SELECT 1 FROM checkpoints c
+            WHERE c.thread_id = w.thread_id AND c.checkpoint_ns = w.checkpoint_ns
+            AND w.checkpoint_id IN (c.checkpoint_id, c.parent_checkpoint_id))
+            RETURNING pg_column_size(blob) AS size""",
+        # channel values are stored once per version, keep the versions the
+        # remaining checkpoints point at
+        "checkpoint_blobs": """DELETE FROM checkpoint_blobs b WHERE thread_id = %(t)s AND NOT EXISTS (
+            SELECT 1 FROM checkpoints c
+            WHERE c.thread_id = b.thread_id AND c.checkpoint_ns = b.checkpoint_ns
+            AND c.checkpoint -> 'channel_versions' ->> b.channel = b.version)
+            RETURNING coalesce(pg_column_size(blob), 0) AS size""",
+    }
+    DELETE = {
+        "checkpoints": "DELETE FROM checkpoints WHERE thread_id = %(t)s RETURNING pg_column_size(checkpoint) + pg_column_size(metadata) AS size",
+        "checkpoint_writes": "DELETE FROM checkpoint_writes WHERE thread_id = %(t)s RETURNING pg_column_size(blob) AS size",
+        "checkpoint_blobs": "DELETE FROM checkpoint_blobs WHERE thread_id = %(t)s RETURNING coalesce(pg_column_size(blob), 0) AS size",
+    }
+    TABLES = ("checkpoints", "checkpoint_writes", "checkpoint_blobs")
+
+    def __init__(self, saver):
+        # AsyncPostgresSaver.conn is the connection pool
+        self.pool = saver.conn
+
+    async def _execute(self, statements: Dict[str, str], thread_id: str, stats: dict):
+        async with self.pool.connection() as conn:
+            async with conn.transaction():
+                for table, sql in statements.items():
+                    cursor = await conn.execute(sql, {"t": thread_id})
+                    sizes = [row["size"] for row in await cursor.fetchall()]
+                    stats["rows"][table] = stats["rows"].get(
+                        table, 0) + len(sizes)
+                    stats["bytes"] += sum(sizes)
+
+    async def thread_ids(self) -> List[str]:
+        async with self.pool.connection() as conn:
+            cursor = await conn.execute("SELECT DISTINCT thread_id FROM checkpoints")
+            return [row["thread_id"] for row in await cursor.fetchall()]
+
+    async def compact(self, thread_id: str, stats: dict):
+        await self._execute(self.COMPACT, thread_id, stats)
+
+    async def delete(self, thread_id: str, stats: dict):
+        await self._execute(self.DELETE, thread_id, stats)
+
+    async def _table_bytes(self, conn) -> int:
+        cursor = await conn.execute(
+            "SELECT sum(pg_total_relation_size(t)) AS size FROM unnest(%s::regclass[]) AS t",
+            (list(self.TABLES),))
+        # sum() of bigints comes back as a Decimal
+        return int((await cursor.fetchone())["size"] or 0)
+
+    async def vacuum(self) -> int:
+        # the pool's connections are in autocommit, VACUUM can't run in a transaction
+        async with self.pool.connection() as conn:
+            before = await self._table_bytes(conn)
+            for table in self.TABLES:
+                await conn.execute(f"VACUUM (ANALYZE) {table}")
+            return max(before - await self._table_bytes(conn), 0)
+
+    def running_elsewhere(self):
+        return _PostgresJobLock(self.pool)
+
+
+class _NullLock:
+    async def __aenter__(self):
+        return False
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class _PostgresJobLock:
+    """Session advisory lock, so only one API process runs the job at a time."""
+
+    KEY = "checkpoint_gc"
+
+    def __init__(self, pool):
+        self.pool = pool
+        self._conn = None
+
+    async def __aenter__(self) -> bool:
+        self._context = self.pool.connection()
+        self._conn = await self._context.__aenter__()
+        cursor = await self._conn.execute(
+            "SELECT pg_try_advisory_lock(hashtextextended(%s, 0)) AS locked", (self.KEY,))
+        self._locked = (await cursor.fetchone())["locked"]
+        return not self._locked
+
+    async def __aexit__(self, *exc):
+        try:
+            if self._locked:
+                await self._conn.execute(
+                    "SELECT pg_advisory_unlock(hashtextextended(%s, 0))", (self.KEY,))
+        finally:
+            await self._context.__aexit__(*exc)
+        return False
+
+
+def _store(saver):
+    return _PostgresStore(saver) if CHECKPOINT_BACKEND == "postgres" else _SqliteStore(saver)
+
+
+def _chunks(items: List[str], size: int) -> Iterable[List[str]]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+async def _finished_assessment_ids(now: datetime, since: Optional[datetime]) -> List[str]:
+    """Assessments completed, or abandoned, since the previous pass."""
+    abandoned_before = now - \
+        timedelta(seconds=CHECKPOINT_ABANDONED_AFTER_SECONDS)
+    completed = CandidateAssessment.status == "completed"
+    abandoned = (CandidateAssessment.status == "in_progress") & (
+        CandidateAssessment.updated_at < abandoned_before)
+    if since is not None:
+        completed &= CandidateAssessment.updated_at >= since
+        abandoned &= CandidateAssessment.updated_at >= since - \
+            timedelta(seconds=CHECKPOINT_ABANDONED_AFTER_SECONDS)
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(
+            select(CandidateAssessment.assessment_id).where(completed | abandoned))
+        return list(result.scalars().all())
+
+
+async def _orphaned_thread_ids(thread_ids: List[str]) -> List[str]:
+    """Checkpointed threads without a CandidateAssessment."""
+    orphaned = []
+    async with AsyncSessionLocal() as session:
+        for chunk in _chunks(thread_ids, THREAD_BATCH_SIZE):
+            result = await session.execute(
+                select(CandidateAssessment.assessment_id).where(
+                    CandidateAssessment.assessment_id.in_(chunk)))
+            known = set(result.scalars().all())
+            orphaned.extend(t for t in chunk if t not in known)
+    return orphaned
+
+
+def _new_stats() -> dict:
+    return {"threads": 0, "rows": {}, "bytes": 0}
+
+
+def _record(stats: dict, reason: str):
+    for table, rows in stats["rows"].items():
+        gc_deleted_rows.inc(rows, table=table, reason=reason)
+    gc_deleted_bytes.inc(stats["bytes"], reason=reason)
+
+
+async def delete_checkpoint_threads(thread_ids: Iterable[str]) -> dict:
+    """Drop every checkpoint of the given threads, e.g. the assessments of a deleted test."""
+    store = _store(await get_async_memory())
+    stats = _new_stats()
+    for thread_id in thread_ids:
+        await store.delete(thread_id, stats)
+        stats["threads"] += 1
+    _record(stats, "deleted")
+    return stats
+
+
+async def run_checkpoint_gc(vacuum: bool = False) -> Optional[dict]:
+    """
+    One compaction pass. Returns the report (also kept for
+    get_checkpoint_gc_report), or None if another process is running it.
+    """
+    global _last_report, _watermark
+    store = _store(await get_async_memory())
+    async with store.running_elsewhere() as busy:
+        if busy:
+            return None
+        started = time.perf_counter()
+        now = datetime.utcnow()
+
+        finished = _new_stats()
+        for thread_id in await _finished_assessment_ids(now, _watermark):
+            # the same lock as a graph run, an abandoned candidate may be back
+            async with thread_lock(thread_id):
+                await store.compact(thread_id, finished)
+            finished["threads"] += 1
+        _record(finished, "finished")
+
+        orphaned = _new_stats()
+        for thread_id in await _orphaned_thread_ids(await store.thread_ids()):
+            await store.delete(thread_id, orphaned)
+            orphaned["threads"] += 1
+        _record(orphaned, "orphaned")
+
+        reclaimed = await store.vacuum() if vacuum else None
+        if reclaimed:
+            gc_reclaimed_bytes.inc(reclaimed)
+        _watermark = now
+        _last_report = {
+            "finished_at": datetime.utcnow().isoformat(),
+            "backend": CHECKPOINT_BACKEND,
+            "duration_seconds": time.perf_counter() - started,
+            "compacted": finished,
+            "orphaned": orphaned,
+            "vacuumed": vacuum,
+            "reclaimed_bytes": reclaimed,
+        }
+    print(f"Checkpoint GC: {_last_report}")
+    return _last_report
+
+
+def get_checkpoint_gc_report() -> Optional[dict]:
+    return _last_report
+
+
+async def run_checkpoint_gc_forever():
+    """Background loop started with the app, one pass per CHECKPOINT_GC_INTERVAL_SECONDS."""
+    global _last_vacuum
+    while True:
+        await asyncio.sleep(CHECKPOINT_GC_INTERVAL_SECONDS)
+        try:
+            vacuum = _last_vacuum is None or \
+                time.monotonic() - _last_vacuum >= CHECKPOINT_VACUUM_INTERVAL_SECONDS
+            report = await run_checkpoint_gc(vacuum=vacuum)
+            if report and vacuum:
+                _last_vacuum = time.monotonic()
+        except Exception as e:
+            print(f"Checkpoint GC failed: {e}")
@@ -0,0 +1,171 @@
+import argparse
+import sqlite3
+from typing import Any, Callable, Dict, Tuple
+
+import ormsgpack
+import zstandard
+from langgraph.checkpoint.serde.jsonplus import (
+    JsonPlusSerializer,
+    _msgpack_default,
+    _msgpack_ext_hook,
+    _option,
+)
+
+from app.langgraph.models import JobDescription, LevelProgress, Question, Resume, UserState
+
+# The default serializer stores each pydantic model in a checkpoint as
+# msgpack of (module, class name, model_dump()), uncompressed. A state with
+# a few hundred questions repeats every field name per question, which
+# compresses very well, so the whole payload is zstd compressed once it is
+# large enough to benefit. The state models are written as one ext type of
+# (model tag, schema version, model_dump()) and rebuilt with model_validate,
+# so nested questions are validated by pydantic-core instead of going
+# through a Python hook one by one.
+#
+# When a model's fields change, bump its version in MODEL_SCHEMAS and add an
+# upgrade from the previous version to SCHEMA_UPGRADES; older payloads are
+# upgraded step by step when read. Checkpoints written by the default
+# serializer are still read, so existing databases keep working and are
+# converted as threads are written again (or all at once with
+# `python -m app.core.checkpoint_serde migrate`).
+
+EXT_STATE_MODEL = 64
+
+# tag -> (model, current schema version)
+MODEL_SCHEMAS: Dict[str, Tuple[type, int]] = {
+    "q": (Question, 2),
+    "lp": (LevelProgress, 1),
+    "jd": (JobDescription, 1),
+    "r": (Resume, 1),
+    "us": (UserState, 2),
+}
+# (tag, version) -> function turning that version's fields into the next's
+SCHEMA_UPGRADES: Dict[Tuple[str, int], Callable[[dict], dict]] = {
+    # v2: MSQ keys (correct_answers) and the compiled answer keys
+    ("q", 1): lambda fields: {**fields, "correct_answers": None},
+    ("us", 1): lambda fields: {**fields, "answer_keys": {}},
+}
+
+_ENCODERS = {cls: (tag, version)
+             for tag, (cls, version) in MODEL_SCHEMAS.items()}
+
+COMPRESSED_TYPE = "msgpack+zstd"
+PLAIN_TYPE = "msgpack"
+
+
+def _default(obj: Any):
+    encoder = _ENCODERS.get(type(obj))
+    if encoder is None:
+        # anything else (Send, messages, ...) the way langgraph encodes it
+        return _msgpack_default(obj)
+    tag, version = encoder
+    return ormsgpack.Ext(EXT_STATE_MODEL, _pack((tag, version, obj.model_dump())))
+
+
+def _pack(obj: Any) -> bytes:
+    return ormsgpack.packb(obj, default=_default, option=_option)
+
+
+def packed_size(obj: Any) -> int:
+    """Uncompressed msgpack size of a state (or any checkpointable value)."""
+    return len(_pack(obj))
+
+
+def _ext_hook(code: int, data: bytes) -> Any:
+    if code != EXT_STATE_MODEL:
+        return _msgpack_ext_hook(code, data)
+    tag, version, fields = _unpack(data)
+    cls, current = MODEL_SCHEMAS[tag]
+    if version > current:
+        raise ValueError(
+            f"{cls.__name__} checkpoint schema version {version} is newer than this code")
+    while version < current:
+        fields = SCHEMA_UPGRADES[(tag, version)](fields)
+        version += 1
+    return cls.model_validate(fields)
+
+
+def _unpack(data: bytes) -> Any:
+    return ormsgpack.unpackb(data, ext_hook=_ext_hook, option=ormsgpack.OPT_NON_STR_KEYS)
+
+
+class CompactSerializer(JsonPlusSerializer):
+    """
+    Checkpoint serializer with a versioned encoding of the assessment state
+    models and zstd compression of large payloads.
+    """
+
+    def __init__(self, compression_level: int = 1, min_compress_bytes: int = 512):
+        super().__init__(__unpack_ext_hook__=_ext_hook)
+        self.min_compress_bytes = min_compress_bytes
+        self._compressor = zstandard.ZstdCompressor(level=compression_level)
+        self._decompressor = zstandard.ZstdDecompressor()
+
+    def dumps_typed(self, obj: Any) -> Tuple[str, bytes]:
+        if obj is None or isinstance(obj, (bytes, bytearray)):
+            return super().dumps_typed(obj)
+        try:
+            data = _pack(obj)
+        except ormsgpack.MsgpackEncodeError:
+            # e.g. strings that aren't valid UTF-8, which the default handles
+            return super().dumps_typed(obj)
+        if len(data) < self.min_compress_bytes:
+            return PLAIN_TYPE, data
+        return COMPRESSED_TYPE, self._compressor.compress(data)
+
+    def loads_typed(self, data: Tuple[str, bytes]) -> Any:
+        type_, data_ = data
+        if type_ == COMPRESSED_TYPE:
+            return _unpack(self._decompressor.decompress(data_))
+        if type_ == PLAIN_TYPE:
+            # also reads checkpoints written by the default serializer
+            return _unpack(data_)
+        return super().loads_typed(data)
+
+
+def migrate_checkpoints(conn: sqlite3.Connection, serde: JsonPlusSerializer, batch_size: int = 500) -> Dict[str, int]:
+    """
+    Re-encode every checkpoint and pending write of a SqliteSaver database
+    with `serde`. Rows are read with CompactSerializer, which understands
+    both formats, so this also converts back to the default serializer.
+    """
+    reader = CompactSerializer()
+    counts = {}
+    for table, column in (("checkpoints", "checkpoint"), ("writes", "value")):
+        counts[table] = 0
+        last_rowid = 0
+        while True:
+            rows = conn.execute(
+                f"SELECT rowid, type, {column} FROM {table} WHERE rowid > ? ORDER BY rowid LIMIT ?",
+                (last_rowid, batch_size)).fetchall()
+            if not rows:
+                break
+            last_rowid = rows[-1][0]
+            updates = []
+            for rowid, type_, value in rows:
+                new_type, new_value = serde.dumps_typed(
+                    reader.loads_typed((type_, value)))
+                if (new_type, new_value) != (type_, value):
+                    updates.append((new_type, new_value, rowid))
+            conn.executemany(
+                f"UPDATE {table} SET type = ?, {column} = ? WHERE rowid = ?", updates)
+            conn.commit()
+            counts[table] += len(updates)
+    return counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Convert a checkpoint database between serializers.")
+    parser.add_argument("command", choices=["migrate"])
+    parser.add_argument("path", nargs="?", default="checkpoints.sqlite3")
+    parser.add_argument("--to", choices=["compact", "jsonplus"], default="compact")
+    parser.add_argument("--vacuum", action="store_true",
+                        help="give the freed space back to the file system")
+    args = parser.parse_args()
+    conn = sqlite3.connect(args.path)
+    target = CompactSerializer() if args.to == "compact" else JsonPlusSerializer()
+    print(f"Migrated {migrate_checkpoints(conn, target)} rows to {args.to}")
+    if args.vacuum:
+        conn.execute("VACUUM")
+    conn.close()
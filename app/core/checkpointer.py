@@ -0,0 +1,181 @@
+import asyncio
+import contextlib
+import time
+import weakref
+from typing import Callable, List, Optional
+import aiosqlite
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+from app.core.config import (
+    checkpoint_serde,
+    CHECKPOINT_BACKEND,
+    CHECKPOINT_POSTGRES_URL,
+    CHECKPOINT_POOL_MIN_SIZE,
+    CHECKPOINT_POOL_MAX_SIZE,
+    CHECKPOINT_LOCK_POOL_SIZE,
+)
+from app.core.metrics import registry
+from app.db.database import DATABASE_URL
+
+CHECKPOINT_DB_PATH = "checkpoints.sqlite3"
+
+checkpoint_operation_seconds = registry.histogram(
+    "checkpoint_operation_seconds",
+    "Latency of checkpointer reads and writes",
+    ["backend", "operation"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5))
+
+_async_memory = None
+_async_memory_lock = asyncio.Lock()
+# postgres only: connection pools of the checkpointer and of the thread locks
+_pool = None
+_lock_pool = None
+# sqlite only: thread_id -> lock, for as long as someone holds or waits on it
+_thread_locks = weakref.WeakValueDictionary()
+# called with the thread_id after every checkpoint or pending writes put
+checkpoint_write_hooks: List[Callable[[str], None]] = []
+
+
+def postgres_conninfo(url: str) -> str:
+    """psycopg connection string from a SQLAlchemy URL (postgresql+asyncpg://...)."""
+    scheme, sep, rest = url.partition("://")
+    return f"{scheme.split('+')[0]}{sep}{rest}"
+
+
+def _timed(backend: str, operation: str, method):
+    async def timed(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return await method(*args, **kwargs)
+        finally:
+            checkpoint_operation_seconds.observe(
+                time.perf_counter() - start, backend=backend, operation=operation)
+            if operation != "aget_tuple":
+                # aput(config, ...) and aput_writes(config, ...)
+                thread_id = args[0]["configurable"]["thread_id"]
+                for hook in checkpoint_write_hooks:
+                    hook(thread_id)
+    return timed
+
+
+def _instrument(saver, backend: str):
+    # the graph calls these on the saver instance
+    for operation in ("aget_tuple", "aput", "aput_writes"):
+        setattr(saver, operation, _timed(
+            backend, operation, getattr(saver, operation)))
+    return saver
+
+
+async def _open_postgres():
+    # imported here, only needed (and installed) for the postgres backend
+    from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
+    from psycopg.rows import dict_row
+    from psycopg_pool import AsyncConnectionPool
+    global _pool, _lock_pool
+
+    conninfo = postgres_conninfo(CHECKPOINT_POSTGRES_URL or DATABASE_URL)
+    # settings AsyncPostgresSaver expects from its connections
+    _pool = AsyncConnectionPool(
+        conninfo,
+        min_size=CHECKPOINT_POOL_MIN_SIZE,
+        max_size=CHECKPOINT_POOL_MAX_SIZE,
+        kwargs={"autocommit": True, "prepare_threshold": 0,
+                "row_factory": dict_row},
+        open=False,
+    )
+    await _pool.open()
+    # a lock is held for a whole graph run, keep those connections apart so
+    # they can't starve the checkpoint reads and writes of the runs
+    _lock_pool = AsyncConnectionPool(
+        conninfo, min_size=1, max_size=CHECKPOINT_LOCK_POOL_SIZE, open=False)
+    await _lock_pool.open()
+
+    saver = AsyncPostgresSaver(_pool, serde=checkpoint_serde)
+    # creates or migrates the checkpoint tables, one process at a time
+    async with _lock_pool.connection() as conn:
+        async with conn.transaction():
+            await conn.execute(
+                "SELECT pg_advisory_xact_lock(hashtextextended('checkpoint_setup', 0))")
+            await saver.setup()
+    return saver
+
+
+async def get_async_memory():
+    """
+    Lazily create the async checkpointer.
+
+    AsyncSqliteSaver binds itself to the running event loop, so it has to be
+    built from inside the server loop instead of at import time. The
+    postgres pools are opened here for the same reason.
+    """
+    global _async_memory
+    async with _async_memory_lock:
+        if _async_memory is None:
+            if CHECKPOINT_BACKEND == "postgres":
+                saver = await _open_postgres()
+            else:
+                conn = await aiosqlite.connect(CHECKPOINT_DB_PATH)
+                # only takes effect on a new file, lets the GC give space
+                # back in small steps instead of a blocking VACUUM
+                await conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+                saver = AsyncSqliteSaver(conn, serde=checkpoint_serde)
+            _async_memory = _instrument(saver, CHECKPOINT_BACKEND)
+    return _async_memory
+
+
+async def latest_checkpoint_id(thread_id: str) -> Optional[str]:
+    """
+    Id of the thread's latest checkpoint, from the primary key index without
+    loading the checkpoint itself.
+    """
+    saver = await get_async_memory()
+    if CHECKPOINT_BACKEND == "postgres":
+        async with _pool.connection() as conn:
+            cursor = await conn.execute(
+                "SELECT max(checkpoint_id) AS checkpoint_id FROM checkpoints WHERE thread_id = %s AND checkpoint_ns = ''",
+                (thread_id,))
+            return (await cursor.fetchone())["checkpoint_id"]
+    async with saver.lock:
+        async with saver.conn.execute(
+                "SELECT max(checkpoint_id) FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ''",
+                (thread_id,)) as cursor:
+            return (await cursor.fetchone())[0]
+
+
+@contextlib.asynccontextmanager
+async def thread_lock(thread_id: str):
+    """
+    Hold the assessment thread for one graph run (checking the state, then
+    invoking or resuming the graph), so two requests for the same thread_id
+    can't both resume from the same checkpoint. With postgres this is a
+    transaction scoped advisory lock, which covers every API process and is
+    released by the database if the process dies.
+    """
+    await get_async_memory()
+    if CHECKPOINT_BACKEND != "postgres":
+        lock = _thread_locks.get(thread_id)
+        if lock is None:
+            lock = _thread_locks[thread_id] = asyncio.Lock()
+        async with lock:
+            yield
+        return
+    start = time.perf_counter()
+    async with _lock_pool.connection() as conn:
+        async with conn.transaction():
+            await conn.execute(
+                "SELECT pg_advisory_xact_lock(hashtextextended(%s, 0))", (thread_id,))
+            checkpoint_operation_seconds.observe(
+                time.perf_counter() - start, backend=CHECKPOINT_BACKEND, operation="thread_lock")
+            yield
+
+
+async def close_async_memory():
+    global _async_memory, _pool, _lock_pool
+    async with _async_memory_lock:
+        if _async_memory is not None:
+            if _pool is not None:
+                await _pool.close()
+                await _lock_pool.close()
+                _pool = _lock_pool = None
+            else:
+                await _async_memory.conn.close()
+            _async_memory = None
@@ -1,6 +1,12 @@
 from langchain_openai import ChatOpenAI
 import sqlite3
 from langgraph.checkpoint.sqlite import SqliteSaver
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+from app.core.checkpoint_serde import CompactSerializer
+from app.core.llm_cache import LLMResponseCache, CachedChatModel
+from app.core.llm_backends import build_chat_model
+from app.core.llm_limiter import LLMLimiter, RateLimitedChatModel
+from app.core.llm_metrics import llm_metrics_handler
 
 from dotenv import load_dotenv
 import os
@@ -9,6 +15,172 @@ OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 SENDGRID_API_KEY = os.getenv("SENDGRID_API_KEY")
 SENDGRID_FROM_EMAIL = os.getenv("SENDGRID_FROM_EMAIL")
 
-llm = ChatOpenAI(model="gpt-4o", temperature=0, api_key=OPENAI_API_KEY)
+# Where completions come from: openai, record (openai, appending every
+# response to the cassette), replay (from the cassette, no network) or
+# synthetic (generated schema-valid questions, no network)
+LLM_BACKEND = os.getenv("LLM_BACKEND", "openai").lower()
+LLM_CASSETTE_PATH = os.getenv("LLM_CASSETTE_PATH", "llm_cassette.jsonl")
+# multiplier on recorded latencies when replaying, 0 replays instantly
+LLM_REPLAY_LATENCY_SCALE = float(os.getenv("LLM_REPLAY_LATENCY_SCALE", 1.0))
+LLM_SYNTHETIC_LATENCY_SECONDS = float(
+    os.getenv("LLM_SYNTHETIC_LATENCY_SECONDS", 0))
+# fixed, uniform, exponential or lognormal around the latency above
+LLM_SYNTHETIC_LATENCY_DISTRIBUTION = os.getenv(
+    "LLM_SYNTHETIC_LATENCY_DISTRIBUTION", "fixed")
+# share of synthetic requests that fail
+LLM_SYNTHETIC_ERROR_RATE = float(os.getenv("LLM_SYNTHETIC_ERROR_RATE", 0))
+
+# LLM response cache, off while recording: a cached response would never
+# reach the cassette, and replaying it later fails
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true" \
+    and LLM_BACKEND != "record"
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "llm_cache.sqlite3")
+LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", 7 * 24 * 3600))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", 1024))
+LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+
+llm_cache = LLMResponseCache(
+    path=LLM_CACHE_PATH,
+    ttl_seconds=LLM_CACHE_TTL_SECONDS,
+    max_memory_entries=LLM_CACHE_MAX_ENTRIES,
+    max_disk_bytes=LLM_CACHE_MAX_BYTES,
+) if LLM_CACHE_ENABLED else None
+
+# Shared limits for every OpenAI request made by this process, 0 disables
+# a limit. Defaults are OpenAI's tier 1 limits for gpt-4o.
+LLM_MAX_IN_FLIGHT = int(os.getenv("LLM_MAX_IN_FLIGHT", 16))
+LLM_REQUESTS_PER_MINUTE = int(os.getenv("LLM_REQUESTS_PER_MINUTE", 500))
+LLM_TOKENS_PER_MINUTE = int(os.getenv("LLM_TOKENS_PER_MINUTE", 30000))
+# completion size assumed when reserving tokens before a request
+LLM_COMPLETION_TOKENS_ESTIMATE = int(
+    os.getenv("LLM_COMPLETION_TOKENS_ESTIMATE", 1024))
+
+llm_limiter = LLMLimiter(
+    max_in_flight=LLM_MAX_IN_FLIGHT,
+    requests_per_minute=LLM_REQUESTS_PER_MINUTE,
+    tokens_per_minute=LLM_TOKENS_PER_MINUTE,
+)
+
+chat_model = build_chat_model(
+    LLM_BACKEND,
+    lambda: ChatOpenAI(model="gpt-4o", temperature=0,
+                       api_key=OPENAI_API_KEY, stream_usage=True),
+    cassette_path=LLM_CASSETTE_PATH,
+    replay_latency_scale=LLM_REPLAY_LATENCY_SCALE,
+    synthetic_latency_seconds=LLM_SYNTHETIC_LATENCY_SECONDS,
+    synthetic_latency_distribution=LLM_SYNTHETIC_LATENCY_DISTRIBUTION,
+    synthetic_error_rate=LLM_SYNTHETIC_ERROR_RATE,
+    callbacks=[llm_metrics_handler],
+)
+
+# cache hits never reach the limiter
+llm = CachedChatModel(
+    RateLimitedChatModel(
+        chat_model,
+        limiter=llm_limiter,
+        completion_tokens=LLM_COMPLETION_TOKENS_ESTIMATE,
+    ),
+    cache=llm_cache,
+)
+
+# Level 1 question generation
+LEVEL1_QUESTIONS_PER_SKILL = int(os.getenv("LEVEL1_QUESTIONS_PER_SKILL", 5))
+# size of the per-test level 1 pool, as a multiple of what one candidate needs
+LEVEL1_POOL_MULTIPLIER = int(os.getenv("LEVEL1_POOL_MULTIPLIER", 3))
+
+# number of skills packed into one question generation request, 1 sends one
+# request per skill; higher values trade latency for fewer requests
+QUESTION_BATCH_SIZE = int(os.getenv("QUESTION_BATCH_SIZE", 1))
+
+# how often a skill's missing questions are re-requested after local repair
+MAX_QUESTION_RETRIES = int(os.getenv("MAX_QUESTION_RETRIES", 2))
+
+# Level 2 question generation, prefetched while the candidate answers level 1
+LEVEL2_QUESTIONS_PER_SKILL = int(os.getenv("LEVEL2_QUESTIONS_PER_SKILL", 5))
+LEVEL2_PREFETCH_ENABLED = os.getenv(
+    "LEVEL2_PREFETCH_ENABLED", "true").lower() == "true"
+LEVEL2_PREFETCH_TTL_SECONDS = int(
+    os.getenv("LEVEL2_PREFETCH_TTL_SECONDS", 2 * 3600))
+LEVEL2_PREFETCH_MAX_ENTRIES = int(
+    os.getenv("LEVEL2_PREFETCH_MAX_ENTRIES", 1000))
+
+LEVEL3_QUESTIONS_PER_SKILL = int(os.getenv("LEVEL3_QUESTIONS_PER_SKILL", 10))
+
+# Checkpoint encoding: "compact" (versioned msgpack + zstd) or "jsonplus"
+# (langgraph's default). compact also reads jsonplus checkpoints; switching
+# back needs a migration, see app/core/checkpoint_serde.py.
+CHECKPOINT_SERDE = os.getenv("CHECKPOINT_SERDE", "compact").lower()
+CHECKPOINT_COMPRESSION_LEVEL = int(os.getenv("CHECKPOINT_COMPRESSION_LEVEL", 1))
+
+checkpoint_serde = CompactSerializer(
+    compression_level=CHECKPOINT_COMPRESSION_LEVEL) if CHECKPOINT_SERDE == "compact" else JsonPlusSerializer()
+
+# Where the API keeps checkpoints: "sqlite" (a local file, for development)
+# or "postgres", shared by every API process and host. The postgres URL
+# defaults to DATABASE_URL, see app/core/checkpointer.py.
+CHECKPOINT_BACKEND = os.getenv("CHECKPOINT_BACKEND", "sqlite").lower()
+CHECKPOINT_POSTGRES_URL = os.getenv("CHECKPOINT_POSTGRES_URL")
+CHECKPOINT_POOL_MIN_SIZE = int(os.getenv("CHECKPOINT_POOL_MIN_SIZE", 1))
+CHECKPOINT_POOL_MAX_SIZE = int(os.getenv("CHECKPOINT_POOL_MAX_SIZE", 10))
+# connections holding per-assessment locks, i.e. concurrent graph runs
+CHECKPOINT_LOCK_POOL_SIZE = int(os.getenv("CHECKPOINT_LOCK_POOL_SIZE", 20))
+
+# When a graph run writes its checkpoints: "step" after every super-step
+# (langgraph's default, every worker, validator and synthesizer step of the
+# level subgraphs), or "boundary" only when the run stops, i.e. at an
+# interrupt (level 1 waiting for answers) or at the end of the assessment.
+# With "boundary" a run that crashes restarts from its previous stop instead
+# of its last step; see the Readme.
+CHECKPOINT_DURABILITY = os.getenv("CHECKPOINT_DURABILITY", "boundary").lower()
+CHECKPOINT_DURING = CHECKPOINT_DURABILITY == "step"
+
+# Latest state snapshot per assessment kept in memory for the level and
+# status checks of the submit endpoints, see app/core/state_cache.py. The
+# cap is on the snapshots' msgpack size; 0 turns the cache off.
+STATE_CACHE_MAX_BYTES = int(
+    os.getenv("STATE_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+
+# Compaction of finished assessments' checkpoints, see app/core/checkpoint_gc.py
+CHECKPOINT_GC_ENABLED = os.getenv(
+    "CHECKPOINT_GC_ENABLED", "true").lower() == "true"
+CHECKPOINT_GC_INTERVAL_SECONDS = int(
+    os.getenv("CHECKPOINT_GC_INTERVAL_SECONDS", 3600))
+# in-progress assessments untouched for this long count as abandoned
+CHECKPOINT_ABANDONED_AFTER_SECONDS = int(
+    os.getenv("CHECKPOINT_ABANDONED_AFTER_SECONDS", 7 * 24 * 3600))
+CHECKPOINT_VACUUM_INTERVAL_SECONDS = int(
+    os.getenv("CHECKPOINT_VACUUM_INTERVAL_SECONDS", 24 * 3600))
+# SQLite pages freed per incremental vacuum step, each step holds the
+# checkpointer's connection only that long
+CHECKPOINT_VACUUM_STEP_PAGES = int(
+    os.getenv("CHECKPOINT_VACUUM_STEP_PAGES", 1000))
+
+# Pages of each candidate's test listing kept in memory, see
+# app/core/candidate_tests_cache.py; a TTL of 0 turns the cache off
+CANDIDATE_TESTS_CACHE_TTL_SECONDS = float(
+    os.getenv("CANDIDATE_TESTS_CACHE_TTL_SECONDS", 30))
+CANDIDATE_TESTS_CACHE_MAX_ENTRIES = int(
+    os.getenv("CANDIDATE_TESTS_CACHE_MAX_ENTRIES", 10000))
+
+# Level submissions run as background jobs, see
+# app/langgraph/other/submission_jobs.py. Each running job holds its
+# assessment's thread lock (a connection of the lock pool with postgres).
+SUBMISSION_WORKERS = int(os.getenv("SUBMISSION_WORKERS", 16))
+SUBMISSION_LONG_POLL_MAX_SECONDS = float(
+    os.getenv("SUBMISSION_LONG_POLL_MAX_SECONDS", 30))
+# how often a long poll rereads a job that runs in another API process
+SUBMISSION_POLL_INTERVAL_SECONDS = float(
+    os.getenv("SUBMISSION_POLL_INTERVAL_SECONDS", 0.5))
+# every API process touches the jobs it runs and reruns stale ones (those
+# of a process that died) once per sweep interval; a job counts as stale
+# without an update for SUBMISSION_JOB_STALE_SECONDS, which has to be a few
+# sweep intervals
+SUBMISSION_JOB_SWEEP_INTERVAL_SECONDS = float(
+    os.getenv("SUBMISSION_JOB_SWEEP_INTERVAL_SECONDS", 30))
+SUBMISSION_JOB_STALE_SECONDS = int(
+    os.getenv("SUBMISSION_JOB_STALE_SECONDS", 120))
+
 conn = sqlite3.connect('checkpoints.sqlite3', check_same_thread=False)
-memory = SqliteSaver(conn)
+# see app/core/checkpointer.py, only takes effect on a new file
+conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+memory = SqliteSaver(conn, serde=checkpoint_serde)
@@ -0,0 +1,438 @@
+import asyncio
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from pydantic import ConfigDict
+
+from app.core.llm_cache import render_prompt
+
+# Swappable chat model backends, selected with LLM_BACKEND:
+#   openai    - the real model
+#   record    - the real model, every response is appended to a cassette
+#   replay    - responses served from the cassette with their recorded latency
+#   synthetic - schema-valid responses generated from the prompt, no network
+
+STREAM_CHUNK_CHARS = 32
+
+
+def prompt_hash(messages: List[BaseMessage]) -> str:
+    return hashlib.sha256(render_prompt(messages).encode("utf-8")).hexdigest()
+
+
+def _estimate_usage(messages: List[BaseMessage], content: str) -> dict:
+    prompt_tokens = len(render_prompt(messages)) // 4 + 1
+    completion_tokens = len(content) // 4 + 1
+    return {"input_tokens": prompt_tokens, "output_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens}
+
+
+class CassetteMissError(LookupError):
+    pass
+
+
+class Cassette:
+    """
+    JSONL file of recorded responses keyed by prompt hash. Later lines win,
+    so re-recording a prompt just appends.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._entries: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if line:
+                        entry = json.loads(line)
+                        self._entries[entry["key"]] = entry
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[dict]:
+        return self._entries.get(key)
+
+    def put(self, entry: dict):
+        with self._lock:
+            self._entries[entry["key"]] = entry
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+
+class RecordingChatModel(BaseChatModel):
+    """Passes every request to `inner` and appends the response to the cassette."""
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    inner: BaseChatModel
+    cassette: Cassette
+    model_name: str = "gpt-4o"
+
+    @property
+    def _llm_type(self) -> str:
+        return "recording"
+
+    def _record(self, messages, content: str, latency: float, first_token_latency: Optional[float], usage: Optional[dict]):
+        self.cassette.put({
+            "key": prompt_hash(messages),
+            "prompt": render_prompt(messages),
+            "content": content,
+            "latency": latency,
+            "first_token_latency": first_token_latency,
+            "usage": usage,
+            "model": self.model_name,
+        })
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        start = time.perf_counter()
+        response = self.inner.invoke(messages, stop=stop, **kwargs)
+        self._record(messages, response.content, time.perf_counter() - start,
+                     None, response.usage_metadata)
+        return ChatResult(generations=[ChatGeneration(message=response)])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        start = time.perf_counter()
+        response = await self.inner.ainvoke(messages, stop=stop, **kwargs)
+        self._record(messages, response.content, time.perf_counter() - start,
+                     None, response.usage_metadata)
+        return ChatResult(generations=[ChatGeneration(message=response)])
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs) -> AsyncIterator[ChatGenerationChunk]:
+        start = time.perf_counter()
+        first_token_latency = None
+        parts = []
+        usage = None
+        async for chunk in self.inner.astream(messages, stop=stop, **kwargs):
+            if first_token_latency is None and chunk.content:
+                first_token_latency = time.perf_counter() - start
+            if isinstance(chunk.content, str):
+                parts.append(chunk.content)
+            usage = chunk.usage_metadata or usage
+            if run_manager and chunk.content:
+                await run_manager.on_llm_new_token(chunk.content)
+            yield ChatGenerationChunk(message=chunk)
+        self._record(messages, "".join(parts), time.perf_counter() - start,
+                     first_token_latency, usage)
+
+
+class _CannedChatModel(BaseChatModel):
+    """
+    Base for backends that produce the whole response up front and then
+    play it back over `latency` seconds, streaming included.
+    """
+
+    model_name: str = "gpt-4o"
+
+    def _respond(self, messages: List[BaseMessage]) -> Tuple[str, float, Optional[float], dict]:
+        """(content, latency, first token latency, usage) for a request."""
+        raise NotImplementedError
+
+    def _failure(self) -> Optional[Exception]:
+        """Error to raise once the latency has passed, if the request fails."""
+        return None
+
+    def _message(self, content: str, usage: dict) -> AIMessage:
+        return AIMessage(content=content, usage_metadata=usage,
+                         response_metadata={"model_name": self.model_name})
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        content, latency, _, usage = self._respond(messages)
+        if latency > 0:
+            time.sleep(latency)
+        error = self._failure()
+        if error is not None:
+            raise error
+        return ChatResult(generations=[ChatGeneration(message=self._message(content, usage))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        content, latency, _, usage = self._respond(messages)
+        if latency > 0:
+            await asyncio.sleep(latency)
+        error = self._failure()
+        if error is not None:
+            raise error
+        return ChatResult(generations=[ChatGeneration(message=self._message(content, usage))])
+
+    def _chunks(self, content: str, latency: float, first_token_latency: Optional[float]) -> Iterator[Tuple[str, float]]:
+        pieces = [content[i:i + STREAM_CHUNK_CHARS]
+                  for i in range(0, len(content), STREAM_CHUNK_CHARS)] or [""]
+        first = min(first_token_latency if first_token_latency is not None
+                    else latency / len(pieces), latency)
+        rest = (latency - first) / max(len(pieces) - 1, 1)
+        for i, piece in enumerate(pieces):
+            yield piece, first if i == 0 else rest
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs) -> AsyncIterator[ChatGenerationChunk]:
+        content, latency, first_token_latency, usage = self._respond(messages)
+        for i, (piece, delay) in enumerate(self._chunks(content, latency, first_token_latency)):
+            if delay > 0:
+                await asyncio.sleep(delay)
+            if i == 0:
+                error = self._failure()
+                if error is not None:
+                    raise error
+            if run_manager:
+                await run_manager.on_llm_new_token(piece)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=piece))
+        # usage comes last, like OpenAI's stream_usage
+        yield ChatGenerationChunk(message=AIMessageChunk(
+            content="", usage_metadata=usage, response_metadata={"model_name": self.model_name}))
+
+
+class ReplayChatModel(_CannedChatModel):
+    """
+    Serves recorded responses. `latency_scale` stretches the recorded
+    latencies, 0 replays instantly.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    cassette: Cassette
+    latency_scale: float = 1.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "replay"
+
+    def _respond(self, messages):
+        key = prompt_hash(messages)
+        entry = self.cassette.get(key)
+        if entry is None:
+            raise CassetteMissError(
+                f"No recorded response for prompt {key[:12]} in {self.cassette.path}, record it with LLM_BACKEND=record")
+        first = entry.get("first_token_latency")
+        return (
+            entry["content"],
+            entry["latency"] * self.latency_scale,
+            first * self.latency_scale if first is not None else None,
+            entry.get("usage") or _estimate_usage(messages, entry["content"]),
+        )
+
+
+# -- synthetic responses -------------------------------------------------
+
+SKILL_VOCABULARY = [
+    "Python", "JavaScript", "TypeScript", "Java", "Go", "SQL", "PostgreSQL", "React",
+    "Node.js", "FastAPI", "Django", "Docker", "Kubernetes", "AWS", "Machine Learning",
+    "Data Analysis", "Git", "REST APIs", "System Design", "Linux",
+]
+
+
+def _template_regex(template) -> Tuple[re.Pattern, List[str]]:
+    """Regex matching a rendered ChatPromptTemplate and capturing its variables."""
+    text = template.messages[0].prompt.template
+    pattern = []
+    seen = []
+    for literal, name in re.findall(r"((?:[^{}]|\{\{|\}\})*)(?:\{(\w+)\})?", text):
+        pattern.append(re.escape(literal.replace(
+            "{{", "{").replace("}}", "}")))
+        if name:
+            pattern.append(f"(?P={name})" if name in seen else f"(?P<{name}>.*?)")
+            if name not in seen:
+                seen.append(name)
+    return re.compile(r"(?:Human: )?" + "".join(pattern) + r"\Z", re.DOTALL), seen
+
+
+def _split_list(value: str) -> List[str]:
+    return [s.strip() for s in value.split(",") if s.strip()]
+
+
+def _time(rng: random.Random) -> str:
+    return str(rng.choice([30, 45, 60, 90, 120]))
+
+
+def synthetic_mcq(rng: random.Random, skill: str, i: int, options: int = 4) -> dict:
+    choices = [f"{skill} option {chr(65 + j)} for question {i + 1}" for j in range(options)]
+    return {
+        "question": f"Synthetic {skill} question {i + 1}: which statement is correct?",
+        "options": choices,
+        "answer": rng.choice(choices),
+        "max_time_required": _time(rng),
+    }
+
+
+def synthetic_msq(rng: random.Random, skill: str, i: int, options: int = 4) -> dict:
+    item = synthetic_mcq(rng, skill, i, options)
+    del item["answer"]
+    item["question"] = f"Synthetic {skill} question {i + 1}: select all correct statements."
+    item["answers"] = sorted(rng.sample(
+        item["options"], rng.randint(1, options - 1)))
+    return item
+
+
+def synthetic_scenario(rng: random.Random, skill: str, i: int) -> dict:
+    item = synthetic_mcq(rng, skill, i, 5) if rng.random() < 0.5 \
+        else synthetic_msq(rng, skill, i, 5)
+    item["Scenario"] = f"Synthetic scenario {i + 1} involving {skill}."
+    return item
+
+
+def _questions(make, rng: random.Random, skill: str, num: int) -> List[dict]:
+    return [make(rng, skill, i) for i in range(num)]
+
+
+def _synthetic_jd(rng: random.Random, v: dict) -> dict:
+    text = v["jd_text"]
+    skills = [s for s in SKILL_VOCABULARY if s.lower() in text.lower()]
+    skills += [s for s in rng.sample(SKILL_VOCABULARY, len(SKILL_VOCABULARY))
+               if s not in skills]
+    first_line = text.strip().splitlines()[0] if text.strip() else "Engineer"
+    return {
+        "title": first_line[:60],
+        "company": "Synthetic Corp",
+        "required_skills": skills[:5],
+        "responsibilities": [f"Own the {s} parts of the product" for s in skills[:3]],
+        "qualifications": ["Bachelor's degree in Computer Science", "2+ years of experience"],
+        "description": f"Synthetic job description for {first_line[:60]}.",
+    }
+
+
+def _synthetic_resume(rng: random.Random, v: dict) -> dict:
+    text = v["resume_text"]
+    skills = [s for s in SKILL_VOCABULARY if s.lower() in text.lower()] or \
+        rng.sample(SKILL_VOCABULARY, 5)
+    return {
+        "education": ["BSc in Computer Science"],
+        "experience": [f"{rng.randint(1, 8)} years as Software Engineer at Synthetic Corp"],
+        "skills": skills,
+        "projects": [f"{skills[0]} project", f"{skills[-1]} service"],
+        "certifications": [],
+        "summary": "Synthetic candidate profile.",
+    }
+
+
+def _per_skill(make):
+    def generate(rng, v):
+        return _questions(make, rng, v["skill"], int(v["num"]))
+    return generate
+
+
+def _batched(make):
+    def generate(rng, v):
+        return {skill: _questions(make, rng, skill, int(v["num"])) for skill in _split_list(v["skills"])}
+    return generate
+
+
+def _scenario(rng, v):
+    # the level 3 prompt doesn't name the skill, use the job title instead
+    return _questions(synthetic_scenario, rng, v["title"], int(v["num"]))
+
+
+def _synthetic_templates():
+    from app.langgraph import prompts
+    generators = [
+        (prompts.jd_parsing_prompt, _synthetic_jd),
+        (prompts.resume_parsing_prompt, _synthetic_resume),
+        (prompts.lvl1_prompt_template, _per_skill(synthetic_mcq)),
+        (prompts.lvl2_prompt_template, _per_skill(synthetic_msq)),
+        (prompts.lvl3_prompt_template, _scenario),
+        (prompts.lvl1_batch_prompt_template, _batched(synthetic_mcq)),
+        (prompts.lvl2_batch_prompt_template, _batched(synthetic_msq)),
+        (prompts.lvl3_batch_prompt_template, _batched(synthetic_scenario)),
+    ]
+    return [(_template_regex(template)[0], generate) for template, generate in generators]
+
+
+class SyntheticLLMError(RuntimeError):
+    pass
+
+
+LATENCY_DISTRIBUTIONS = ("fixed", "uniform", "exponential", "lognormal")
+# spread of the lognormal distribution, ~p99 at 3x the median
+LOGNORMAL_SIGMA = 0.5
+
+
+def sample_latency(mean: float, distribution: str = "fixed") -> float:
+    """A latency drawn from `distribution` with the given mean."""
+    if mean <= 0 or distribution == "fixed":
+        return max(mean, 0.0)
+    if distribution == "uniform":
+        return random.uniform(0, 2 * mean)
+    if distribution == "exponential":
+        return random.expovariate(1 / mean)
+    if distribution == "lognormal":
+        return random.lognormvariate(math.log(mean) - LOGNORMAL_SIGMA ** 2 / 2, LOGNORMAL_SIGMA)
+    raise ValueError(f"Unknown latency distribution {distribution!r}")
+
+
+class SyntheticChatModel(_CannedChatModel):
+    """
+    Generates schema-valid JSON for each of the app's prompt templates,
+    deterministically per prompt. Unknown prompts get an empty JSON object.
+    Latency is drawn from `latency_distribution` around `latency_seconds`
+    and `error_rate` of the requests fail, for load testing.
+    """
+
+    latency_seconds: float = 0.0
+    latency_distribution: str = "fixed"
+    error_rate: float = 0.0
+    model_name: str = "synthetic"
+
+    @property
+    def _llm_type(self) -> str:
+        return "synthetic"
+
+    def _generate_content(self, messages: List[BaseMessage]) -> str:
+        text = messages[-1].content if messages else ""
+        rng = random.Random(prompt_hash(messages))
+        for regex, generate in _templates():
+            match = regex.match(text)
+            if match:
+                return json.dumps(generate(rng, match.groupdict()))
+        return "{}"
+
+    def _respond(self, messages):
+        content = self._generate_content(messages)
+        latency = sample_latency(self.latency_seconds, self.latency_distribution)
+        return content, latency, None, _estimate_usage(messages, content)
+
+    def _failure(self):
+        if self.error_rate and random.random() < self.error_rate:
+            return SyntheticLLMError("Synthetic LLM failure")
+        return None
+
+
+_compiled_templates = None
+
+
+def _templates():
+    global _compiled_templates
+    if _compiled_templates is None:
+        _compiled_templates = _synthetic_templates()
+    return _compiled_templates
+
+
+def build_chat_model(backend: str, make_openai, cassette_path: str, replay_latency_scale: float = 1.0,
+                     synthetic_latency_seconds: float = 0.0, synthetic_latency_distribution: str = "fixed",
+                     synthetic_error_rate: float = 0.0, callbacks: Optional[list] = None) -> BaseChatModel:
+    """
+    Chat model for LLM_BACKEND. `make_openai` builds the real model, it is
+    only called by the backends that need the network. `callbacks` go on the
+    outermost model so a recorded call is only counted once.
+    """
+    if backend == "openai":
+        model = make_openai()
+    elif backend == "record":
+        model = RecordingChatModel(inner=make_openai(), cassette=Cassette(cassette_path))
+    elif backend == "replay":
+        model = ReplayChatModel(cassette=Cassette(cassette_path), latency_scale=replay_latency_scale)
+    elif backend == "synthetic":
+        model = SyntheticChatModel(latency_seconds=synthetic_latency_seconds,
+                                   latency_distribution=synthetic_latency_distribution,
+                                   error_rate=synthetic_error_rate)
+    else:
+        raise ValueError(f"Unknown LLM_BACKEND {backend!r}")
+    model.callbacks = callbacks
+    return model
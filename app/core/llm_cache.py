@@ -0,0 +1,334 @@
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+
+from app.core.metrics import registry
+
+llm_cache_requests = registry.counter(
+    "llm_cache_requests_total",
+    "LLM response cache lookups, by result (memory_hit, disk_hit, miss)",
+    ["result"])
+llm_cache_stores = registry.counter(
+    "llm_cache_stores_total", "Completions stored in the LLM response cache")
+llm_cache_evictions = registry.counter(
+    "llm_cache_evictions_total",
+    "Entries evicted from the LLM response cache, by tier (memory, disk)",
+    ["tier"])
+llm_cache_latency_saved = registry.counter(
+    "llm_cache_latency_saved_seconds_total",
+    "Model latency of the completions served from the LLM response cache")
+llm_cache_memory_entries = registry.gauge(
+    "llm_cache_memory_entries", "Entries in the LLM response cache's memory tier")
+llm_cache_disk_bytes = registry.gauge(
+    "llm_cache_disk_bytes", "Size of the completions in the LLM response cache's SQLite tier")
+
+
+def render_prompt(prompt: Any) -> str:
+    """
+    Render whatever is passed to llm.invoke into the exact text sent to the model.
+    """
+    if isinstance(prompt, str):
+        return prompt
+    if hasattr(prompt, "to_messages"):
+        prompt = prompt.to_messages()
+    if isinstance(prompt, BaseMessage):
+        prompt = [prompt]
+    if isinstance(prompt, (list, tuple)):
+        return json.dumps(
+            [[m.type, m.content] if isinstance(m, BaseMessage) else m for m in prompt],
+            ensure_ascii=False,
+            default=str,
+        )
+    return str(prompt)
+
+
+def cache_key(model: str, temperature: Optional[float], prompt: str) -> str:
+    payload = json.dumps([model, temperature, prompt], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    """
+    Two tier (memory + SQLite) cache for LLM completions.
+
+    Entries expire after `ttl_seconds`. The memory tier is an LRU bounded by
+    entry count, the disk tier is an LRU bounded by the total size of the
+    stored completions. The `a*` methods run the disk tier in a worker
+    thread so lookups from async code don't block the event loop.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = "llm_cache.sqlite3",
+        ttl_seconds: float = 7 * 24 * 3600,
+        max_memory_entries: int = 1024,
+        max_disk_bytes: int = 256 * 1024 * 1024,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_bytes = max_disk_bytes
+        self._memory: "OrderedDict[str, Tuple[str, float, float]]" = OrderedDict()
+        # the memory tier is only held for dict operations, so the event
+        # loop never waits on SQLite I/O running in a worker thread
+        self._lock = threading.Lock()
+        self._disk_lock = threading.Lock()
+        self._conn = None
+        self._disk_bytes = 0
+        if path:
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS llm_cache (
+                    key TEXT PRIMARY KEY,
+                    content TEXT NOT NULL,
+                    latency REAL NOT NULL,
+                    expires_at REAL NOT NULL,
+                    last_access REAL NOT NULL,
+                    size INTEGER NOT NULL
+                )
+                """
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS llm_cache_last_access ON llm_cache (last_access)")
+            self._conn.execute(
+                "DELETE FROM llm_cache WHERE expires_at < ?", (time.time(),))
+            self._conn.commit()
+            row = self._conn.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM llm_cache").fetchone()
+            self._disk_bytes = row[0]
+            llm_cache_disk_bytes.set(self._disk_bytes)
+
+    def get(self, key: str) -> Optional[str]:
+        content = self._get_from_memory(key)
+        if content is None and self._conn is not None:
+            content = self._get_from_disk(key)
+        if content is None:
+            llm_cache_requests.inc(result="miss")
+        return content
+
+    async def aget(self, key: str) -> Optional[str]:
+        """`get` with the SQLite lookup run in a worker thread."""
+        content = self._get_from_memory(key)
+        if content is None and self._conn is not None:
+            content = await asyncio.to_thread(self._get_from_disk, key)
+        if content is None:
+            llm_cache_requests.inc(result="miss")
+        return content
+
+    def set(self, key: str, content: str, latency: float):
+        expires_at = self._set_in_memory(key, content, latency)
+        if self._conn is not None:
+            self._set_on_disk(key, content, latency, expires_at)
+
+    async def aset(self, key: str, content: str, latency: float):
+        """`set` with the SQLite write run in a worker thread."""
+        expires_at = self._set_in_memory(key, content, latency)
+        if self._conn is not None:
+            await asyncio.to_thread(self._set_on_disk, key, content, latency, expires_at)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._memory.pop(key, None)
+            llm_cache_memory_entries.set(len(self._memory))
+        if self._conn is not None:
+            self._delete_from_disk(key)
+
+    async def adelete(self, key: str):
+        with self._lock:
+            self._memory.pop(key, None)
+            llm_cache_memory_entries.set(len(self._memory))
+        if self._conn is not None:
+            await asyncio.to_thread(self._delete_from_disk, key)
+
+    def stats(self) -> dict:
+        """The cache's counters, as served on /metrics (llm_cache_*)."""
+        stats = {
+            "memory_hits": int(llm_cache_requests.value(result="memory_hit")),
+            "disk_hits": int(llm_cache_requests.value(result="disk_hit")),
+            "misses": int(llm_cache_requests.value(result="miss")),
+            "stores": int(llm_cache_stores.value()),
+            "evictions": int(llm_cache_evictions.value(tier="memory") + llm_cache_evictions.value(tier="disk")),
+            "latency_saved_seconds": llm_cache_latency_saved.value(),
+        }
+        with self._lock:
+            stats["memory_entries"] = len(self._memory)
+            stats["disk_bytes"] = self._disk_bytes
+        hits = stats["memory_hits"] + stats["disk_hits"]
+        total = hits + stats["misses"]
+        stats["hit_rate"] = hits / total if total else 0.0
+        return stats
+
+    def _get_from_memory(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                return None
+            content, latency, expires_at = entry
+            if expires_at < now:
+                del self._memory[key]
+                llm_cache_memory_entries.set(len(self._memory))
+                return None
+            self._memory.move_to_end(key)
+        llm_cache_requests.inc(result="memory_hit")
+        llm_cache_latency_saved.inc(latency)
+        return content
+
+    def _get_from_disk(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._disk_lock:
+            row = self._conn.execute(
+                "SELECT content, latency, expires_at FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            content, latency, expires_at = row
+            if expires_at < now:
+                self._delete_row(key)
+                self._conn.commit()
+                return None
+            self._conn.execute(
+                "UPDATE llm_cache SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+        with self._lock:
+            self._remember(key, content, latency, expires_at)
+        llm_cache_requests.inc(result="disk_hit")
+        llm_cache_latency_saved.inc(latency)
+        return content
+
+    def _set_in_memory(self, key: str, content: str, latency: float) -> float:
+        expires_at = time.time() + self.ttl_seconds
+        with self._lock:
+            self._remember(key, content, latency, expires_at)
+        llm_cache_stores.inc()
+        return expires_at
+
+    def _set_on_disk(self, key: str, content: str, latency: float, expires_at: float):
+        size = len(content.encode("utf-8"))
+        evictions = 0
+        with self._disk_lock:
+            self._delete_row(key)
+            self._conn.execute(
+                "INSERT INTO llm_cache (key, content, latency, expires_at, last_access, size) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, content, latency, expires_at, time.time(), size))
+            self._disk_bytes += size
+            while self._disk_bytes > self.max_disk_bytes:
+                oldest = self._conn.execute(
+                    "SELECT key FROM llm_cache ORDER BY last_access LIMIT 1").fetchone()
+                if oldest is None:
+                    break
+                self._delete_row(oldest[0])
+                evictions += 1
+            self._conn.commit()
+            llm_cache_disk_bytes.set(self._disk_bytes)
+        if evictions:
+            llm_cache_evictions.inc(evictions, tier="disk")
+
+    def _remember(self, key: str, content: str, latency: float, expires_at: float):
+        self._memory[key] = (content, latency, expires_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+            llm_cache_evictions.inc(tier="memory")
+        llm_cache_memory_entries.set(len(self._memory))
+
+    def _delete_from_disk(self, key: str):
+        with self._disk_lock:
+            self._delete_row(key)
+            self._conn.commit()
+
+    def _delete_row(self, key: str):
+        row = self._conn.execute(
+            "SELECT size FROM llm_cache WHERE key = ?", (key,)).fetchone()
+        if row is not None:
+            self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+            self._disk_bytes -= row[0]
+            llm_cache_disk_bytes.set(self._disk_bytes)
+
+
+class CachedChatModel:
+    """
+    Drop-in wrapper around a chat model that serves repeated prompts from cache.
+
+    Pass `use_cache=False` to `invoke`/`ainvoke`/`astream` to bypass the cache
+    for a single call (the fresh response still replaces the cached one).
+    Every other attribute is forwarded to the wrapped model.
+    """
+
+    def __init__(self, llm, cache: Optional[LLMResponseCache]):
+        self.llm = llm
+        self.cache = cache
+
+    def key_for(self, prompt: Any) -> str:
+        model = getattr(self.llm, "model_name", None) or getattr(
+            self.llm, "model", "")
+        temperature = getattr(self.llm, "temperature", None)
+        return cache_key(model, temperature, render_prompt(prompt))
+
+    def invoke(self, input, config=None, *, use_cache: bool = True, **kwargs):
+        if self.cache is None:
+            return self.llm.invoke(input, config, **kwargs)
+        key = self.key_for(input)
+        if use_cache:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return AIMessage(content=cached)
+        start = time.perf_counter()
+        response = self.llm.invoke(input, config, **kwargs)
+        self.cache.set(key, response.content, time.perf_counter() - start)
+        return response
+
+    async def ainvoke(self, input, config=None, *, use_cache: bool = True, **kwargs):
+        if self.cache is None:
+            return await self.llm.ainvoke(input, config, **kwargs)
+        key = self.key_for(input)
+        if use_cache:
+            cached = await self.cache.aget(key)
+            if cached is not None:
+                return AIMessage(content=cached)
+        start = time.perf_counter()
+        response = await self.llm.ainvoke(input, config, **kwargs)
+        await self.cache.aset(key, response.content, time.perf_counter() - start)
+        return response
+
+    async def astream(self, input, config=None, *, use_cache: bool = True, **kwargs):
+        """
+        Stream the completion chunk by chunk. A cached completion comes back
+        as a single chunk; a fresh one is cached once the stream finishes.
+        """
+        if self.cache is None:
+            async for chunk in self.llm.astream(input, config, **kwargs):
+                yield chunk
+            return
+        key = self.key_for(input)
+        if use_cache:
+            cached = await self.cache.aget(key)
+            if cached is not None:
+                yield AIMessageChunk(content=cached)
+                return
+        start = time.perf_counter()
+        parts = []
+        async for chunk in self.llm.astream(input, config, **kwargs):
+            if isinstance(chunk.content, str):
+                parts.append(chunk.content)
+            yield chunk
+        await self.cache.aset(key, "".join(parts), time.perf_counter() - start)
+
+    def forget(self, prompt: Any):
+        """Drop a cached completion, e.g. after it failed to parse."""
+        if self.cache is not None:
+            self.cache.delete(self.key_for(prompt))
+
+    async def aforget(self, prompt: Any):
+        if self.cache is not None:
+            await self.cache.adelete(self.key_for(prompt))
+
+    def __getattr__(self, name):
+        return getattr(self.llm, name)
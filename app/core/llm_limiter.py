@@ -0,0 +1,340 @@
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import Any, Optional
+
+from app.core.llm_cache import render_prompt
+from app.core.metrics import registry
+
+# Priority classes, lower goes first. Interactive is candidate/recruiter
+# traffic someone is waiting on, background is resume parsing, question
+# pools and speculative prefetches.
+INTERACTIVE = 0
+BACKGROUND = 1
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BACKGROUND: "background"}
+
+
+
+class PriorityGroup:
+    """
+    Priority shared by the LLM calls of a task that someone may start waiting
+    on later (a prefetch), raised for all of them with LLMLimiter.promote.
+    """
+
+    def __init__(self, priority: int):
+        self.priority = priority
+
+
+_priority: ContextVar[Any] = ContextVar("llm_priority", default=INTERACTIVE)
+
+queue_wait_seconds = registry.histogram(
+    "llm_limiter_queue_wait_seconds",
+    "Time LLM requests spent waiting for the limiter",
+    ["priority"])
+limiter_requests = registry.counter(
+    "llm_limiter_requests_total",
+    "LLM requests admitted by the limiter",
+    ["priority"])
+limiter_in_flight = registry.gauge(
+    "llm_limiter_in_flight", "LLM requests currently in flight")
+limiter_queued = registry.gauge(
+    "llm_limiter_queued", "LLM requests waiting for the limiter", ["priority"])
+
+
+@contextmanager
+def llm_priority(priority):
+    """
+    Run the LLM calls made inside the block (and tasks it spawns) at
+    `priority`, a priority class or a PriorityGroup.
+    """
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def current_priority() -> int:
+    priority = _priority.get()
+    if isinstance(priority, PriorityGroup):
+        return priority.priority
+    return priority
+
+
+def _current_group() -> Optional[PriorityGroup]:
+    priority = _priority.get()
+    return priority if isinstance(priority, PriorityGroup) else None
+
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token for English text, good enough for budgeting;
+    # the reservation is reconciled with the reported usage afterwards
+    return len(text) // 4 + 1
+
+
+class Reservation:
+    def __init__(self, tokens: int, priority: int, group: Optional[PriorityGroup] = None):
+        self.tokens = tokens
+        self.priority = priority
+        self.group = group
+        self.used_tokens: Optional[int] = None
+        self.granted = False
+        self.cancelled = False
+        self._wake = None
+
+    def record_usage(self, tokens: Optional[int]):
+        """Actual tokens reported by the provider, replaces the estimate on release."""
+        if tokens:
+            self.used_tokens = tokens
+
+
+class _Bucket:
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        self.level = per_minute
+        self.updated = time.monotonic()
+
+    def refill(self, now: float):
+        self.level = min(self.capacity, self.level +
+                         (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_for(self, amount: float) -> float:
+        # a request larger than the whole bucket only needs a full bucket
+        missing = min(amount, self.capacity) - self.level
+        return max(missing, 0) / self.rate
+
+
+class LLMLimiter:
+    """
+    Process-wide admission control for LLM requests: at most `max_in_flight`
+    concurrent requests, plus requests-per-minute and tokens-per-minute token
+    buckets. 0 disables a limit.
+
+    Waiters are admitted strictly by priority, then arrival order. It is
+    shared by every thread and event loop in the process (the API loop, the
+    threadpool running sync routes and the resume worker's loop).
+    """
+
+    def __init__(self, max_in_flight: int = 0, requests_per_minute: int = 0, tokens_per_minute: int = 0):
+        self.max_in_flight = max_in_flight
+        self._requests = _Bucket(
+            requests_per_minute) if requests_per_minute else None
+        self._tokens = _Bucket(tokens_per_minute) if tokens_per_minute else None
+        self._in_flight = 0
+        self._waiters = []
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+
+    # -- admission -----------------------------------------------------
+
+    def _dispatch(self) -> float:
+        """
+        Admit queued requests while the limits allow. Returns how long the
+        head of the queue has to wait for the buckets to refill (0 if it is
+        waiting on concurrency or the queue is empty). Caller holds the lock.
+        """
+        now = time.monotonic()
+        for bucket in (self._requests, self._tokens):
+            if bucket is not None:
+                bucket.refill(now)
+        while self._waiters:
+            _, _, reservation = self._waiters[0]
+            if reservation.cancelled:
+                heapq.heappop(self._waiters)
+                continue
+            if self.max_in_flight and self._in_flight >= self.max_in_flight:
+                return 0
+            delay = max(
+                self._requests.wait_for(1) if self._requests else 0,
+                self._tokens.wait_for(
+                    reservation.tokens) if self._tokens else 0,
+            )
+            if delay > 0:
+                return delay
+            heapq.heappop(self._waiters)
+            if self._requests is not None:
+                self._requests.level -= 1
+            if self._tokens is not None:
+                self._tokens.level -= reservation.tokens
+            self._in_flight += 1
+            reservation.granted = True
+            limiter_in_flight.set(self._in_flight)
+            limiter_queued.dec(
+                priority=PRIORITY_NAMES.get(reservation.priority))
+            reservation._wake()
+        return 0
+
+    def _enqueue(self, reservation: Reservation, wake) -> float:
+        reservation._wake = wake
+        limiter_queued.inc(priority=PRIORITY_NAMES.get(reservation.priority))
+        heapq.heappush(self._waiters, (reservation.priority,
+                       next(self._seq), reservation))
+        return self._dispatch()
+
+    def _admitted(self, reservation: Reservation, queued_at: float):
+        priority = PRIORITY_NAMES.get(reservation.priority)
+        queue_wait_seconds.observe(
+            time.monotonic() - queued_at, priority=priority)
+        limiter_requests.inc(priority=priority)
+
+    def acquire(self, tokens: int, priority: Optional[int] = None) -> Reservation:
+        """Blocking acquire for sync callers."""
+        reservation = Reservation(tokens, current_priority()
+                                  if priority is None else priority, _current_group())
+        queued_at = time.monotonic()
+        event = threading.Event()
+        with self._lock:
+            delay = self._enqueue(reservation, event.set)
+        while not event.is_set():
+            # wake up to re-check the buckets, nothing else refills them
+            event.wait(min(delay, 1.0) if delay else 1.0)
+            with self._lock:
+                delay = self._dispatch()
+        self._admitted(reservation, queued_at)
+        return reservation
+
+    async def aacquire(self, tokens: int, priority: Optional[int] = None) -> Reservation:
+        reservation = Reservation(tokens, current_priority()
+                                  if priority is None else priority, _current_group())
+        queued_at = time.monotonic()
+        loop = asyncio.get_running_loop()
+        admitted = loop.create_future()
+
+        def wake():
+            # may be called from another thread's dispatch
+            loop.call_soon_threadsafe(
+                lambda: admitted.done() or admitted.set_result(None))
+
+        with self._lock:
+            delay = self._enqueue(reservation, wake)
+        try:
+            while not admitted.done():
+                try:
+                    await asyncio.wait_for(asyncio.shield(admitted), min(delay, 1.0) if delay else 1.0)
+                except asyncio.TimeoutError:
+                    with self._lock:
+                        delay = self._dispatch()
+        except asyncio.CancelledError:
+            with self._lock:
+                if reservation.granted:
+                    self._release_locked(reservation)
+                else:
+                    reservation.cancelled = True
+                    limiter_queued.dec(
+                        priority=PRIORITY_NAMES.get(reservation.priority))
+            raise
+        self._admitted(reservation, queued_at)
+        return reservation
+
+    def promote(self, group: PriorityGroup, priority: int):
+        """
+        Raise a group to `priority`: its queued requests move up the queue,
+        later ones are made at the new priority.
+        """
+        with self._lock:
+            if priority >= group.priority:
+                return
+            group.priority = priority
+            for i, (_, seq, reservation) in enumerate(self._waiters):
+                if reservation.group is group and not reservation.cancelled and priority < reservation.priority:
+                    limiter_queued.dec(
+                        priority=PRIORITY_NAMES.get(reservation.priority))
+                    limiter_queued.inc(priority=PRIORITY_NAMES.get(priority))
+                    reservation.priority = priority
+                    self._waiters[i] = (priority, seq, reservation)
+            heapq.heapify(self._waiters)
+            self._dispatch()
+
+    def release(self, reservation: Reservation):
+        with self._lock:
+            self._release_locked(reservation)
+
+    def _release_locked(self, reservation: Reservation):
+        self._in_flight -= 1
+        if self._tokens is not None and reservation.used_tokens is not None:
+            # reconcile the estimate with the real usage, the bucket may go
+            # negative and then holds later requests back until it refills
+            self._tokens.level += reservation.tokens - reservation.used_tokens
+        limiter_in_flight.set(self._in_flight)
+        self._dispatch()
+
+    @contextmanager
+    def limit(self, tokens: int, priority: Optional[int] = None):
+        reservation = self.acquire(tokens, priority)
+        try:
+            yield reservation
+        finally:
+            self.release(reservation)
+
+    @asynccontextmanager
+    async def alimit(self, tokens: int, priority: Optional[int] = None):
+        reservation = await self.aacquire(tokens, priority)
+        try:
+            yield reservation
+        finally:
+            self.release(reservation)
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._dispatch()
+            return {
+                "in_flight": self._in_flight,
+                "queued": sum(1 for _, _, r in self._waiters if not r.cancelled),
+                "requests_available": self._requests.level if self._requests else None,
+                "tokens_available": self._tokens.level if self._tokens else None,
+            }
+
+
+def _usage_tokens(message: Any) -> Optional[int]:
+    usage = getattr(message, "usage_metadata", None)
+    if usage:
+        return usage.get("total_tokens")
+    return None
+
+
+class RateLimitedChatModel:
+    """
+    Chat model wrapper that takes a limiter slot for every request. Tokens
+    are estimated from the prompt plus `completion_tokens`, or `max_tokens`
+    when the model sets one, and reconciled with the usage it reports.
+    Every other attribute is forwarded to the wrapped model.
+    """
+
+    def __init__(self, llm, limiter: LLMLimiter, completion_tokens: int = 1024):
+        self.llm = llm
+        self.limiter = limiter
+        self.completion_tokens = completion_tokens
+
+    def _estimate(self, input) -> int:
+        completion = getattr(self.llm, "max_tokens",
+                             None) or self.completion_tokens
+        return estimate_tokens(render_prompt(input)) + completion
+
+    def invoke(self, input, config=None, **kwargs):
+        with self.limiter.limit(self._estimate(input)) as reservation:
+            response = self.llm.invoke(input, config, **kwargs)
+            reservation.record_usage(_usage_tokens(response))
+            return response
+
+    async def ainvoke(self, input, config=None, **kwargs):
+        async with self.limiter.alimit(self._estimate(input)) as reservation:
+            response = await self.llm.ainvoke(input, config, **kwargs)
+            reservation.record_usage(_usage_tokens(response))
+            return response
+
+    async def astream(self, input, config=None, **kwargs):
+        async with self.limiter.alimit(self._estimate(input)) as reservation:
+            used = 0
+            async for chunk in self.llm.astream(input, config, **kwargs):
+                used += _usage_tokens(chunk) or 0
+                yield chunk
+            reservation.record_usage(used)
+
+    def __getattr__(self, name):
+        return getattr(self.llm, name)
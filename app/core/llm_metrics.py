@@ -0,0 +1,231 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+
+from app.core.metrics import registry
+
+# USD per 1M prompt / completion tokens
+MODEL_PRICES = {
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4o-mini": (0.15, 0.60),
+}
+
+_LABELS = ["graph", "node", "model"]
+
+llm_calls = registry.counter(
+    "llm_calls_total", "LLM requests by graph and node", _LABELS + ["status"])
+llm_call_duration = registry.histogram(
+    "llm_call_duration_seconds", "Wall time of LLM requests", _LABELS)
+llm_prompt_tokens = registry.counter(
+    "llm_prompt_tokens_total", "Prompt tokens sent to the LLM", _LABELS)
+llm_completion_tokens = registry.counter(
+    "llm_completion_tokens_total", "Completion tokens returned by the LLM", _LABELS)
+llm_cost = registry.counter(
+    "llm_cost_usd_total", "Estimated LLM cost in USD", _LABELS)
+llm_retries = registry.counter(
+    "llm_retries_total", "LLM requests re-issued after a failed validation", ["graph", "node"])
+
+# assessment_id -> usage, bounded so finished assessments age out
+MAX_TRACKED_ASSESSMENTS = 1000
+MAX_CALLS_PER_ASSESSMENT = 500
+_assessments: "OrderedDict[str, dict]" = OrderedDict()
+_tests: "OrderedDict[str, dict]" = OrderedDict()
+_usage_lock = threading.Lock()
+
+
+def call_cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    prices = MODEL_PRICES.get(model)
+    if prices is None:
+        # dated snapshots, e.g. gpt-4o-2024-08-06
+        prices = next((p for m, p in MODEL_PRICES.items()
+                      if model.startswith(m + "-")), (0.0, 0.0))
+    return (prompt_tokens * prices[0] + completion_tokens * prices[1]) / 1_000_000
+
+
+def call_tags(metadata: Optional[dict]) -> dict:
+    """
+    Where a call came from. Graph runs tag it through LangGraph's metadata
+    (node, checkpoint namespace, thread_id and test_id from the configurable),
+    everything else passes explicit `graph`/`node` metadata.
+    """
+    metadata = metadata or {}
+    graph = metadata.get("graph")
+    if graph is None:
+        # e.g. "level1_graph:<task id>|llm_lvl1_mcqs:<task id>"
+        namespace = metadata.get("langgraph_checkpoint_ns") or ""
+        parts = namespace.split("|")
+        graph = parts[-2].split(":")[0] if len(parts) > 1 else "root"
+    return {
+        "graph": graph,
+        "node": metadata.get("node") or metadata.get("langgraph_node") or "",
+        "skill": metadata.get("skill"),
+        "attempt": metadata.get("attempt") or 0,
+        "test_id": metadata.get("test_id"),
+        "assessment_id": metadata.get("assessment_id") or metadata.get("thread_id"),
+    }
+
+
+def _empty_usage() -> dict:
+    return {"calls": 0, "errors": 0, "retries": 0, "prompt_tokens": 0, "completion_tokens": 0,
+            "cost_usd": 0.0, "duration_seconds": 0.0, "by_node": {}}
+
+
+def _add_usage(usage: dict, record: dict):
+    node = usage["by_node"].setdefault(f'{record["graph"]}/{record["node"]}', {
+        "calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "cost_usd": 0.0, "duration_seconds": 0.0})
+    for target in (usage, node):
+        target["calls"] += 1
+        target["prompt_tokens"] += record["prompt_tokens"]
+        target["completion_tokens"] += record["completion_tokens"]
+        target["cost_usd"] += record["cost_usd"]
+        target["duration_seconds"] += record["duration_seconds"]
+    if record["status"] != "ok":
+        usage["errors"] += 1
+    if record["attempt"]:
+        usage["retries"] += 1
+
+
+def _tracked(store: "OrderedDict[str, dict]", key: str, **fields) -> dict:
+    entry = store.get(key)
+    if entry is None:
+        entry = store[key] = {**fields, **_empty_usage()}
+        while len(store) > MAX_TRACKED_ASSESSMENTS:
+            store.popitem(last=False)
+    store.move_to_end(key)
+    return entry
+
+
+def record_llm_call(model: str, duration: float, prompt_tokens: int = 0, completion_tokens: int = 0,
+                    status: str = "ok", **tags):
+    """Aggregate one LLM request into the metrics and the per assessment/test usage."""
+    tags = {**call_tags(None), **tags}
+    model = model or "unknown"
+    prompt_tokens = prompt_tokens or 0
+    completion_tokens = completion_tokens or 0
+    cost = call_cost(model, prompt_tokens, completion_tokens)
+    labels = {"graph": tags["graph"], "node": tags["node"], "model": model}
+
+    llm_calls.inc(status=status, **labels)
+    llm_call_duration.observe(duration, **labels)
+    llm_prompt_tokens.inc(prompt_tokens, **labels)
+    llm_completion_tokens.inc(completion_tokens, **labels)
+    llm_cost.inc(cost, **labels)
+    if tags["attempt"]:
+        llm_retries.inc(graph=tags["graph"], node=tags["node"])
+
+    assessment_id, test_id = tags["assessment_id"], tags["test_id"]
+    if not assessment_id and not test_id:
+        return
+    record = {
+        **tags,
+        "model": model,
+        "status": status,
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "cost_usd": cost,
+        "duration_seconds": duration,
+        "timestamp": time.time(),
+    }
+    with _usage_lock:
+        if assessment_id:
+            usage = _tracked(_assessments, assessment_id,
+                             assessment_id=assessment_id, test_id=test_id, calls_log=[])
+            usage["test_id"] = usage["test_id"] or test_id
+            _add_usage(usage, record)
+            if len(usage["calls_log"]) < MAX_CALLS_PER_ASSESSMENT:
+                usage["calls_log"].append(record)
+        if test_id:
+            _add_usage(_tracked(_tests, test_id, test_id=test_id), record)
+
+
+def _copy_usage(usage: Optional[dict]) -> Optional[dict]:
+    if usage is None:
+        return None
+    copy = {k: v for k, v in usage.items() if k not in ("by_node", "calls_log")}
+    copy["by_node"] = {k: dict(v) for k, v in usage["by_node"].items()}
+    if "calls_log" in usage:
+        copy["calls_log"] = [dict(r) for r in usage["calls_log"]]
+    return copy
+
+
+def get_assessment_usage(assessment_id: str) -> Optional[dict]:
+    """Totals, per node breakdown and the individual calls of an assessment."""
+    with _usage_lock:
+        return _copy_usage(_assessments.get(assessment_id))
+
+
+def get_test_usage(test_id: str) -> Optional[dict]:
+    """Totals of a test: its question pool plus every assessment run against it."""
+    with _usage_lock:
+        return _copy_usage(_tests.get(test_id))
+
+
+def _usage_from_result(response: LLMResult) -> Dict[str, Any]:
+    output = response.llm_output or {}
+    token_usage = output.get("token_usage") or {}
+    prompt = token_usage.get("prompt_tokens")
+    completion = token_usage.get("completion_tokens")
+    model = output.get("model_name")
+    if prompt is None:
+        # streamed responses only carry usage on the message
+        for generations in response.generations:
+            for generation in generations:
+                message = getattr(generation, "message", None)
+                usage = getattr(message, "usage_metadata", None)
+                if usage:
+                    prompt = (prompt or 0) + usage.get("input_tokens", 0)
+                    completion = (completion or 0) + \
+                        usage.get("output_tokens", 0)
+                meta = getattr(message, "response_metadata", None) or {}
+                model = model or meta.get("model_name")
+    return {"prompt_tokens": prompt or 0, "completion_tokens": completion or 0, "model": model}
+
+
+class LLMMetricsHandler(BaseCallbackHandler):
+    """
+    Callback handler attached to the chat model. Times every request and
+    records its tokens and cost under the graph/node it was made from.
+    """
+
+    # cheap and thread safe, no need to hop to an executor for async runs
+    run_inline = True
+
+    def __init__(self):
+        self._runs: Dict[UUID, tuple] = {}
+        self._lock = threading.Lock()
+
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, metadata: Optional[dict] = None, **kwargs):
+        params = kwargs.get("invocation_params") or {}
+        model = params.get("model") or params.get("model_name")
+        with self._lock:
+            self._runs[run_id] = (time.perf_counter(),
+                                  call_tags(metadata), model)
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs):
+        self._finish(run_id, "ok", _usage_from_result(response))
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs):
+        self._finish(run_id, "error", {})
+
+    def _finish(self, run_id: UUID, status: str, usage: dict):
+        with self._lock:
+            run = self._runs.pop(run_id, None)
+        if run is None:
+            return
+        started, tags, model = run
+        record_llm_call(
+            usage.get("model") or model,
+            time.perf_counter() - started,
+            usage.get("prompt_tokens", 0),
+            usage.get("completion_tokens", 0),
+            status=status,
+            **tags,
+        )
+
+
+llm_metrics_handler = LLMMetricsHandler()
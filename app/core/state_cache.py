@@ -0,0 +1,121 @@
+from collections import OrderedDict
+from typing import Optional, Tuple
+from langgraph.types import StateSnapshot
+from app.core.checkpoint_serde import packed_size
+from app.core.checkpointer import checkpoint_write_hooks, latest_checkpoint_id
+from app.core.config import CHECKPOINT_BACKEND, STATE_CACHE_MAX_BYTES
+from app.core.metrics import registry
+
+# Every aget_state loads and deserializes the thread's whole checkpoint,
+# while the submit endpoints only check the current level and whether the
+# graph has finished. The latest snapshot of each thread is kept here: it is
+# dropped whenever the checkpointer writes to the thread and before the
+# graph is resumed, and loaded again by the first aget_state after the run.
+# A snapshot is only stored if its thread wasn't written while it was being
+# read: a reader that doesn't hold the thread lock could otherwise store the
+# state from before a write after the write dropped the entry.
+# With postgres other API processes may write the thread as well, so a hit
+# is only used if it is still the thread's latest checkpoint.
+
+state_cache_requests = registry.counter(
+    "state_cache_requests_total",
+    "State snapshot lookups, by result (hit, miss, stale)",
+    ["result"])
+state_cache_bytes = registry.gauge(
+    "state_cache_bytes",
+    "msgpack size of the cached state snapshots")
+state_cache_entries = registry.gauge(
+    "state_cache_entries",
+    "Threads with a cached state snapshot")
+
+
+# threads whose last write is remembered, older ones fall back to _forgotten
+MAX_TRACKED_WRITES = 100_000
+
+
+class StateSnapshotCache:
+    """LRU of the latest StateSnapshot per thread_id, bounded by size in bytes."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, Tuple[StateSnapshot, int]]" = OrderedDict()
+        self._bytes = 0
+        # write sequence: thread_id -> sequence number of its last write
+        self._seq = 0
+        self._writes: "OrderedDict[str, int]" = OrderedDict()
+        self._forgotten = 0
+
+    def read_token(self) -> int:
+        """Taken before reading a snapshot, passed to put."""
+        return self._seq
+
+    def _written_since(self, thread_id: str, token: int) -> bool:
+        return self._writes.get(thread_id, self._forgotten) > token
+
+    def get(self, thread_id: str) -> Optional[StateSnapshot]:
+        entry = self._entries.get(thread_id)
+        if entry is None:
+            return None
+        self._entries.move_to_end(thread_id)
+        return entry[0]
+
+    def put(self, thread_id: str, snapshot: StateSnapshot, token: int):
+        """Store the snapshot unless the thread was written since `token`."""
+        if not self.max_bytes or not snapshot.values or self._written_since(thread_id, token):
+            return
+        size = packed_size(snapshot.values)
+        self._drop(thread_id)
+        if size > self.max_bytes:
+            return
+        self._entries[thread_id] = (snapshot, size)
+        self._bytes += size
+        while self._bytes > self.max_bytes:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self._bytes -= evicted
+        self._update_gauges()
+
+    def invalidate(self, thread_id: str):
+        """Drop the thread's snapshot, on every write to the thread."""
+        self._seq += 1
+        self._writes[thread_id] = self._seq
+        self._writes.move_to_end(thread_id)
+        if len(self._writes) > MAX_TRACKED_WRITES:
+            _, self._forgotten = self._writes.popitem(last=False)
+        self._drop(thread_id)
+
+    def _drop(self, thread_id: str):
+        entry = self._entries.pop(thread_id, None)
+        if entry is not None:
+            self._bytes -= entry[1]
+            self._update_gauges()
+
+    def _update_gauges(self):
+        state_cache_bytes.set(self._bytes)
+        state_cache_entries.set(len(self._entries))
+
+    def stats(self) -> dict:
+        return {"entries": len(self._entries), "bytes": self._bytes, "max_bytes": self.max_bytes}
+
+
+state_cache = StateSnapshotCache(STATE_CACHE_MAX_BYTES)
+checkpoint_write_hooks.append(state_cache.invalidate)
+
+
+async def get_state(graph, config: dict) -> StateSnapshot:
+    """graph.aget_state(config), answered from the cache when possible."""
+    thread_id = config["configurable"]["thread_id"]
+    snapshot = state_cache.get(thread_id)
+    if snapshot is not None and CHECKPOINT_BACKEND == "postgres":
+        if await latest_checkpoint_id(thread_id) != snapshot.config["configurable"]["checkpoint_id"]:
+            state_cache_requests.inc(result="stale")
+            state_cache.invalidate(thread_id)
+            snapshot = None
+    if snapshot is not None:
+        state_cache_requests.inc(result="hit")
+        return snapshot
+    if STATE_CACHE_MAX_BYTES:
+        state_cache_requests.inc(result="miss")
+    token = state_cache.read_token()
+    snapshot = await graph.aget_state(config)
+    state_cache.put(thread_id, snapshot, token)
+    return snapshot
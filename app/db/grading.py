@@ -0,0 +1,53 @@
+from typing import Dict, List
+import json
+
+from sqlalchemy import delete, insert, select
+
+from app.db.database import AsyncSessionLocal
+from app.db.models import AnswerKeyOverride, LevelSubmission
+from app.langgraph.other.answer_key import AnswerKey
+
+# What grading keeps outside the graph state: every graded level as
+# submission entries (see answer_key.submission_entries), so a regrade reads
+# a test's answers with one query instead of a checkpoint per assessment,
+# and the keys recruiters corrected, which both live grading and later
+# regrades apply.
+
+
+async def record_level_submissions(submissions: List[dict]):
+    """
+    Store graded levels, dicts with assessment_id, test_id, level and
+    entries. A level that is stored again (e.g. a graph node rerun after a
+    crash) replaces the earlier row.
+    """
+    if not submissions:
+        return
+    rows = [{**submission, "entries": json.dumps(submission["entries"])} for submission in submissions]
+    async with AsyncSessionLocal() as session:
+        for row in rows:
+            await session.execute(delete(LevelSubmission).where(
+                LevelSubmission.assessment_id == row["assessment_id"],
+                LevelSubmission.level == row["level"]))
+        await session.execute(insert(LevelSubmission), rows)
+        await session.commit()
+
+
+async def load_answer_key_overrides(test_id: str) -> Dict[str, AnswerKey]:
+    """question_id -> corrected key of the test's questions."""
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(select(
+            AnswerKeyOverride.question_id, AnswerKeyOverride.answer).where(AnswerKeyOverride.test_id == test_id))
+        return {question_id: json.loads(answer) for question_id, answer in result}
+
+
+async def save_answer_key_overrides(test_id: str, answer_keys: Dict[str, AnswerKey]):
+    if not answer_keys:
+        return
+    async with AsyncSessionLocal() as session:
+        await session.execute(delete(AnswerKeyOverride).where(
+            AnswerKeyOverride.test_id == test_id,
+            AnswerKeyOverride.question_id.in_(list(answer_keys))))
+        await session.execute(insert(AnswerKeyOverride), [
+            {"test_id": test_id, "question_id": question_id, "answer": json.dumps(key)}
+            for question_id, key in answer_keys.items()])
+        await session.commit()
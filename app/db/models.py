@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, ForeignKey, DateTime, Integer, ARRAY, func
+from sqlalchemy import Column, String, ForeignKey, DateTime, Integer, ARRAY, JSON, Index, func
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.db.base import Base
@@ -61,11 +61,16 @@ class Test(Base):
     recruiter = relationship('Recruiter', back_populates='tests')
     assessments = relationship('CandidateAssessment', back_populates='test')
 
+    __table_args__ = (
+        # the recruiter dashboard, keyset paginated newest first
+        Index('ix_test_recruiter_created', 'recruiter_uid', 'created_at', 'test_id'),
+    )
+
 
 class CandidateAssessment(Base):
     __tablename__ = 'candidate_assessment'
     assessment_id = Column(String, primary_key=True, index=True)
-    candidate_uid = Column(String, ForeignKey('candidate.uid'))
+    candidate_uid = Column(String, ForeignKey('candidate.uid'), index=True)
     test_id = Column(String, ForeignKey('test.test_id'))
     started_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow,
@@ -76,6 +81,11 @@ class CandidateAssessment(Base):
     candidate = relationship('Candidate', back_populates='assessments')
     test = relationship('Test', back_populates='assessments')
 
+    __table_args__ = (
+        # candidate counts by status per test
+        Index('ix_candidate_assessment_test_status', 'test_id', 'status'),
+    )
+
 
 class JobDescription(Base):
     __tablename__ = 'job_descriptions'
@@ -83,9 +93,56 @@ class JobDescription(Base):
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, nullable=False)
     company = Column(String, nullable=False)
-    # Use ARRAY if Postgres; otherwise replace with JSON
-    required_skills = Column(ARRAY(String))
-    responsibilities = Column(ARRAY(String))
-    qualifications = Column(ARRAY(String))
+    # ARRAY on Postgres, JSON on SQLite (local runs and load tests)
+    required_skills = Column(ARRAY(String).with_variant(JSON, "sqlite"))
+    responsibilities = Column(ARRAY(String).with_variant(JSON, "sqlite"))
+    qualifications = Column(ARRAY(String).with_variant(JSON, "sqlite"))
     description = Column(String, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class QuestionPool(Base):
+    __tablename__ = 'question_pool'
+    test_id = Column(String, ForeignKey('test.test_id'), primary_key=True)
+    level = Column(Integer, primary_key=True, default=1)
+    status = Column(String, default="pending")  # 'pending', 'ready' or 'failed'
+    questions = Column(String)  # JSON: skill -> list of questions
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow,
+                        onupdate=datetime.utcnow)
+
+
+class SubmissionJob(Base):
+    __tablename__ = 'submission_job'
+    job_id = Column(String, primary_key=True, index=True)
+    assessment_id = Column(String, ForeignKey(
+        'candidate_assessment.assessment_id'), index=True)
+    level = Column(Integer, nullable=False)
+    answers = Column(String)  # JSON: the submitted answers
+    # 'queued', 'grading', 'generating_next_level', 'ready' or 'failed'
+    status = Column(String, default="queued")
+    error = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow,
+                        onupdate=datetime.utcnow)
+
+
+class LevelSubmission(Base):
+    __tablename__ = 'level_submission'
+    assessment_id = Column(String, ForeignKey(
+        'candidate_assessment.assessment_id'), primary_key=True)
+    level = Column(Integer, primary_key=True)
+    test_id = Column(String, ForeignKey('test.test_id'), index=True)
+    # JSON: the graded level for regrades, one [question_id, skill, answer
+    # mask, correct option mask, *option hashes] entry per question
+    entries = Column(String)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class AnswerKeyOverride(Base):
+    __tablename__ = 'answer_key_override'
+    test_id = Column(String, ForeignKey('test.test_id'), primary_key=True)
+    question_id = Column(String, primary_key=True)
+    answer = Column(String)  # JSON: the correct option, or a list of them (MSQs)
+    updated_at = Column(DateTime, default=datetime.utcnow,
+                        onupdate=datetime.utcnow)
@@ -0,0 +1,172 @@
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+import asyncio
+import os
+import uuid
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.security import generate_password, hash_password
+from app.db.models import Candidate, CandidateAssessment, User
+
+# Adds a recruiter's upload of candidates to a test in a fixed number of
+# statements per chunk of rows instead of several round trips per row: the
+# emails are resolved with IN queries, and new users, candidate profiles and
+# assessments are inserted in batches. Users and profiles are inserted with
+# ON CONFLICT DO NOTHING where the database supports it, so an email created
+# by a concurrent upload is picked up as an existing user.
+
+CHUNK_SIZE = 5000
+HASH_CHUNK_SIZE = 500
+
+# per-row outcomes
+CREATED = "created"              # new user, added to the test
+ADDED = "added"                  # existing candidate, added to the test
+ALREADY_ADDED = "already_added"  # the candidate already had this test
+DUPLICATE = "duplicate"          # repeats an earlier row of the upload
+ERROR = "error"
+
+
+def _chunks(items: List, size: int = CHUNK_SIZE) -> Iterable[List]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _insert_ignoring_conflicts(session: AsyncSession, model):
+    dialect = session.bind.dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        return insert(model)
+    return dialect_insert(model).on_conflict_do_nothing()
+
+
+async def _resolve_emails(session: AsyncSession, emails: List[str]) -> Dict[str, Tuple[str, Optional[str]]]:
+    """email -> (user uid, candidate uid or None) of the existing users."""
+    resolved = {}
+    for chunk in _chunks(emails):
+        result = await session.execute(
+            select(User.email, User.uid, Candidate.uid)
+            .outerjoin(Candidate, Candidate.uid == User.uid)
+            .where(User.email.in_(chunk)))
+        resolved.update({email: (uid, candidate_uid) for email, uid, candidate_uid in result})
+    return resolved
+
+
+async def _assessments_of(session: AsyncSession, test_id: str, candidate_uids: List[str]) -> Dict[str, str]:
+    """candidate_uid -> assessment_id of the candidates already added to the test."""
+    existing = {}
+    for chunk in _chunks(candidate_uids):
+        result = await session.execute(
+            select(CandidateAssessment.candidate_uid, CandidateAssessment.assessment_id)
+            .where(CandidateAssessment.test_id == test_id, CandidateAssessment.candidate_uid.in_(chunk)))
+        existing.update(dict(result.all()))
+    return existing
+
+
+def _new_users(emails: List[str]) -> List[dict]:
+    now = datetime.utcnow()
+    users = []
+    for email in emails:
+        password = generate_password()
+        users.append({
+            "uid": str(uuid.uuid4()),
+            "email": email,
+            "password": password,
+            "password_hash": hash_password(password),
+            "role": "candidate",
+            "name": email.split('@')[0],  # Default name from email
+            "created_at": now,
+            "updated_at": now,
+        })
+    return users
+
+
+async def _hash_in_threads(emails: List[str]) -> List[List[dict]]:
+    # bcrypt releases the GIL: hash off the event loop, one chunk per core
+    # at a time, leaving the rest of the threadpool to other requests
+    slots = asyncio.Semaphore(os.cpu_count() or 1)
+
+    async def hash_chunk(chunk: List[str]) -> List[dict]:
+        async with slots:
+            return await run_in_threadpool(_new_users, chunk)
+    return await asyncio.gather(*[hash_chunk(chunk) for chunk in _chunks(emails, HASH_CHUNK_SIZE)])
+
+
+async def onboard_candidates(session: AsyncSession, test_id: str, rows: List[dict]) -> List[dict]:
+    """
+    Add candidates, dicts with an email and a resume_link, to a test. Returns
+    one outcome per row, in order. The caller commits and then enqueues the
+    resume parsing of the rows that have a resume_task.
+    """
+    outcomes: List[dict] = [{"email": row["email"]} for row in rows]
+    first_row: Dict[str, int] = {}
+    for i, row in enumerate(rows):
+        if row["email"] in first_row:
+            outcomes[i].update(status=DUPLICATE, duplicate_of=first_row[row["email"]])
+        else:
+            first_row[row["email"]] = i
+    emails = list(first_row)
+
+    resolved = await _resolve_emails(session, emails)
+    new_emails = [email for email in emails if email not in resolved]
+    new_users = [user for chunk in await _hash_in_threads(new_emails) for user in chunk]
+    for chunk in _chunks(new_users):
+        await session.execute(_insert_ignoring_conflicts(session, User),
+                              [{k: v for k, v in user.items() if k != "password"} for user in chunk])
+    if new_users:
+        # an email taken by a concurrent upload keeps that upload's user
+        inserted = await _resolve_emails(session, new_emails)
+        ours = [user for user in new_users if inserted.get(user["email"], (None,))[0] == user["uid"]]
+        for chunk in _chunks(ours):
+            await session.execute(_insert_ignoring_conflicts(session, Candidate), [{
+                "uid": user["uid"], "resume_text": "Waiting for resume parsing", "created_at": user["created_at"],
+            } for user in chunk])
+        resolved.update(inserted)
+        for user in ours:
+            resolved[user["email"]] = (user["uid"], user["uid"])
+        passwords = {user["email"]: user["password"] for user in ours}
+    else:
+        passwords = {}
+
+    candidate_uids = [candidate_uid for _, candidate_uid in resolved.values() if candidate_uid]
+    existing = await _assessments_of(session, test_id, candidate_uids)
+
+    now = datetime.utcnow()
+    assessments = []
+    for email, i in first_row.items():
+        outcome = outcomes[i]
+        if email not in resolved:
+            # taken by an upload that hasn't committed yet
+            outcome.update(status=ERROR, detail=f"User {email} could not be created")
+            continue
+        _, candidate_uid = resolved[email]
+        if not candidate_uid:
+            outcome.update(status=ERROR, detail=f"Candidate profile missing for {email}")
+            continue
+        outcome["candidate_uid"] = candidate_uid
+        if candidate_uid in existing:
+            outcome.update(status=ALREADY_ADDED, assessment_id=existing[candidate_uid])
+            continue
+        outcome["status"] = CREATED if email in passwords else ADDED
+        outcome["is_new_user"] = email in passwords
+        if email in passwords:
+            outcome["password"] = passwords[email]  # Include password for new users for testing purposes
+        outcome["assessment_id"] = str(uuid.uuid4())
+        outcome["resume_task"] = (candidate_uid, rows[i]["resume_link"])
+        assessments.append({
+            "assessment_id": outcome["assessment_id"], "candidate_uid": candidate_uid, "test_id": test_id,
+            "started_at": now, "updated_at": now, "status": "not_started",
+        })
+    for chunk in _chunks(assessments):
+        await session.execute(insert(CandidateAssessment), chunk)
+
+    for outcome in outcomes:
+        if outcome.get("status") == DUPLICATE:
+            first = outcomes[outcome["duplicate_of"]]
+            outcome.update({k: first[k] for k in ("candidate_uid", "assessment_id") if k in first})
+    return outcomes
@@ -0,0 +1,145 @@
+from datetime import datetime
+from typing import List, Optional, Sequence, Tuple
+import base64
+import json
+
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import CandidateAssessment, Test
+
+# Listing queries of the dashboards. Pages are keyset paginated on
+# (created_at, test_id), newest first: the cursor is the last row of the
+# previous page, so a page costs the same however deep it is and rows
+# added meanwhile don't shift the pages.
+
+# columns of Test a listing can return; jd_text only when asked for
+TEST_LIST_FIELDS = ("title", "jd_text", "created_at", "updated_at",
+                    "scheduled_start", "scheduled_end")
+DEFAULT_TEST_LIST_FIELDS = tuple(f for f in TEST_LIST_FIELDS if f != "jd_text")
+MAX_PAGE_SIZE = 200
+
+
+def encode_cursor(created_at: datetime, test_id: str) -> str:
+    data = json.dumps([created_at.isoformat(), test_id]).encode()
+    return base64.urlsafe_b64encode(data).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """(created_at, test_id) of a cursor; ValueError if it isn't one."""
+    try:
+        created_at, test_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(created_at), str(test_id)
+    except (TypeError, ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+def parse_fields(fields: Optional[str]) -> Sequence[str]:
+    """Comma separated field names, checked against TEST_LIST_FIELDS."""
+    if not fields:
+        return DEFAULT_TEST_LIST_FIELDS
+    names = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = sorted(set(names) - set(TEST_LIST_FIELDS))
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return tuple(f for f in TEST_LIST_FIELDS if f in names)
+
+
+def _after(cursor: Optional[str]):
+    if not cursor:
+        return None
+    created_at, test_id = decode_cursor(cursor)
+    return or_(Test.created_at < created_at,
+               and_(Test.created_at == created_at, Test.test_id < test_id))
+
+
+def _duration_minutes(row: dict) -> Optional[float]:
+    if row.get("scheduled_start") and row.get("scheduled_end"):
+        return (row["scheduled_end"] - row["scheduled_start"]).total_seconds() // 60
+    return None
+
+
+async def list_candidate_tests_page(
+    session: AsyncSession,
+    candidate_uid: str,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    fields: Sequence[str] = DEFAULT_TEST_LIST_FIELDS,
+) -> dict:
+    """
+    A page of the tests a candidate was added to, with their assessment,
+    in one query joining the candidate's assessments to the test columns.
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    query = select(
+        Test.test_id, Test.created_at.label("sort_key"), *[getattr(Test, f) for f in fields],
+        CandidateAssessment.assessment_id, CandidateAssessment.status,
+    ).join(Test, Test.test_id == CandidateAssessment.test_id).where(
+        CandidateAssessment.candidate_uid == candidate_uid)
+    after = _after(cursor)
+    if after is not None:
+        query = query.where(after)
+    # one extra row tells whether there is a next page
+    result = await session.execute(
+        query.order_by(Test.created_at.desc(), Test.test_id.desc()).limit(limit + 1))
+    rows = result.mappings().all()
+
+    tests = [{"test_id": row["test_id"], **{f: row[f] for f in fields},
+              "assessment_id": row["assessment_id"], "status": row["status"]}
+             for row in rows[:limit]]
+    next_cursor = None
+    if len(rows) > limit:
+        next_cursor = encode_cursor(rows[limit - 1]["sort_key"], rows[limit - 1]["test_id"])
+    return {"tests": tests, "next_cursor": next_cursor}
+
+
+async def list_recruiter_tests_page(
+    session: AsyncSession,
+    recruiter_uid: str,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    fields: Sequence[str] = DEFAULT_TEST_LIST_FIELDS,
+) -> dict:
+    """
+    A page of a recruiter's tests with their candidate counts by assessment
+    status, in one query: the page of tests, left joined to the assessment
+    counts of just those tests grouped by (test_id, status).
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    page = select(Test.test_id, Test.created_at.label("sort_key"),
+                  *[getattr(Test, f) for f in fields]).where(Test.recruiter_uid == recruiter_uid)
+    after = _after(cursor)
+    if after is not None:
+        page = page.where(after)
+    # one extra row tells whether there is a next page
+    page = page.order_by(Test.created_at.desc(), Test.test_id.desc()).limit(limit + 1).cte("page")
+    counts = select(
+        CandidateAssessment.test_id,
+        CandidateAssessment.status,
+        func.count().label("candidates"),
+    ).where(CandidateAssessment.test_id.in_(select(page.c.test_id))).group_by(
+        CandidateAssessment.test_id, CandidateAssessment.status).subquery()
+    result = await session.execute(
+        select(page, counts.c.status, counts.c.candidates)
+        .outerjoin(counts, counts.c.test_id == page.c.test_id)
+        .order_by(page.c.sort_key.desc(), page.c.test_id.desc()))
+
+    tests: List[dict] = []
+    sort_keys: List[datetime] = []
+    for row in result.mappings():
+        if not tests or tests[-1]["test_id"] != row["test_id"]:
+            sort_keys.append(row["sort_key"])
+            test = {"test_id": row["test_id"], **{f: row[f] for f in fields},
+                    "total_candidates": 0, "status_counts": {}}
+            if "scheduled_start" in fields and "scheduled_end" in fields:
+                test["duration_minutes"] = _duration_minutes(test)
+            tests.append(test)
+        if row["candidates"]:
+            tests[-1]["status_counts"][row["status"]] = row["candidates"]
+            tests[-1]["total_candidates"] += row["candidates"]
+
+    next_cursor = None
+    if len(tests) > limit:
+        tests = tests[:limit]
+        next_cursor = encode_cursor(sort_keys[limit - 1], tests[-1]["test_id"])
+    return {"tests": tests, "next_cursor": next_cursor}
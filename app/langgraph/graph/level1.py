@@ -4,6 +4,7 @@ from app.langgraph.nodes.level1 import (
     lvl1_mcq_generator,
     assign_level1_workers,
     llm_lvl1_mcqs,
+    llm_lvl1_batch_mcqs,
     llm_inference_validator,
     lvl1_mcq_synthesizer,
 )
@@ -14,6 +15,7 @@ level1_workflow_builer = StateGraph(UserState)
 level1_workflow_builer.add_node("lvl1_mcq_generator", lvl1_mcq_generator)
 level1_workflow_builer.add_node("assign_level1_workers", assign_level1_workers)
 level1_workflow_builer.add_node("llm_lvl1_mcqs", llm_lvl1_mcqs)
+level1_workflow_builer.add_node("llm_lvl1_batch_mcqs", llm_lvl1_batch_mcqs)
 level1_workflow_builer.add_node(
     "llm_inference_validator", llm_inference_validator)
 level1_workflow_builer.add_node(
@@ -22,7 +24,7 @@ level1_workflow_builer.add_node(
 
 level1_workflow_builer.add_edge(START, "lvl1_mcq_generator")
 level1_workflow_builer.add_conditional_edges(
-    "lvl1_mcq_generator", assign_level1_workers, ["llm_lvl1_mcqs"])
+    "lvl1_mcq_generator", assign_level1_workers, ["llm_lvl1_mcqs", "llm_lvl1_batch_mcqs", "lvl1_mcq_synthesizer"])
 
 level1_workflow_builer.add_edge("lvl1_mcq_synthesizer", END)
 
@@ -4,6 +4,7 @@ from app.langgraph.nodes.level2 import (
     lvl2_mcq_generator,
     assign_lvl2_skill_workers,
     llm_lvl2_mcqs,
+    llm_lvl2_batch_mcqs,
     llm_inference_validator,
     lvl2_mcq_synthesizer,
 )
@@ -16,13 +17,15 @@ level2_workflow_builder.add_node("lvl2_mcq_generator", lvl2_mcq_generator)
 level2_workflow_builder.add_node(
     "assign_lvl2_skill_workers", assign_lvl2_skill_workers)
 level2_workflow_builder.add_node("llm_lvl2_mcqs", llm_lvl2_mcqs)
+level2_workflow_builder.add_node("llm_lvl2_batch_mcqs", llm_lvl2_batch_mcqs)
 level2_workflow_builder.add_node(
     "llm_inference_validator", llm_inference_validator)
 level2_workflow_builder.add_node("lvl2_mcq_synthesizer", lvl2_mcq_synthesizer)
 # Add edges and transitions between nodes
 level2_workflow_builder.add_edge(START, "lvl2_mcq_generator")
 level2_workflow_builder.add_conditional_edges(
-    "lvl2_mcq_generator", assign_lvl2_skill_workers, ["llm_lvl2_mcqs"]
+    "lvl2_mcq_generator", assign_lvl2_skill_workers, [
+        "llm_lvl2_mcqs", "llm_lvl2_batch_mcqs", "lvl2_mcq_synthesizer"]
 )
 
 # level2_workflow_builder.add_conditional_edges(
@@ -4,6 +4,7 @@ from app.langgraph.nodes.level3 import (
     lvl3_mcq_generator,
     assign_lvl3_skill_workers,
     llm_lvl3_mcqs,
+    llm_lvl3_batch_mcqs,
     llm_inference_validator3,
     lvl3_mcq_synthesizer,
 )
@@ -15,13 +16,15 @@ level3_workflow_builder.add_node("lvl3_mcq_generator", lvl3_mcq_generator)
 level3_workflow_builder.add_node(
     "assign_lvl3_skill_workers", assign_lvl3_skill_workers)
 level3_workflow_builder.add_node("llm_lvl3_mcqs", llm_lvl3_mcqs)
+level3_workflow_builder.add_node("llm_lvl3_batch_mcqs", llm_lvl3_batch_mcqs)
 level3_workflow_builder.add_node(
     "llm_inference_validator3", llm_inference_validator3)
 level3_workflow_builder.add_node("lvl3_mcq_synthesizer", lvl3_mcq_synthesizer)
 
 level3_workflow_builder.add_edge(START, "lvl3_mcq_generator")
 level3_workflow_builder.add_conditional_edges(
-    "lvl3_mcq_generator", assign_lvl3_skill_workers, ["llm_lvl3_mcqs"]
+    "lvl3_mcq_generator", assign_lvl3_skill_workers, [
+        "llm_lvl3_mcqs", "llm_lvl3_batch_mcqs", "lvl3_mcq_synthesizer"]
 )
 # level3_workflow_builder.add_conditional_edges(
 #     "llm_lvl3_mcqs", llm_inference_validator3, ["lvl3_mcq_synthesizer"]
@@ -1,11 +1,13 @@
 # main.py
 from app.core.config import memory
+from app.core.checkpointer import get_async_memory
 from langgraph.graph import StateGraph
 from app.langgraph.models import UserState
 from app.langgraph.nodes.main.initialize_assessment import initialize_assessment
 from .level1 import level1_graph
 from .level2 import level2_graph
-from app.langgraph.nodes.main.evaluation import level1_evaluation
+from .level3 import level3_graph
+from app.langgraph.nodes.main.evaluation import level1_evaluation, level2_evaluation, level3_evaluation
 from langgraph.constants import START, END
 
 # Build the main graph
@@ -16,13 +18,30 @@ main_graph_builder.add_node("initialize_assessment", initialize_assessment)
 main_graph_builder.add_node("level1_graph", level1_graph)
 main_graph_builder.add_node("level1_evaluation", level1_evaluation)
 main_graph_builder.add_node("level2_graph", level2_graph)
+main_graph_builder.add_node("level2_evaluation", level2_evaluation)
+main_graph_builder.add_node("level3_graph", level3_graph)
+main_graph_builder.add_node("level3_evaluation", level3_evaluation)
 
 # Add Edges
 main_graph_builder.add_edge(START, "initialize_assessment")
 main_graph_builder.add_edge("initialize_assessment", "level1_graph")
 main_graph_builder.add_edge("level1_graph", "level1_evaluation")
 main_graph_builder.add_edge("level1_evaluation", "level2_graph")
-main_graph_builder.add_edge("level2_graph", END)
+main_graph_builder.add_edge("level2_graph", "level2_evaluation")
+main_graph_builder.add_edge("level2_evaluation", "level3_graph")
+main_graph_builder.add_edge("level3_graph", "level3_evaluation")
+main_graph_builder.add_edge("level3_evaluation", END)
 
 # Compile
 main_graph = main_graph_builder.compile(checkpointer=memory)
+
+# Async variant used by the API, backed by the async checkpointer
+_async_main_graph = None
+
+
+async def get_async_main_graph():
+    global _async_main_graph
+    if _async_main_graph is None:
+        _async_main_graph = main_graph_builder.compile(
+            checkpointer=await get_async_memory())
+    return _async_main_graph
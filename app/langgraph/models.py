@@ -1,6 +1,8 @@
 from typing import List, Dict, Optional, Any
 from pydantic import BaseModel
 from typing_extensions import Annotated
+import hashlib
+import json
 import operator
 
 
@@ -8,7 +10,9 @@ class Question(BaseModel):
     id: str
     text: str
     options: List[str]
-    correct_answer: Optional[str]
+    correct_answer: Optional[str] = None
+    # MSQs: every correct option (correct_answer stays unset)
+    correct_answers: Optional[List[str]] = None
     level: int
     metadata: Optional[dict] = None
 
@@ -35,14 +39,19 @@ def merge_progress_dicts(a: Dict[int, LevelProgress], b: Dict[int, LevelProgress
     for level, progress_b in b.items():
         if level in result:
             progress_a = result[level]
-            # Merge questions and answers
-            progress_a.questions += progress_b.questions
-            progress_a.answers.update(progress_b.answers)
+            # Merge questions (deduplicated by id, nodes and subgraphs may
+            # hand back questions that are already in the state) and answers
+            seen = {q.id for q in progress_a.questions}
+            questions = progress_a.questions + \
+                [q for q in progress_b.questions if q.id not in seen]
             # Handle score and completed carefully (could customize this)
-            if progress_b.score is not None:
-                progress_a.score = progress_b.score
-            if progress_b.completed:
-                progress_a.completed = True
+            result[level] = LevelProgress(
+                level=level,
+                questions=questions,
+                answers={**progress_a.answers, **progress_b.answers},
+                score=progress_b.score if progress_b.score is not None else progress_a.score,
+                completed=progress_a.completed or progress_b.completed,
+            )
         else:
             result[level] = progress_b
     return result
@@ -57,6 +66,37 @@ class JobDescription(BaseModel):
     description: Optional[str] = None
 
 
+def context_id(block: dict) -> str:
+    """Content hash of a shared context block, equal blocks share one entry."""
+    encoded = json.dumps(block, sort_keys=True, default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()[:16]
+
+
+def merge_shared_context(a: Dict[str, dict], b: Dict[str, dict]) -> Dict[str, dict]:
+    # blocks are content addressed, so an id always maps to the same data
+    return {**a, **b}
+
+
+def merge_answer_keys(a: Dict[int, Dict[str, List[int]]], b: Dict[int, Dict[str, List[int]]]) -> Dict[int, Dict[str, List[int]]]:
+    # the skill workers of a level each add the keys of their questions
+    result = a.copy()
+    for level, keys in b.items():
+        result[level] = {**result.get(level, {}), **keys}
+    return result
+
+
+def resolve_question_metadata(question: Question, shared_context: Dict[str, dict]) -> dict:
+    """
+    A question's metadata with its referenced context block (the JD or resume
+    data it was generated from) inlined.
+    """
+    metadata = dict(question.metadata or {})
+    block = shared_context.get(metadata.get("context_id"))
+    if block:
+        metadata.update(block)
+    return metadata
+
+
 class UserState(BaseModel):
     user_id: str
     job_description: JobDescription
@@ -65,6 +105,11 @@ class UserState(BaseModel):
     unlocked_levels: List[int]
     progress: Annotated[Dict[int, LevelProgress],
                         merge_progress_dicts]  # level -> LevelProgress
+    # context_id -> JD/resume data referenced from Question.metadata
+    shared_context: Annotated[Dict[str, dict], merge_shared_context] = {}
+    # level -> compiled answer key, see app/langgraph/other/answer_key.py
+    answer_keys: Annotated[Dict[int, Dict[str, List[int]]],
+                           merge_answer_keys] = {}
 
 
 class GenerateResponse(BaseModel):
@@ -125,6 +170,8 @@ def userstate_initializer(data: Optional[dict] = None) -> UserState:
             ),
             current_level=1,
             unlocked_levels=[1],
-            progress={}
+            progress={},
+            shared_context={},
+            answer_keys={}
         )
     return UserState(**data)
@@ -0,0 +1,119 @@
+from typing import Callable, Dict, List, Tuple
+import json
+from langgraph.config import get_stream_writer
+from langchain_core.runnables import ensure_config
+from langchain_core.runnables.config import merge_configs
+from app.core.config import llm
+from app.langgraph.models import Question
+from app.langgraph.other.json_stream import JSONArrayStreamParser
+from app.langgraph.other.question_repair import (
+    loads_repaired,
+    parse_valid_question_items,
+    record_outcome,
+    validate_question_item,
+)
+
+
+def emit_questions(level: int, skill: str, questions: List[Question]):
+    """
+    Push a validated batch of questions to stream_mode="custom" consumers
+    (the SSE endpoints) as soon as its skill worker finishes.
+    """
+    try:
+        writer = get_stream_writer()
+    except RuntimeError:
+        # called outside of a graph run
+        return
+    writer({
+        "level": level,
+        "skill": skill,
+        "questions": [q.model_dump() for q in questions],
+    })
+
+
+def batch_skills(skills: List[str], batch_size: int) -> List[List[str]]:
+    return [skills[i:i + batch_size] for i in range(0, len(skills), batch_size)]
+
+
+def split_batch_response(skills: List[str], llm_response: str) -> Dict[str, str]:
+    """
+    Split a multi-skill response (a JSON object keyed by skill) into the
+    per-skill JSON arrays the single-skill validators expect. Skills missing
+    from the response, or the whole batch if it doesn't parse, map to "".
+    """
+    try:
+        by_skill = loads_repaired(llm_response)
+        if not isinstance(by_skill, dict):
+            raise ValueError("Batched response should be an object")
+    except Exception as e:
+        print(f"Invalid batched response: {e}")
+        return {skill: "" for skill in skills}
+
+    # the model doesn't always keep the exact spelling/casing of the keys
+    normalized = {str(k).strip().lower(): v for k, v in by_skill.items()}
+    return {
+        skill: json.dumps(normalized[skill.strip().lower()])
+        if skill.strip().lower() in normalized else ""
+        for skill in skills
+    }
+
+
+async def stream_questions(
+    prompt: str,
+    level: int,
+    skills: List[str],
+    build: Callable[[str, dict], Question],
+    num: int,
+    keyed: bool = False,
+    attempt: int = 0,
+) -> Tuple[Dict[str, str], Dict[str, List[Question]]]:
+    """
+    Stream a question completion through the incremental parser. Every object
+    that passes the schema gate is built into a Question and emitted as soon
+    as its closing brace arrives, instead of after the whole completion.
+
+    `keyed` is for the batched prompts (an object of arrays keyed by skill),
+    otherwise the completion is a bare array for `skills[0]`. At most `num`
+    questions are kept (and emitted) per skill, the validators keep no more.
+    Skills that got nothing out of the stream fall back to the full repair
+    pass. A retry
+    (`attempt` > 0) bypasses the cache, it must not get the completion that
+    just failed.
+    Returns the raw response and the questions per skill.
+    """
+    parser = JSONArrayStreamParser(keyed=keyed)
+    by_key = {s.strip().lower(): s for s in skills}
+    questions = {s: [] for s in skills}
+    received = {s: 0 for s in skills}
+
+    # the node's config, plus tags for the LLM metrics callback
+    config = merge_configs(ensure_config(), {"metadata": {
+        "skill": ", ".join(skills), "attempt": attempt}})
+    async for chunk in llm.astream(prompt, config, use_cache=attempt == 0):
+        if not isinstance(chunk.content, str):
+            continue
+        for key, item in parser.feed(chunk.content):
+            skill = by_key.get(str(key).strip().lower()) if keyed else skills[0]
+            if skill is None or len(questions[skill]) >= num:
+                continue
+            received[skill] += 1
+            valid = validate_question_item(item, level)
+            if valid is None:
+                continue
+            question = build(skill, valid)
+            questions[skill].append(question)
+            emit_questions(level, skill, [question])
+
+    text = parser.text
+    responses = split_batch_response(
+        skills, text) if keyed else {skills[0]: text}
+    for skill in skills:
+        if questions[skill]:
+            record_outcome(
+                "clean" if len(questions[skill]) == received[skill] else "salvaged")
+            continue
+        questions[skill] = [build(skill, item) for item in
+                            parse_valid_question_items(responses[skill], level)[:num]]
+        if questions[skill]:
+            emit_questions(level, skill, questions[skill])
+    return responses, questions
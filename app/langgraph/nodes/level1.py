@@ -1,17 +1,26 @@
 from app.langgraph.models import UserState
 from langgraph.types import Send, Command, interrupt
-from typing import TypedDict, Literal
-from app.langgraph.prompts import lvl1_prompt_template
+from typing import TypedDict, Literal, List, Optional
+from app.langgraph.prompts import lvl1_prompt_template, lvl1_batch_prompt_template
 from app.langgraph.models import Question
-from app.core.config import llm
-import json
+from app.core.config import LEVEL1_QUESTIONS_PER_SKILL, QUESTION_BATCH_SIZE, MAX_QUESTION_RETRIES
 from uuid import uuid4
 from app.langgraph.models import LevelProgress
+from app.langgraph.nodes.common import batch_skills, stream_questions
+from app.langgraph.other.question_repair import parse_valid_question_items, record_outcome
+from app.langgraph.other.answer_key import compile_answer_key
 
 
 class LLMInferenceState(TypedDict):
     skill: str
     llm_response: str
+    questions: Optional[List[Question]]
+    num: int  # questions requested for the skill
+    attempt: int  # 0 for the first request, then one per retry
+
+
+class BatchInferenceState(TypedDict):
+    skills: List[str]
 
 
 def lvl1_mcq_generator(userState: UserState):
@@ -21,66 +30,118 @@ def lvl1_mcq_generator(userState: UserState):
 
 
 def assign_level1_workers(userState: UserState):
-    # Assign workers for level 1
+    # Assign workers for level 1, skipping skills already served from the
+    # test's question pool
     skills = userState.job_description.required_skills
-    return [Send('llm_lvl1_mcqs', {'skill': s}) for s in skills]
-
-
-def llm_lvl1_mcqs(state: LLMInferenceState) -> LLMInferenceState:
+    level1_progress = userState.progress.get(1)
+    covered = {q.metadata.get("skill") for q in level1_progress.questions
+               if q.metadata} if level1_progress else set()
+    pending = [s for s in skills if s not in covered]
+    if not pending:
+        return "lvl1_mcq_synthesizer"
+    if QUESTION_BATCH_SIZE > 1 and len(pending) > 1:
+        return [Send('llm_lvl1_batch_mcqs', {'skills': batch})
+                for batch in batch_skills(pending, QUESTION_BATCH_SIZE)]
+    return [Send('llm_lvl1_mcqs', {'skill': s}) for s in pending]
+
+
+async def llm_lvl1_mcqs(state: LLMInferenceState) -> LLMInferenceState:
     skill = state['skill']
-    prompt = lvl1_prompt_template.format(skill=skill, num=5)
-    response = llm.invoke(prompt)
-    return Send('llm_inference_validator', {'skill': skill, 'llm_response': response.content})
+    num = state.get('num') or LEVEL1_QUESTIONS_PER_SKILL
+    attempt = state.get('attempt', 0)
+    prompt = lvl1_prompt_template.format(skill=skill, num=num)
+    # questions are emitted one by one while the completion streams in
+    responses, questions = await stream_questions(
+        prompt, 1, [skill], build_lvl1_question, num, attempt=attempt)
+    return Send('llm_inference_validator', {
+        'skill': skill,
+        'llm_response': responses[skill],
+        'questions': questions[skill],
+        'num': num,
+        'attempt': attempt
+    })
+
+
+async def llm_lvl1_batch_mcqs(state: BatchInferenceState) -> Command[Literal["llm_inference_validator"]]:
+    # one request for several skills, split back into per-skill validations
+    skills = state['skills']
+    prompt = lvl1_batch_prompt_template.format(
+        skills=", ".join(skills), num=LEVEL1_QUESTIONS_PER_SKILL)
+    responses, questions = await stream_questions(
+        prompt, 1, skills, build_lvl1_question, LEVEL1_QUESTIONS_PER_SKILL, keyed=True)
+    sends = []
+    for skill in skills:
+        # the validator retries whatever is missing for this skill on its own
+        sends.append(Send('llm_inference_validator', {
+            'skill': skill,
+            'llm_response': responses[skill],
+            'questions': questions[skill],
+            'num': LEVEL1_QUESTIONS_PER_SKILL,
+            'attempt': 0
+        }))
+    return Command(goto=sends)
+
+
+def build_lvl1_question(skill: str, item: dict) -> Question:
+    # item has already passed the schema gate
+    return Question(
+        id=str(uuid4()),  # Generate unique id
+        text=item.get("question", ""),
+        options=item.get("options", []),
+        correct_answer=item.get("answer", ""),
+        level=1,
+        metadata={
+            "skill": skill,
+            "max_time_required": item["max_time_required"]
+        }
+    )
+
+
+def parse_lvl1_questions(skill: str, llm_response: str) -> List[Question]:
+    # repaired locally and schema checked, only valid MCQs are returned
+    lvl1_mcqs = parse_valid_question_items(llm_response, level=1)
+    return [build_lvl1_question(skill, item) for item in lvl1_mcqs]
 
 
 def llm_inference_validator(state: LLMInferenceState) -> Command[Literal["lvl1_mcq_synthesizer", "llm_lvl1_mcqs"]]:
-    try:
-        lvl1_mcqs = json.loads(state["llm_response"])
-        skill = state["skill"]
-
-        # Validate lvl1_mcqs is a list
-        if not isinstance(lvl1_mcqs, list):
-            raise ValueError("Parsed MCQs should be a list")
-
-        # Transform into List[Question]
-        questions = []
-        for item in lvl1_mcqs:
-            question = Question(
-                id=str(uuid4()),  # Generate unique id
-                text=item.get("question", ""),
-                options=item.get("options", []),
-                correct_answer=item.get("answer", ""),
+    skill = state["skill"]
+    num = state.get("num") or LEVEL1_QUESTIONS_PER_SKILL
+    attempt = state.get("attempt", 0)
+    questions = state.get("questions")
+    if questions is None:
+        questions = parse_lvl1_questions(skill, state["llm_response"])
+    questions = questions[:num]
+
+    update = {
+        "progress": {
+            1:  LevelProgress(
                 level=1,
-                metadata={
-                    "skill": skill,
-                    "max_time_required": item.get("max_time_required", 60)
-                }
+                questions=questions,
+                answers={},
+                score=None,
+                completed=False
             )
-            questions.append(question)
-
+        },
+        "answer_keys": {1: compile_answer_key(questions)}
+    } if questions else None
+
+    missing = num - len(questions)
+    if missing > 0 and attempt < MAX_QUESTION_RETRIES:
+        # keep the valid questions, only re-request the remainder
+        print(
+            f"Level 1 {skill}: {len(questions)}/{num} valid questions, re-requesting {missing}")
+        record_outcome("regenerated")
         return Command(
-            update={
-                "progress": {
-                    1:  LevelProgress(
-                        level=1,
-                        questions=questions,
-                        answers={},
-                        score=None,
-                        completed=False
-                    )
-                }
-            },
-            goto="lvl1_mcq_synthesizer"
+            update=update,
+            goto=Send("llm_lvl1_mcqs", {
+                      "skill": skill, "num": missing, "attempt": attempt + 1})
         )
+    if missing > 0:
+        print(
+            f"Level 1 {skill}: giving up with {len(questions)}/{num} questions after {attempt} retries")
+        record_outcome("gave_up")
 
-    except Exception as e:
-        print(f"Invalid JSON or format error: {e}")
-        return Command(
-            update={
-                "skill": state["skill"]  # keep the same skill to retry
-            },
-            goto="llm_lvl1_mcqs"
-        )
+    return Command(update=update, goto="lvl1_mcq_synthesizer")
 
 
 def lvl1_mcq_synthesizer(userState: UserState) -> UserState:
@@ -1,10 +1,16 @@
-from app.langgraph.models import Question, UserState, LevelProgress
+from app.langgraph.models import Question, UserState, LevelProgress, context_id
 from typing import TypedDict, Literal
 from langgraph.types import Send, Command, interrupt
-from app.langgraph.prompts import lvl2_prompt_template
-from app.core.config import llm
-import json
+from app.langgraph.prompts import lvl2_prompt_template, lvl2_batch_prompt_template
+from app.core.config import LEVEL2_QUESTIONS_PER_SKILL, QUESTION_BATCH_SIZE, MAX_QUESTION_RETRIES
+from langchain_core.runnables import RunnableConfig
 from uuid import uuid4
+from functools import partial
+from typing import List, Optional
+from collections import Counter
+from app.langgraph.nodes.common import batch_skills, stream_questions
+from app.langgraph.other.question_repair import parse_valid_question_items, record_outcome
+from app.langgraph.other.answer_key import compile_answer_key
 
 
 class LLMInferenceState(TypedDict):
@@ -12,6 +18,9 @@ class LLMInferenceState(TypedDict):
     llm_response: str
     projects: list[str]
     experience: list[str]
+    questions: Optional[List[Question]]
+    num: int  # questions requested for the skill
+    attempt: int  # 0 for the first request, then one per retry
 
 
 class SkillWorkerState(TypedDict):
@@ -20,90 +29,185 @@ class SkillWorkerState(TypedDict):
     experience: list[str]
 
 
-def lvl2_mcq_generator(userState: UserState):
+async def lvl2_mcq_generator(userState: UserState, config: RunnableConfig):
+    # imported here, the prefetch module builds on this one
+    from app.langgraph.other.level2_prefetch import take_level2_prefetch
+
     userState.current_level = 2
     userState.unlocked_levels.append(2)
+    # the resume data is stored once and referenced by every level 2 question
+    context = lvl2_context(userState.resume.projects or [],
+                           userState.resume.experience or [])
+    userState.shared_context = {
+        **userState.shared_context, context_id(context): context}
+
+    # use the questions speculatively generated during level 1, if any
+    prefetched = await take_level2_prefetch(
+        config["configurable"].get("thread_id"))
+    if prefetched:
+        userState.progress = {**userState.progress, 2: LevelProgress(
+            level=2, questions=prefetched, answers={})}
+        userState.answer_keys = {
+            **userState.answer_keys, 2: compile_answer_key(prefetched)}
     return userState
 
 
 def assign_lvl2_skill_workers(userState: UserState):
-    # Assign workers for level 2
+    # Assign workers for level 2, only for what the prefetch didn't cover
     skills = userState.job_description.required_skills
     projects = userState.resume.projects or []
     experience = userState.resume.experience or []
-    return [Send("llm_lvl2_mcqs", {
+    level2_progress = userState.progress.get(2)
+    covered = Counter(q.metadata.get("skill") for q in level2_progress.questions
+                      if q.metadata) if level2_progress else Counter()
+    pending = [s for s in skills if not covered[s]]
+    # prefetched skills with too few valid questions, only the rest is requested
+    partial = [s for s in skills if 0 < covered[s] < LEVEL2_QUESTIONS_PER_SKILL]
+    sends = [Send("llm_lvl2_mcqs", {
         "skill": s,
         "projects": projects,
-        "experience": experience
-    }) for s in skills]
-
-
-def llm_lvl2_mcqs(state: SkillWorkerState) -> SkillWorkerState:
+        "experience": experience,
+        "num": LEVEL2_QUESTIONS_PER_SKILL - covered[s]
+    }) for s in partial]
+    if QUESTION_BATCH_SIZE > 1 and len(pending) > 1:
+        sends += [Send("llm_lvl2_batch_mcqs", {
+            "skills": batch,
+            "projects": projects,
+            "experience": experience
+        }) for batch in batch_skills(pending, QUESTION_BATCH_SIZE)]
+    else:
+        sends += [Send("llm_lvl2_mcqs", {
+            "skill": s,
+            "projects": projects,
+            "experience": experience
+        }) for s in pending]
+    return sends or "lvl2_mcq_synthesizer"
+
+
+async def llm_lvl2_mcqs(state: SkillWorkerState) -> SkillWorkerState:
     skill = state["skill"]
     projects = state["projects"]
     experience = state["experience"]
+    num = state.get("num") or LEVEL2_QUESTIONS_PER_SKILL
+    attempt = state.get("attempt", 0)
     prompt = lvl2_prompt_template.format(
-        skill=skill, projects=projects, experience=experience, num=5)
+        skill=skill, projects=projects, experience=experience, num=num)
 
-    response = llm.invoke(prompt)
+    # questions are emitted one by one while the completion streams in
+    build = partial(build_lvl2_question,
+                    context_id=context_id(lvl2_context(projects, experience)))
+    responses, questions = await stream_questions(
+        prompt, 2, [skill], build, num, attempt=attempt)
     return Send("llm_inference_validator", {
         "skill": skill,
-        "llm_response": response.content,
+        "llm_response": responses[skill],
         "projects": projects,
-        "experience": experience
+        "experience": experience,
+        "questions": questions[skill],
+        "num": num,
+        "attempt": attempt
     })
 
 
+async def llm_lvl2_batch_mcqs(state: SkillWorkerState) -> Command[Literal["llm_inference_validator"]]:
+    # one request for several skills, split back into per-skill validations
+    skills = state["skills"]
+    projects = state["projects"]
+    experience = state["experience"]
+    prompt = lvl2_batch_prompt_template.format(
+        skills=", ".join(skills), projects=projects, experience=experience, num=LEVEL2_QUESTIONS_PER_SKILL)
+
+    build = partial(build_lvl2_question,
+                    context_id=context_id(lvl2_context(projects, experience)))
+    responses, questions = await stream_questions(
+        prompt, 2, skills, build, LEVEL2_QUESTIONS_PER_SKILL, keyed=True)
+    sends = []
+    for skill in skills:
+        # the validator retries whatever is missing for this skill on its own
+        sends.append(Send("llm_inference_validator", {
+            "skill": skill,
+            "llm_response": responses[skill],
+            "projects": projects,
+            "experience": experience,
+            "questions": questions[skill],
+            "num": LEVEL2_QUESTIONS_PER_SKILL,
+            "attempt": 0
+        }))
+    return Command(goto=sends)
+
+
+def lvl2_context(projects: list[str], experience: list[str]) -> dict:
+    # shared context block of the level 2 questions, see UserState.shared_context
+    return {"projects": projects, "experience": experience}
+
+
+def build_lvl2_question(skill: str, item: dict, context_id: str) -> Question:
+    # item has already passed the schema gate
+    return Question(
+        id=str(uuid4()),  # Generate unique id
+        text=item.get("question", ""),
+        options=item.get("options", []),
+        correct_answers=item.get("answers"),
+        level=2,
+        metadata={
+            "skill": skill,
+            "max_time_required": item["max_time_required"],
+            "context_id": context_id
+        }
+    )
+
+
+def parse_lvl2_questions(skill: str, llm_response: str, context_id: str) -> List[Question]:
+    # repaired locally and schema checked, only valid MSQs are returned
+    lvl2_mcqs = parse_valid_question_items(llm_response, level=2)
+    return [build_lvl2_question(skill, item, context_id) for item in lvl2_mcqs]
+
+
 def llm_inference_validator(state: LLMInferenceState) -> Command[Literal["lvl2_mcq_synthesizer", "llm_lvl2_mcqs"]]:
-    try:
-        lvl2_mcqs = json.loads(state["llm_response"])
-        skill = state["skill"]
-        projects = state["projects"]
-        experience = state["experience"]
-
-        # Validate lvl2_mcqs is a list
-        if not isinstance(lvl2_mcqs, list):
-            raise ValueError("Parsed MCQs should be a list")
-
-        # Transform into List[Question]
-        questions = []
-        for item in lvl2_mcqs:
-            question = Question(
-                id=str(uuid4()),  # Generate unique id
-                text=item.get("question", ""),
-                options=item.get("options", []),
+    skill = state["skill"]
+    num = state.get("num") or LEVEL2_QUESTIONS_PER_SKILL
+    attempt = state.get("attempt", 0)
+    questions = state.get("questions")
+    if questions is None:
+        questions = parse_lvl2_questions(skill, state["llm_response"], context_id(
+            lvl2_context(state["projects"], state["experience"])))
+    questions = questions[:num]
+
+    update = {
+        "progress": {
+            2: LevelProgress(
                 level=2,
-                metadata={
-                    "skill": skill,
-                    "max_time_required": item.get("max_time_required", 60),
-                    "projects": projects,
-                    "experience": experience
-                }
+                questions=questions,
+                answers={},
+                score=None,
+                completed=False
             )
-            questions.append(question)
-
+        },
+        "answer_keys": {2: compile_answer_key(questions)}
+    } if questions else None
+
+    missing = num - len(questions)
+    if missing > 0 and attempt < MAX_QUESTION_RETRIES:
+        # keep the valid questions, only re-request the remainder
+        print(
+            f"Level 2 {skill}: {len(questions)}/{num} valid questions, re-requesting {missing}")
+        record_outcome("regenerated")
         return Command(
-            goto="lvl2_mcq_synthesizer",
-            update={
-                "progress": {
-                    2: LevelProgress(
-                        level=2,
-                        questions=questions,
-                        answers={},
-                        score=None,
-                        completed=False
-                    )
-                }
-            }
-        )
-    except Exception as e:
-        print(f"Invalid JSON or format error: {e}")
-        return Command(
-            update={
-                "skill": state["skill"]  # keep the same skill to retry
-            },
-            goto="llm_lvl1_mcqs"
+            update=update,
+            goto=Send("llm_lvl2_mcqs", {
+                "skill": skill,
+                "projects": state["projects"],
+                "experience": state["experience"],
+                "num": missing,
+                "attempt": attempt + 1
+            })
         )
+    if missing > 0:
+        print(
+            f"Level 2 {skill}: giving up with {len(questions)}/{num} questions after {attempt} retries")
+        record_outcome("gave_up")
+
+    return Command(update=update, goto="lvl2_mcq_synthesizer")
 
 
 def lvl2_mcq_synthesizer(userState: UserState) -> UserState:
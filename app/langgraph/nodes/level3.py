@@ -1,11 +1,14 @@
-from typing import TypedDict, List
-from app.langgraph.models import UserState, LevelProgress, Question
-from app.langgraph.prompts import lvl3_prompt_template
-from app.core.config import llm
+from typing import TypedDict, List, Optional
+from app.langgraph.models import UserState, LevelProgress, Question, context_id
+from app.langgraph.prompts import lvl3_prompt_template, lvl3_batch_prompt_template
+from app.core.config import QUESTION_BATCH_SIZE, LEVEL3_QUESTIONS_PER_SKILL, MAX_QUESTION_RETRIES
 from uuid import uuid4
-import json
-from langgraph.types import Send, Command, interrupt
+from functools import partial
+from langgraph.types import Send, Command
 from typing import Literal
+from app.langgraph.nodes.common import batch_skills, stream_questions
+from app.langgraph.other.question_repair import parse_valid_question_items, record_outcome
+from app.langgraph.other.answer_key import compile_answer_key
 # Define the LLMInferenceState3 typed dict
 
 
@@ -16,6 +19,9 @@ class LLMInferenceState3(TypedDict):
     responsibilities: List[str]
     qualifications: List[str]
     llm_response: str
+    questions: Optional[List[Question]]
+    num: int  # questions requested for the skill
+    attempt: int  # 0 for the first request, then one per retry
 
 # Define the SkillWorkerInput3 typed dict
 
@@ -31,40 +37,42 @@ class SkillWorkerInput3(TypedDict):
 
 
 def lvl3_mcq_generator(state: UserState):
-    skills = state.job_description.required_skills
+    state.current_level = 3
+    state.unlocked_levels.append(3)
     jd = state.job_description
-    return {
-        "skills": skills,
-        "title": jd.title,
-        "company": jd.company,
-        "responsibilities": jd.responsibilities,
-        "qualifications": jd.qualifications,
-    }
+    # the JD is stored once and referenced by every level 3 question
+    context = lvl3_context(jd.title, jd.company,
+                           jd.responsibilities, jd.qualifications or [])
+    state.shared_context = {**state.shared_context, context_id(context): context}
+    return state
 
 # llm_lvl3_mcqs function
 
 
-def llm_lvl3_mcqs(state: LLMInferenceState3) -> Send:
+async def llm_lvl3_mcqs(state: LLMInferenceState3) -> Send:
     skill = state["skill"]
     title = state["title"]
     company = state["company"]
     responsibilities = state["responsibilities"]
     qualifications = state["qualifications"]
+    num = state.get("num") or LEVEL3_QUESTIONS_PER_SKILL
+    attempt = state.get("attempt", 0)
     prompt = lvl3_prompt_template.format(
         skill=skill,
         title=title,
         company=company,
         responsibilities="\n".join(responsibilities),
         qualifications="\n".join(qualifications),
-        num=10
+        num=num
     )
-    response = llm.invoke(prompt)
-
-    # Convert the AI message response to a string explicitly
-    response_content = str(response.content)
+    # questions are emitted one by one while the completion streams in
+    build = partial(build_lvl3_question, context_id=context_id(lvl3_context(
+        title, company, responsibilities, qualifications)))
+    responses, questions = await stream_questions(
+        prompt, 3, [skill], build, num, attempt=attempt)
+    response_content = responses[skill]
 
     print(f"LLM Response: {response_content}")
-    print(f"Response type: {type(response_content)}")
 
     return Send(
         "llm_inference_validator3",
@@ -74,110 +82,175 @@ def llm_lvl3_mcqs(state: LLMInferenceState3) -> Send:
             "title": title,
             "company": company,
             "responsibilities": responsibilities,
-            "qualifications": qualifications
+            "qualifications": qualifications,
+            "questions": questions[skill],
+            "num": num,
+            "attempt": attempt
         }
     )
 
-# assign_lvl3_skill_workers function
+# llm_lvl3_batch_mcqs function
 
 
-def assign_lvl3_skill_workers(state: SkillWorkerInput3):
-    return [
-        Send("llm_lvl3_mcqs", {
-            "skill": s,
-            "title": state["title"],
-            "company": state["company"],
-            "responsibilities": state["responsibilities"],
-            "qualifications": state["qualifications"]
-        }) for s in state["skills"]
-    ]
+async def llm_lvl3_batch_mcqs(state: SkillWorkerInput3) -> Command[Literal["llm_inference_validator3"]]:
+    # one request for several skills, split back into per-skill validations
+    skills = state["skills"]
+    title = state["title"]
+    company = state["company"]
+    responsibilities = state["responsibilities"]
+    qualifications = state["qualifications"]
+    prompt = lvl3_batch_prompt_template.format(
+        skills=", ".join(skills),
+        title=title,
+        company=company,
+        responsibilities="\n".join(responsibilities),
+        qualifications="\n".join(qualifications),
+        num=LEVEL3_QUESTIONS_PER_SKILL
+    )
+    build = partial(build_lvl3_question, context_id=context_id(lvl3_context(
+        title, company, responsibilities, qualifications)))
+    responses, questions = await stream_questions(
+        prompt, 3, skills, build, LEVEL3_QUESTIONS_PER_SKILL, keyed=True)
+
+    sends = []
+    for skill in skills:
+        # the validator retries whatever is missing for this skill on its own
+        sends.append(Send(
+            "llm_inference_validator3",
+            {
+                "llm_response": responses[skill],
+                "skill": skill,
+                "title": title,
+                "company": company,
+                "responsibilities": responsibilities,
+                "qualifications": qualifications,
+                "questions": questions[skill],
+                "num": LEVEL3_QUESTIONS_PER_SKILL,
+                "attempt": 0
+            }
+        ))
+    return Command(goto=sends)
 
-# lvl3_await_response function
+# assign_lvl3_skill_workers function
 
 
-def lvl3_await_response(state: UserState):
-    user_response = interrupt("Waiting for the lvl3 msq response")
-    return {"lvl3_response": user_response}
+def assign_lvl3_skill_workers(state: UserState):
+    skills = state.job_description.required_skills
+    if not skills:
+        return "lvl3_mcq_synthesizer"
+    jd = state.job_description
+    worker_input = {
+        "title": jd.title,
+        "company": jd.company,
+        "responsibilities": jd.responsibilities,
+        "qualifications": jd.qualifications or []
+    }
+    if QUESTION_BATCH_SIZE > 1 and len(skills) > 1:
+        return [
+            Send("llm_lvl3_batch_mcqs", {"skills": batch, **worker_input})
+            for batch in batch_skills(skills, QUESTION_BATCH_SIZE)
+        ]
+    return [Send("llm_lvl3_mcqs", {"skill": s, **worker_input}) for s in skills]
 
 # lvl3_mcq_synthesizer function
 
 
 def lvl3_mcq_synthesizer(state: UserState):
-    level_progress = state.progress.get(3)
-    mcqs = level_progress.questions
+    # the questions are in state.progress[3] (possibly none, every skill
+    # may have given up after its retries); level3_evaluation waits on them
+    return state
+
+# parse_lvl3_questions function
+
+
+def parse_lvl3_questions(skill: str, llm_response: str, context_id: str) -> List[Question]:
+    # repaired locally and schema checked, only valid MCQs/MSQs are returned
+    lvl3_mcqs = parse_valid_question_items(llm_response, level=3)
+    return [build_lvl3_question(skill, item, context_id) for item in lvl3_mcqs]
+
+# lvl3_context function
+
+
+def lvl3_context(title: str, company: str, responsibilities: List[str], qualifications: List[str]) -> dict:
+    # shared context block of the level 3 questions, see UserState.shared_context
     return {
-        "lvl3_generated_mcqs": mcqs,
-        "current_stage": "lvl_3_waiting_response"
+        "title": title,
+        "company": company,
+        "responsibilities": responsibilities,
+        "qualifications": qualifications,
     }
 
+# build_lvl3_question function
+
+
+def build_lvl3_question(skill: str, item: dict, context_id: str) -> Question:
+    # item has already passed the schema gate
+    return Question(
+        id=str(uuid4()),  # Generate unique id
+        text=item.get("question", ""),
+        options=item.get("options", []),
+        # a scenario is either an MCQ (answer) or an MSQ (answers)
+        correct_answer=item.get("answer") if item.get("answers") is None else None,
+        correct_answers=item.get("answers"),
+        level=3,
+        metadata={
+            "skill": skill,
+            "max_time_required": item["max_time_required"],
+            "context_id": context_id
+        }
+    )
+
 # llm_inference_validator3 function
 
 
 def llm_inference_validator3(state: LLMInferenceState3) -> Command[Literal["lvl3_mcq_synthesizer", "llm_lvl3_mcqs"]]:
-    try:
-
-        print(f"{state.keys()}")
-        llm_response = state["llm_response"]
-
-        lvl3_mcqs = json.loads(llm_response)
-        skill = state["skill"]
-        title = state["title"]
-        company = state["company"]
-        responsibilities = state["responsibilities"]
-        qualifications = state["qualifications"]
-
-        # Validate lvl3_mcqs is a list
-        if not isinstance(lvl3_mcqs, list):
-            raise ValueError("Parsed MCQs should be a list")
-
-        # Transform into List[Question]
-        questions = []
-        for item in lvl3_mcqs:
-            question = Question(
-                id=str(uuid4()),  # Generate unique id
-                text=item.get("question", ""),
-                options=item.get("options", []),
+    skill = state["skill"]
+    title = state["title"]
+    company = state["company"]
+    responsibilities = state["responsibilities"]
+    qualifications = state["qualifications"]
+    num = state.get("num") or LEVEL3_QUESTIONS_PER_SKILL
+    attempt = state.get("attempt", 0)
+    questions = state.get("questions")
+    if questions is None:
+        questions = parse_lvl3_questions(skill, state["llm_response"], context_id(
+            lvl3_context(title, company, responsibilities, qualifications)))
+    questions = questions[:num]
+
+    update = {
+        "progress": {
+            3: LevelProgress(
                 level=3,
-                metadata={
-                    "skill": skill,
-                    "title": title,
-                    "company": company,
-                    "responsibilities": responsibilities,
-                    "qualifications": qualifications,
-                    "max_time_required": item.get("max_time_required", 60)
-                }
+                questions=questions,
+                answers={},
+                score=None,
+                completed=False
             )
-            questions.append(question)
-
-        return Command(
-            goto="lvl3_mcq_synthesizer",
-            update={
-                "progress": {
-                    3: LevelProgress(
-                        level=3,
-                        questions=questions,
-                        answers={},
-                        score=None,
-                        completed=False
-                    )
-                }
-            }
-        )
-
-    except Exception as e:
-        print(f"Invalid JSON or format error: {e}")
-        skill = state["skill"]
-        title = state["title"]
-        company = state["company"]
-        responsibilities = state["responsibilities"]
-        qualifications = state["qualifications"]
+        },
+        "answer_keys": {3: compile_answer_key(questions)}
+    } if questions else None
+
+    missing = num - len(questions)
+    if missing > 0 and attempt < MAX_QUESTION_RETRIES:
+        # keep the valid questions, only re-request the remainder
+        print(
+            f"Level 3 {skill}: {len(questions)}/{num} valid questions, re-requesting {missing}")
+        record_outcome("regenerated")
         return Command(
-            update={
+            update=update,
+            goto=Send("llm_lvl3_mcqs", {
                 "skill": skill,
                 "title": title,
                 "company": company,
                 "responsibilities": responsibilities,
-                "qualifications": qualifications
-            },
-            goto="llm_lvl3_mcqs"
+                "qualifications": qualifications,
+                "num": missing,
+                "attempt": attempt + 1
+            })
         )
+    if missing > 0:
+        print(
+            f"Level 3 {skill}: giving up with {len(questions)}/{num} questions after {attempt} retries")
+        record_outcome("gave_up")
+
+    return Command(update=update, goto="lvl3_mcq_synthesizer")
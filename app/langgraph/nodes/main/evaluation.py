@@ -1,30 +1,89 @@
+from typing import Dict, Optional
+from langchain_core.runnables import RunnableConfig
 from langgraph.types import interrupt
-from app.langgraph.models import UserState
+from app.db.grading import load_answer_key_overrides, record_level_submissions
+from app.langgraph.models import LevelProgress, UserState
+from app.langgraph.other.answer_key import (
+    AnswerKey, apply_corrections, compile_answer_key, grade_answers, submission_entries)
 
 
-def level1_evaluation(user_state: UserState) -> UserState:
-    user_answers = interrupt("Please submit your answers for Level 1 MCQs.")
+def normalize_answers(answers) -> dict:
+    """
+    question_id -> answer. The submit endpoints take a list, either of
+    {"question_id": ..., "answer": ...} entries or of {question_id: answer}
+    mappings; a plain mapping is accepted as is.
+    """
+    if isinstance(answers, dict):
+        return answers
+    normalized = {}
+    for entry in answers or []:
+        if "question_id" in entry:
+            normalized[entry["question_id"]] = entry.get("answer")
+        else:
+            normalized.update(entry)
+    return normalized
 
-    level1_progress = user_state.progress.get(1)
-    if not level1_progress:
-        raise ValueError("Level 1 progress not found.")
 
-    correct_count = 0
-    total_questions = len(level1_progress.questions)
+def grade_level(user_state: UserState, level: int, answers: dict, answer_keys: Optional[Dict[str, AnswerKey]] = None) -> LevelProgress:
+    """
+    The level's progress with the answers and their score, graded from the
+    level's compiled answer key in O(answers), with the corrected keys
+    (question_id -> key) applied.
+    """
+    progress = user_state.progress.get(level)
+    if not progress:
+        raise ValueError(f"Level {level} progress not found.")
+    index = user_state.answer_keys.get(level)
+    if index is None:
+        # assessments started before answer keys were compiled
+        index = compile_answer_key(progress.questions)
+    if answer_keys:
+        index = apply_corrections(index, progress.questions, answer_keys)
+    # only what changed, merge_progress_dicts keeps the questions
+    return LevelProgress(
+        level=level,
+        questions=[],
+        answers=answers,
+        score=grade_answers(index, answers),
+        completed=True,
+    )
 
-    for q in level1_progress.questions:
-        # Assuming first option is correct (you can change logic)
-        correct_answer = q.options[0]
-        user_answer = user_answers.get(q.id)
-        if user_answer == correct_answer:
-            correct_count += 1
 
-    score = (correct_count / total_questions) * 100
+async def submit_level(user_state: UserState, level: int, answers: dict, config: RunnableConfig) -> LevelProgress:
+    """
+    Grade a level with the test's corrected keys, and store the graded
+    answers for regrades (app/db/grading.py).
+    """
+    configurable = config.get("configurable", {})
+    assessment_id, test_id = configurable.get("thread_id"), configurable.get("test_id")
+    answer_keys = await load_answer_key_overrides(test_id) if test_id else {}
+    progress = grade_level(user_state, level, answers, answer_keys)
+    if assessment_id and test_id:
+        # earlier levels too, they may have been graded before levels were
+        # stored, and a regrade reads an assessment's levels from here once
+        # it has any
+        graded = {p.level: p.answers for p in user_state.progress.values() if p.completed}
+        graded[level] = answers
+        await record_level_submissions([{
+            "assessment_id": assessment_id, "test_id": test_id, "level": graded_level,
+            "entries": submission_entries(user_state.progress[graded_level].questions, graded_answers),
+        } for graded_level, graded_answers in graded.items()])
+    return progress
 
-    # Update the user state
-    level1_progress.answers = user_answers
-    level1_progress.score = score
-    level1_progress.completed = True
-    user_state.progress[1] = level1_progress
 
-    return user_state
+async def level1_evaluation(user_state: UserState, config: RunnableConfig):
+    user_answers = normalize_answers(
+        interrupt("Please submit your answers for Level 1 MCQs."))
+    return {"progress": {1: await submit_level(user_state, 1, user_answers, config)}}
+
+
+async def level2_evaluation(user_state: UserState, config: RunnableConfig):
+    user_answers = normalize_answers(
+        interrupt("Please submit your answers for Level 2 MSQs."))
+    return {"progress": {2: await submit_level(user_state, 2, user_answers, config)}}
+
+
+async def level3_evaluation(user_state: UserState, config: RunnableConfig):
+    user_answers = normalize_answers(
+        interrupt("Please submit your answers for Level 3 scenarios."))
+    return {"progress": {3: await submit_level(user_state, 3, user_answers, config)}}
@@ -0,0 +1,123 @@
+from typing import Dict, Iterable, List, Optional, Union
+import zlib
+
+from app.langgraph.models import Question
+
+# Answer keys are compiled when questions are validated into one entry per
+# question: [correct option bitmask, crc32 of option 0, option 1, ...]. The
+# option hashes map a submitted answer (option text) to its bit, so grading
+# only needs this index and the answers, not the questions. An entry with
+# one correct option is an MCQ and scores on an exact match; with several it
+# is an MSQ, scored with partial credit (correct picks minus wrong picks,
+# over the number of correct options, at least 0) or on an exact match.
+# app/langgraph/other/bulk_grading.py scores cohorts the same way, from the
+# graded levels stored as submission entries.
+
+AnswerKeyIndex = Dict[str, List[int]]  # question_id -> [mask, *option hashes]
+# a corrected key: the correct option, or a list of them for MSQs
+AnswerKey = Union[str, List[str]]
+# options that fit in the 64-bit masks of a bulk regrade
+MAX_OPTIONS = 64
+
+
+def option_hash(option: str) -> int:
+    return zlib.crc32(option.encode("utf-8"))
+
+
+def question_key(question: Question) -> List[str]:
+    """The correct options of a question, empty if it has no key."""
+    if question.correct_answers:
+        return question.correct_answers
+    return [question.correct_answer] if question.correct_answer else []
+
+
+def question_entry(question: Question) -> List[int]:
+    """[correct option bitmask, *option hashes], the mask is 0 without a key."""
+    correct = set(question_key(question))
+    options = question.options[:MAX_OPTIONS]
+    mask = 0
+    for i, option in enumerate(options):
+        if option in correct:
+            mask |= 1 << i
+    return [mask] + [option_hash(o) for o in options]
+
+
+def compile_answer_key(questions: Iterable[Question]) -> AnswerKeyIndex:
+    index = {}
+    for question in questions:
+        entry = question_entry(question)
+        if entry[0]:
+            index[question.id] = entry
+    return index
+
+
+def correct_entry(entry: List[int], key: AnswerKey) -> List[int]:
+    """The entry with its correct options replaced by a corrected key."""
+    return [answer_mask(entry, key)] + entry[1:]
+
+
+def apply_corrections(index: AnswerKeyIndex, questions: Iterable[Question], answer_keys: Dict[str, AnswerKey]) -> AnswerKeyIndex:
+    """
+    The index with the corrected keys (question_id -> key) of its level's
+    questions. A key that matches none of the options ungrades the question.
+    """
+    corrected = dict(index)
+    for question in questions:
+        key = answer_keys.get(question.id)
+        if key is None:
+            continue
+        entry = correct_entry(question_entry(question), key)
+        if entry[0]:
+            corrected[question.id] = entry
+        else:
+            corrected.pop(question.id, None)
+    return corrected
+
+
+def submission_entries(questions: Iterable[Question], answers: Dict[str, object]) -> List[list]:
+    """
+    A graded level as [question_id, skill, answer mask, correct option mask,
+    *option hashes] per question, what a bulk regrade needs of it.
+    """
+    entries = []
+    for question in questions:
+        entry = question_entry(question)
+        answer = answers.get(question.id)
+        skill = (question.metadata or {}).get("skill") or ""
+        entries.append([question.id, skill, answer_mask(entry, answer) if answer else 0] + entry)
+    return entries
+
+
+def answer_mask(entry: List[int], answer) -> int:
+    chosen = {option_hash(answer)} if isinstance(answer, str) \
+        else {option_hash(a) for a in answer if isinstance(a, str)}
+    mask = 0
+    for i, h in enumerate(entry[1:]):
+        if h in chosen:
+            mask |= 1 << i
+    return mask
+
+
+def answer_credit(key: int, mask: int, msq_partial_credit: bool = True) -> float:
+    if mask == key:
+        return 1.0
+    correct = key.bit_count()
+    if correct == 1 or not msq_partial_credit:
+        return 0.0
+    return max((mask & key).bit_count() - (mask & ~key).bit_count(), 0) / correct
+
+
+def grade_answers(index: AnswerKeyIndex, answers: Dict[str, object], msq_partial_credit: bool = True) -> Optional[float]:
+    """
+    Score (0-100) of a level's answers, question_id -> option or list of
+    options. Unanswered questions count as wrong; None if nothing is keyed.
+    """
+    if not index:
+        return None
+    credit = 0.0
+    for question_id, answer in answers.items():
+        entry = index.get(question_id)
+        if entry is None or not answer:
+            continue
+        credit += answer_credit(entry[0], answer_mask(entry, answer), msq_partial_credit)
+    return credit / len(index) * 100
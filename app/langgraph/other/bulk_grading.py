@@ -0,0 +1,245 @@
+from typing import Dict, List, Optional
+import asyncio
+import json
+import time
+
+import numpy as np
+from sqlalchemy import exists, select, update
+
+from app.core.checkpointer import get_async_memory
+from app.db.database import AsyncSessionLocal
+from app.db.grading import load_answer_key_overrides, record_level_submissions, save_answer_key_overrides
+from app.db.models import CandidateAssessment, LevelSubmission
+from app.langgraph.other.answer_key import AnswerKey, correct_entry, submission_entries
+
+# Regrades every assessment of a test in one vectorized pass, e.g. after a
+# recruiter corrected an answer key or switched the MSQ scoring policy.
+# Candidates don't share question sets (each assessment generates its own,
+# pooled level 1 questions are a sample), so the candidates x questions
+# answer matrix is kept in coordinate form: one entry per question a
+# candidate was given, with the chosen options as a bitmask. The answer key
+# is one bitmask per question; scores per level, per skill and in total are
+# bincounts over the entries. The answers come from the graded levels
+# stored at submit time (LevelSubmission), one query per test.
+
+LEVELS = (1, 2, 3)
+# checkpoints read at once for assessments graded before levels were stored
+CHECKPOINT_LOAD_CONCURRENCY = 32
+
+
+class AnswerMatrix:
+    """
+    Answers of many candidates, with the questions they were given as
+    columns. Built with add_entries, then frozen into NumPy arrays.
+    """
+
+    def __init__(self, answer_keys: Optional[Dict[str, AnswerKey]] = None):
+        # question_id -> corrected key, overrides the question's own
+        self.answer_keys = answer_keys or {}
+        self.assessment_ids: List[str] = []
+        self.skills: List[str] = []
+        self._skill_index: Dict[str, int] = {}
+        self._rows_by_assessment: Dict[str, int] = {}
+        self._columns: Dict[str, int] = {}
+        self._key: List[int] = []
+        self._level: List[int] = []
+        self._skill: List[int] = []
+        self._rows: List[int] = []
+        self._cols: List[int] = []
+        self._answers: List[int] = []
+
+    def _column(self, level: int, question_id: str, skill: str, entry: List[int]) -> int:
+        skill_index = self._skill_index.get(skill)
+        if skill_index is None:
+            skill_index = self._skill_index[skill] = len(self.skills)
+            self.skills.append(skill)
+        key = self.answer_keys.get(question_id)
+        column = self._columns[question_id] = len(self._key)
+        self._key.append(entry[0] if key is None else correct_entry(entry, key)[0])
+        self._level.append(level)
+        self._skill.append(skill_index)
+        return column
+
+    def add_candidate(self, assessment_id: str) -> int:
+        row = self._rows_by_assessment.get(assessment_id)
+        if row is None:
+            row = self._rows_by_assessment[assessment_id] = len(self.assessment_ids)
+            self.assessment_ids.append(assessment_id)
+        return row
+
+    def add_entries(self, row: int, level: int, entries: List[list]):
+        """A graded level of a candidate, see answer_key.submission_entries."""
+        # the hot loop of a regrade, one pass per answer
+        columns = self._columns
+        add_col, add_answer = self._cols.append, self._answers.append
+        for question_id, skill, answer, *entry in entries:
+            column = columns.get(question_id)
+            if column is None:
+                column = self._column(level, question_id, skill, entry)
+            add_col(column)
+            add_answer(answer)
+        self._rows.extend([row] * len(entries))
+
+    def freeze(self) -> dict:
+        return {
+            "rows": np.asarray(self._rows, dtype=np.int64),
+            "cols": np.asarray(self._cols, dtype=np.int64),
+            "answers": np.asarray(self._answers, dtype=np.uint64),
+            "key": np.asarray(self._key, dtype=np.uint64),
+            "level": np.asarray(self._level, dtype=np.int64),
+            "skill": np.asarray(self._skill, dtype=np.int64),
+        }
+
+
+def _percent(credit: np.ndarray, counted: np.ndarray) -> np.ndarray:
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(counted > 0, 100 * credit / counted, np.nan)
+
+
+def grade_matrix(arrays: dict, candidates: int, skills: int, msq_partial_credit: bool = True) -> dict:
+    """
+    Scores (0-100, NaN where a candidate had no graded question) of every
+    candidate: per level (candidates x 3), per skill (candidates x skills)
+    and in total. MCQs score when the chosen option is the key; MSQs score
+    on an exact match, or with partial credit (correct picks minus wrong
+    picks over the number of correct options, at least 0).
+    """
+    rows, answers = arrays["rows"], arrays["answers"]
+    key = arrays["key"][arrays["cols"]]
+    exact = (answers == key).astype(np.float64)
+    if msq_partial_credit:
+        key_size = np.bitwise_count(key).astype(np.float64)
+        hits = np.bitwise_count(answers & key).astype(np.float64)
+        misses = np.bitwise_count(answers & ~key).astype(np.float64)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            partial = np.clip((hits - misses) / key_size, 0, 1)
+        credit = np.where(key_size > 1, partial, exact)
+    else:
+        credit = exact
+    # questions without a key aren't graded
+    counted = (key != 0).astype(np.float64)
+    credit = np.where(counted > 0, credit, 0.0)
+
+    def by(bins: np.ndarray, size: int) -> np.ndarray:
+        return _percent(np.bincount(bins, weights=credit, minlength=size),
+                        np.bincount(bins, weights=counted, minlength=size))
+
+    level = arrays["level"][arrays["cols"]] - 1
+    skill = arrays["skill"][arrays["cols"]]
+    return {
+        "levels": by(rows * len(LEVELS) + level, candidates * len(LEVELS)).reshape(candidates, len(LEVELS)),
+        "skills": by(rows * skills + skill, candidates * skills).reshape(candidates, skills),
+        "total": by(rows, candidates),
+    }
+
+
+def _score(value: float) -> Optional[float]:
+    return None if np.isnan(value) else round(float(value), 2)
+
+
+async def load_test_answers(test_id: str, answer_keys: Optional[Dict[str, AnswerKey]] = None) -> AnswerMatrix:
+    """Submitted levels of every assessment of a test."""
+    matrix = AnswerMatrix(answer_keys)
+    async with AsyncSessionLocal() as session:
+        result = await session.stream(select(
+            LevelSubmission.assessment_id, LevelSubmission.level, LevelSubmission.entries,
+        ).where(LevelSubmission.test_id == test_id).execution_options(yield_per=5000))
+        async for rows in result.partitions():
+            for assessment_id, level, entries in rows:
+                matrix.add_entries(matrix.add_candidate(assessment_id), level, json.loads(entries))
+
+        # started before graded levels were stored, or not submitted yet
+        result = await session.execute(select(CandidateAssessment.assessment_id).where(
+            CandidateAssessment.test_id == test_id,
+            CandidateAssessment.status != "not_started",
+            ~exists().where(LevelSubmission.assessment_id == CandidateAssessment.assessment_id)))
+        unstored = result.scalars().all()
+    if unstored:
+        await _load_from_checkpoints(matrix, test_id, unstored)
+    return matrix
+
+
+async def _load_from_checkpoints(matrix: AnswerMatrix, test_id: str, assessment_ids: List[str]):
+    """Add the submitted levels of latest checkpoints, and store them for the next regrade."""
+    saver = await get_async_memory()
+    slots = asyncio.Semaphore(CHECKPOINT_LOAD_CONCURRENCY)
+
+    async def load(assessment_id: str):
+        async with slots:
+            return await saver.aget_tuple({"configurable": {"thread_id": assessment_id, "checkpoint_ns": ""}})
+
+    checkpoints = await asyncio.gather(*[load(assessment_id) for assessment_id in assessment_ids])
+    submissions = []
+    for assessment_id, checkpoint in zip(assessment_ids, checkpoints):
+        if checkpoint is None:
+            continue
+        progress = checkpoint.checkpoint["channel_values"].get("progress") or {}
+        for level_progress in progress.values():
+            if level_progress.completed:
+                submissions.append({
+                    "assessment_id": assessment_id, "test_id": test_id, "level": level_progress.level,
+                    "entries": submission_entries(level_progress.questions, level_progress.answers or {}),
+                })
+    for submission in submissions:
+        matrix.add_entries(matrix.add_candidate(submission["assessment_id"]), submission["level"], submission["entries"])
+    await record_level_submissions(submissions)
+
+
+async def write_scores(scores: Dict[str, Optional[float]], batch_size: int = 1000):
+    """CandidateAssessment.score of many assessments, one UPDATE per batch."""
+    rows = [{"assessment_id": assessment_id, "score": None if score is None else int(round(score))}
+            for assessment_id, score in scores.items()]
+    async with AsyncSessionLocal() as session:
+        for start in range(0, len(rows), batch_size):
+            # bulk UPDATE by primary key, executemany under the hood
+            await session.execute(update(CandidateAssessment), rows[start:start + batch_size])
+        await session.commit()
+
+
+async def regrade_test(
+    test_id: str,
+    answer_keys: Optional[Dict[str, AnswerKey]] = None,
+    msq_partial_credit: bool = True,
+    details: bool = False,
+) -> dict:
+    """
+    Regrade every submitted assessment of a test, store the total scores and
+    return the test's averages (and every candidate's scores with details).
+    """
+    started = time.perf_counter()
+    # corrections are kept: live grading applies them from now on, and a
+    # later regrade keeps them unless it corrects the same question again
+    await save_answer_key_overrides(test_id, answer_keys or {})
+    matrix = await load_test_answers(test_id, await load_answer_key_overrides(test_id))
+    loaded = time.perf_counter()
+    candidates = len(matrix.assessment_ids)
+    grades = grade_matrix(matrix.freeze(), candidates, len(matrix.skills), msq_partial_credit)
+    graded = time.perf_counter()
+    totals = {assessment_id: _score(total)
+              for assessment_id, total in zip(matrix.assessment_ids, grades["total"])}
+    await write_scores(totals)
+
+    def mean(values: np.ndarray) -> Optional[float]:
+        return None if np.isnan(values).all() else _score(np.nanmean(values))
+
+    report = {
+        "test_id": test_id,
+        "graded": candidates,
+        "msq_partial_credit": msq_partial_credit,
+        "mean_score": mean(grades["total"]),
+        "by_level": {level: mean(grades["levels"][:, i]) for i, level in enumerate(LEVELS)},
+        "by_skill": {skill: mean(grades["skills"][:, i]) for i, skill in enumerate(matrix.skills)},
+        "timings": {
+            "load_seconds": loaded - started,
+            "grade_seconds": graded - loaded,
+            "write_seconds": time.perf_counter() - graded,
+        },
+    }
+    if details:
+        report["assessments"] = [{
+            "assessment_id": assessment_id,
+            "score": totals[assessment_id],
+            "levels": {level: _score(grades["levels"][row, i]) for i, level in enumerate(LEVELS)},
+            "skills": {skill: _score(grades["skills"][row, i]) for i, skill in enumerate(matrix.skills)},
+        } for row, assessment_id in enumerate(matrix.assessment_ids)]
+    return report
@@ -0,0 +1,138 @@
+import json
+from typing import Any, List, Optional, Tuple
+
+from app.langgraph.other.question_repair import loads_repaired
+
+
+class JSONArrayStreamParser:
+    """
+    Incremental parser for a streamed JSON array of objects.
+
+    `feed` takes the next chunk of the completion and returns every object
+    whose closing brace arrived in it. Each character is scanned once and only
+    the object currently being received is buffered, so the cost of a chunk
+    doesn't grow with the length of the completion. Text before the first
+    bracket (code fences, prose) and `//` / `/* */` comments are skipped.
+
+    With `keyed=True` the completion is an object of arrays, e.g. the batched
+    prompts' `{"skill": [...], ...}`, and items come back with their key.
+    Items of a bare array have the key None.
+    """
+
+    def __init__(self, keyed: bool = False):
+        self.keyed = keyed
+        self._chunks = []
+        # unscanned input plus the part of the current item already scanned
+        self._work = ""
+        self._pos = 0
+        self._stack = []
+        self._in_string = False
+        self._escape = False
+        self._string_start = -1
+        self._last_string = None
+        self._key = None
+        self._item_start = -1
+        self._item_key = None
+        self._done = False
+
+    @property
+    def text(self) -> str:
+        """Everything fed so far."""
+        if len(self._chunks) > 1:
+            self._chunks = ["".join(self._chunks)]
+        return self._chunks[0] if self._chunks else ""
+
+    def _item_depth(self) -> int:
+        # items are the objects directly inside the array(s) we care about
+        return 2 if not self.keyed else 3
+
+    def feed(self, chunk: str) -> List[Tuple[Optional[str], Any]]:
+        if not chunk:
+            return []
+        self._chunks.append(chunk)
+        if self._done:
+            return []
+        text = self._work + chunk
+        items = []
+        i = self._pos
+        n = len(text)
+        while i < n and not self._done:
+            c = text[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    if self.keyed and len(self._stack) == 1:
+                        self._last_string = text[self._string_start + 1:i]
+                i += 1
+                continue
+
+            if c == "/":
+                # comment, wait for the rest of it if it's split across chunks
+                if i + 1 >= n:
+                    break
+                if text[i + 1] == "/":
+                    end = text.find("\n", i + 2)
+                    if end == -1:
+                        break
+                    i = end
+                    continue
+                if text[i + 1] == "*":
+                    end = text.find("*/", i + 2)
+                    if end == -1:
+                        break
+                    i = end + 2
+                    continue
+
+            if not self._stack:
+                # before the root container
+                if c == ("{" if self.keyed else "["):
+                    self._stack.append(c)
+                i += 1
+                continue
+
+            if c == '"':
+                self._in_string = True
+                self._string_start = i
+            elif c == ":" and self.keyed and len(self._stack) == 1:
+                self._key = self._last_string
+            elif c in "[{":
+                self._stack.append(c)
+                if c == "{" and len(self._stack) == self._item_depth() and self._stack[-2] == "[":
+                    self._item_start = i
+                    self._item_key = self._key
+            elif c in "]}":
+                if c == "}" and len(self._stack) == self._item_depth() and self._item_start != -1:
+                    item = self._load(text[self._item_start:i + 1])
+                    if item is not None:
+                        items.append((self._item_key, item))
+                    self._item_start = -1
+                self._stack.pop()
+                if not self._stack:
+                    # ignore whatever follows the root, e.g. a closing fence
+                    self._done = True
+            i += 1
+
+        # drop everything that has been scanned and isn't needed any more
+        keep = i
+        if self._item_start != -1:
+            keep = min(keep, self._item_start)
+        if self._in_string:
+            keep = min(keep, self._string_start)
+        self._work = text[keep:]
+        self._pos = i - keep
+        if self._item_start != -1:
+            self._item_start -= keep
+        if self._in_string:
+            self._string_start -= keep
+        return items
+
+    @staticmethod
+    def _load(text: str) -> Any:
+        try:
+            return loads_repaired(text)
+        except json.JSONDecodeError:
+            return None
@@ -0,0 +1,115 @@
+from app.langgraph.prompts import lvl2_prompt_template
+from app.langgraph.models import Question, UserState, context_id
+from app.langgraph.nodes.level2 import parse_lvl2_questions, lvl2_context
+from app.core.config import (
+    llm,
+    llm_limiter,
+    LEVEL2_QUESTIONS_PER_SKILL,
+    LEVEL2_PREFETCH_TTL_SECONDS,
+    LEVEL2_PREFETCH_MAX_ENTRIES,
+)
+from typing import Dict, List, Optional, Tuple
+from app.core.llm_limiter import BACKGROUND, INTERACTIVE, PriorityGroup, llm_priority
+import asyncio
+import time
+
+# Level 2 prompts only depend on the JD skills and the resume's projects and
+# experience, so they can be generated while the candidate is still answering
+# level 1. Results are kept per assessment thread until level 2 starts.
+# thread_id -> (task, scheduled_at, priority of its LLM calls)
+_prefetched: Dict[str, Tuple[asyncio.Task, float, PriorityGroup]] = {}
+
+
+async def generate_level2_skill_questions(skill: str, projects: List[str], experience: List[str], metadata: Optional[dict] = None) -> List[Question]:
+    prompt = lvl2_prompt_template.format(
+        skill=skill, projects=projects, experience=experience, num=LEVEL2_QUESTIONS_PER_SKILL)
+    response = await llm.ainvoke(prompt, {"metadata": {
+        "graph": "level2_prefetch", "node": "llm_lvl2_mcqs", "skill": skill, **(metadata or {})}})
+    # lvl2_mcq_generator stores the referenced context block in the state
+    questions = parse_lvl2_questions(
+        skill, response.content, context_id(lvl2_context(projects, experience)))[:LEVEL2_QUESTIONS_PER_SKILL]
+    if not questions:
+        print(f"Invalid level 2 prefetch response for {skill}")
+        await llm.aforget(prompt)
+    return questions
+
+
+async def generate_level2_questions(skills: List[str], projects: List[str], experience: List[str], metadata: Optional[dict] = None) -> List[Question]:
+    results = await asyncio.gather(
+        *[generate_level2_skill_questions(s, projects, experience, metadata) for s in skills],
+        return_exceptions=True)
+    questions = []
+    for skill, result in zip(skills, results):
+        if isinstance(result, BaseException):
+            # the level 2 graph generates this skill on demand
+            print(f"Level 2 prefetch failed for {skill}: {result}")
+            continue
+        questions.extend(result)
+    return questions
+
+
+def schedule_level2_prefetch(thread_id: str, user_state: UserState, test_id: Optional[str] = None):
+    """
+    Start generating level 2 questions for an assessment in the background.
+    Must be called from the event loop that will later run level 2.
+    """
+    _evict_expired()
+    if thread_id in _prefetched:
+        return
+    # speculative, so it must not hold up interactive requests until level 2
+    # waits on it; the task copies the priority from the current context
+    group = PriorityGroup(BACKGROUND)
+    with llm_priority(group):
+        task = asyncio.create_task(generate_level2_questions(
+            user_state.job_description.required_skills,
+            user_state.resume.projects or [],
+            user_state.resume.experience or [],
+            {"assessment_id": thread_id, "test_id": test_id},
+        ))
+    _prefetched[thread_id] = (task, time.monotonic(), group)
+
+
+async def take_level2_prefetch(thread_id: Optional[str]) -> List[Question]:
+    """
+    Hand over (and forget) the prefetched level 2 questions for a thread,
+    waiting for them if they are still being generated.
+    """
+    entry = _prefetched.pop(thread_id, None) if thread_id else None
+    if entry is None:
+        return []
+    task, _, group = entry
+    if task.get_loop() is not asyncio.get_running_loop():
+        # scheduled on another loop, only usable if it already finished
+        if not task.done() or task.cancelled() or task.exception():
+            return []
+        return task.result()
+    # the candidate is waiting on it now
+    llm_limiter.promote(group, INTERACTIVE)
+    try:
+        return await task
+    except Exception as e:
+        print(f"Level 2 prefetch for {thread_id} failed: {e}")
+        return []
+
+
+def discard_level2_prefetch(*thread_ids: str):
+    """
+    Drop prefetched questions for candidates who won't reach level 2: their
+    level 1 submission didn't advance, the assessment ended or was deleted.
+    """
+    for thread_id in thread_ids:
+        entry = _prefetched.pop(thread_id, None)
+        if entry is not None:
+            task, _, _ = entry
+            task.get_loop().call_soon_threadsafe(task.cancel)
+
+
+def _evict_expired():
+    now = time.monotonic()
+    expired = [tid for tid, (_, scheduled_at, _) in _prefetched.items()
+               if now - scheduled_at > LEVEL2_PREFETCH_TTL_SECONDS]
+    for tid in expired:
+        discard_level2_prefetch(tid)
+    # oldest first
+    while len(_prefetched) >= LEVEL2_PREFETCH_MAX_ENTRIES:
+        discard_level2_prefetch(next(iter(_prefetched)))
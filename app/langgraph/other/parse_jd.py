@@ -11,7 +11,8 @@ def parse_jd(jd_text: str) -> dict:
     prompt = jd_parsing_prompt.format(jd_text=jd_text)
 
     # Call the OpenAI API
-    response = llm.invoke(prompt)
+    response = llm.invoke(prompt, {"metadata": {
+                          "graph": "ingestion", "node": "parse_jd"}})
 
     # Extract the parsed data from the response
     response_text = response.content
@@ -22,6 +23,8 @@ def parse_jd(jd_text: str) -> dict:
         parsed_data = json.loads(response_text)
     except json.JSONDecodeError as e:
         print(f"Error decoding JSON: {e}")
+        # don't keep serving a malformed completion from the cache
+        llm.forget(prompt)
         return None
     except Exception as e:
         print(f"Unexpected error: {e}")
@@ -0,0 +1,47 @@
+from app.langgraph.prompts import lvl1_prompt_template
+from app.langgraph.models import Question
+from app.langgraph.nodes.level1 import parse_lvl1_questions
+from app.core.config import llm
+from typing import Dict, List, Optional
+import asyncio
+import random
+
+
+async def generate_level1_skill_pool(skill: str, num: int, test_id: Optional[str] = None) -> List[Question]:
+    prompt = lvl1_prompt_template.format(skill=skill, num=num)
+    response = await llm.ainvoke(prompt, {"metadata": {
+        "graph": "question_pool", "node": "level1_pool", "skill": skill, "test_id": test_id}})
+    questions = parse_lvl1_questions(skill, response.content)
+    if not questions:
+        print(f"Invalid level 1 pool response for {skill}")
+        await llm.aforget(prompt)
+    return questions
+
+
+async def generate_level1_pool(skills: List[str], num_per_skill: int, test_id: Optional[str] = None) -> Dict[str, List[dict]]:
+    """
+    Generate `num_per_skill` level 1 MCQs for every skill concurrently.
+    Returns a JSON-serializable mapping of skill -> question dicts.
+    """
+    results = await asyncio.gather(
+        *[generate_level1_skill_pool(s, num_per_skill, test_id) for s in skills])
+    return {
+        skill: [q.model_dump() for q in questions]
+        for skill, questions in zip(skills, results)
+        if questions
+    }
+
+
+def sample_level1_questions(pool: Dict[str, List[dict]], skills: List[str], num_per_skill: int) -> List[Question]:
+    """
+    Draw a candidate's level 1 set from the pool. Skills missing from the pool
+    are left out so the graph generates them on demand.
+    """
+    questions = []
+    for skill in skills:
+        candidates = pool.get(skill) or []
+        if len(candidates) < num_per_skill:
+            continue
+        questions.extend(Question(**q)
+                         for q in random.sample(candidates, num_per_skill))
+    return questions
@@ -0,0 +1,232 @@
+import json
+import re
+from typing import Any, List, Optional, Tuple
+from app.core.metrics import registry
+
+# Outcome counters for generated question batches:
+# clean       - parsed as-is
+# repaired    - parsed after local fixes (fences, comments, trailing commas)
+# salvaged    - only some items of a broken array could be recovered
+# regenerated - a skill's missing remainder was re-requested from the LLM
+# gave_up     - the retry cap was hit with questions still missing
+OUTCOMES = ("clean", "repaired", "salvaged", "regenerated", "gave_up")
+
+question_batches_total = registry.counter(
+    "question_batches_total",
+    "Generated question batches, by repair outcome (clean, repaired, salvaged, regenerated, gave_up)",
+    ["outcome"])
+
+# options the prompts ask for, per level
+EXPECTED_OPTIONS = {1: 4, 2: 4, 3: 5}
+
+_FENCE_RE = re.compile(r"^\s*```[a-zA-Z]*\s*|\s*```\s*$")
+_NUMBER_RE = re.compile(r"\d+(\.\d+)?")
+
+
+def record_outcome(outcome: str, count: int = 1):
+    question_batches_total.inc(count, outcome=outcome)
+
+
+def get_repair_stats() -> dict:
+    return {outcome: int(question_batches_total.value(outcome=outcome)) for outcome in OUTCOMES}
+
+
+def strip_code_fences(text: str) -> str:
+    return _FENCE_RE.sub("", text.strip())
+
+
+def _clean_json_text(text: str) -> str:
+    """
+    Drop // and /* */ comments and trailing commas outside of strings.
+    """
+    out = []
+    i = 0
+    n = len(text)
+    in_string = False
+    while i < n:
+        c = text[i]
+        if in_string:
+            out.append(c)
+            if c == "\\" and i + 1 < n:
+                out.append(text[i + 1])
+                i += 2
+                continue
+            if c == '"':
+                in_string = False
+            i += 1
+            continue
+        if c == '"':
+            in_string = True
+            out.append(c)
+            i += 1
+        elif text.startswith("//", i):
+            end = text.find("\n", i)
+            i = n if end == -1 else end
+        elif text.startswith("/*", i):
+            end = text.find("*/", i + 2)
+            i = n if end == -1 else end + 2
+        elif c in "]}":
+            # remove a trailing comma before the closing bracket
+            j = len(out) - 1
+            while j >= 0 and out[j].isspace():
+                j -= 1
+            if j >= 0 and out[j] == ",":
+                del out[j]
+            out.append(c)
+            i += 1
+        else:
+            out.append(c)
+            i += 1
+    return "".join(out)
+
+
+def loads_repaired(text: str) -> Any:
+    """json.loads that first strips code fences, comments and trailing commas."""
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        return json.loads(_clean_json_text(strip_code_fences(text)))
+
+
+def _object_end(text: str, start: int) -> int:
+    """Index just past the object starting at `start`, or -1 if it never closes."""
+    depth = 0
+    in_string = False
+    i = start
+    n = len(text)
+    while i < n:
+        c = text[i]
+        if in_string:
+            if c == "\\":
+                i += 1
+            elif c == '"':
+                in_string = False
+        elif c == '"':
+            in_string = True
+        elif c == "{":
+            depth += 1
+        elif c == "}":
+            depth -= 1
+            if depth == 0:
+                return i + 1
+        i += 1
+    return -1
+
+
+def _salvage_objects(text: str) -> List[dict]:
+    """Recover every complete, parseable top-level object of a broken array."""
+    items = []
+    start = text.find("[")
+    i = text.find("{", start + 1 if start != -1 else 0)
+    while i != -1:
+        end = _object_end(text, i)
+        if end == -1:
+            break  # truncated completion
+        try:
+            item = json.loads(text[i:end])
+            if isinstance(item, dict):
+                items.append(item)
+        except json.JSONDecodeError:
+            pass
+        i = text.find("{", end)
+    return items
+
+
+def parse_question_items(llm_response: str) -> Tuple[List[Any], str]:
+    """
+    Parse an LLM response that should be a JSON array of questions, repairing
+    it locally where possible. Returns the items and the outcome:
+    'clean', 'repaired', 'salvaged' or 'failed'.
+    """
+    if not llm_response:
+        return [], "failed"
+    try:
+        items = json.loads(llm_response)
+        if isinstance(items, list):
+            return items, "clean"
+    except json.JSONDecodeError:
+        pass
+
+    cleaned = _clean_json_text(strip_code_fences(llm_response))
+    try:
+        items = json.loads(cleaned)
+        if isinstance(items, dict):
+            # a single question, or a wrapper like {"questions": [...]}
+            lists = [v for v in items.values() if isinstance(v, list)
+                     and all(isinstance(x, dict) for x in v)]
+            items = lists[0] if len(lists) == 1 else [items]
+        if isinstance(items, list):
+            return items, "repaired"
+    except json.JSONDecodeError:
+        pass
+
+    items = _salvage_objects(cleaned)
+    return items, "salvaged" if items else "failed"
+
+
+def parse_seconds(value: Any) -> Optional[int]:
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return int(value) if value > 0 else None
+    if isinstance(value, str):
+        match = _NUMBER_RE.search(value)
+        if match:
+            seconds = int(float(match.group()))
+            return seconds if seconds > 0 else None
+    return None
+
+
+def validate_question_item(item: Any, level: int) -> Optional[dict]:
+    """
+    Schema gate for one generated question. Returns a normalized copy
+    (max_time_required as int seconds) or None if it must be rejected.
+    """
+    if not isinstance(item, dict):
+        return None
+    text = item.get("question")
+    options = item.get("options")
+    if not isinstance(text, str) or not text.strip():
+        return None
+    if not isinstance(options, list) or not all(isinstance(o, str) for o in options):
+        return None
+    if len(options) != EXPECTED_OPTIONS.get(level, len(options)) or len(set(options)) != len(options):
+        return None
+
+    answer = item.get("answer")
+    answers = item.get("answers")
+    if level == 1 or (level == 3 and answers is None):
+        if answer not in options:
+            return None
+    else:
+        if isinstance(answers, str):
+            answers = [answers]
+        if not isinstance(answers, list) or not answers or not all(a in options for a in answers):
+            return None
+
+    seconds = parse_seconds(item.get("max_time_required"))
+    if seconds is None:
+        return None
+
+    normalized = dict(item)
+    normalized["max_time_required"] = seconds
+    if answers is not None:
+        normalized["answers"] = answers
+    return normalized
+
+
+def parse_valid_question_items(llm_response: str, level: int) -> List[dict]:
+    """
+    Repair + schema gate. Returns only the items that pass validation and
+    records the repair outcome.
+    """
+    items, outcome = parse_question_items(llm_response)
+    valid = [v for v in (validate_question_item(i, level)
+                         for i in items) if v is not None]
+    if not valid:
+        outcome = "failed"
+    elif outcome in ("clean", "repaired") and len(valid) < len(items):
+        outcome = "salvaged"
+    if outcome != "failed":
+        record_outcome(outcome)
+    return valid
@@ -0,0 +1,284 @@
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+import asyncio
+import json
+import time
+import uuid
+
+from langgraph.types import Command
+from sqlalchemy import select, update
+
+from app.core.candidate_tests_cache import candidate_tests_cache
+from app.core.checkpointer import thread_lock
+from app.core.config import (
+    CHECKPOINT_DURING,
+    SUBMISSION_WORKERS,
+    SUBMISSION_POLL_INTERVAL_SECONDS,
+    SUBMISSION_JOB_STALE_SECONDS,
+    SUBMISSION_JOB_SWEEP_INTERVAL_SECONDS,
+)
+from app.core.metrics import registry
+from app.core.state_cache import get_state, state_cache
+from app.db.database import AsyncSessionLocal
+from app.db.models import CandidateAssessment, SubmissionJob
+from app.langgraph.graph.main import get_async_main_graph
+from app.langgraph.other.level2_prefetch import discard_level2_prefetch
+
+# Submitting a level resumes the graph: the level is graded, then the next
+# level is generated, which takes as long as its LLM calls. Submissions are
+# stored as jobs and run in the background instead, so the request only
+# persists the answers. The job's status moves from queued to grading,
+# generating_next_level (once the node that took the answers has finished)
+# and ready, or failed. Any API process can report it from the table;
+# waiting is woken up directly when the job runs in this process.
+
+QUEUED = "queued"
+GRADING = "grading"
+GENERATING_NEXT_LEVEL = "generating_next_level"
+READY = "ready"
+FAILED = "failed"
+PENDING = (QUEUED, GRADING, GENERATING_NEXT_LEVEL)
+
+submission_jobs_total = registry.counter(
+    "submission_jobs_total",
+    "Finished submission jobs, by status (ready, failed)",
+    ["status"])
+submission_job_seconds = registry.histogram(
+    "submission_job_seconds",
+    "Time from submission to a finished job",
+    buckets=(0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300))
+submission_jobs_running = registry.gauge(
+    "submission_jobs_running",
+    "Submission jobs holding a worker slot")
+
+_slots: Optional[asyncio.Semaphore] = None
+# job_id -> task, jobs scheduled by this process
+_tasks: Dict[str, asyncio.Task] = {}
+# job_id -> event set on the job's next status change
+_changed: Dict[str, asyncio.Event] = {}
+
+
+def graph_config(assessment_id: str, test_id: str) -> dict:
+    # test_id only tags the LLM calls for cost attribution
+    return {"configurable": {"thread_id": assessment_id, "test_id": test_id}}
+
+
+async def mark_completed_if_finished(config: dict):
+    """Mark the assessment completed once its graph has run to the end."""
+    main_graph = await get_async_main_graph()
+    state = await get_state(main_graph, config)
+    if state.next:
+        return
+    discard_level2_prefetch(config["configurable"]["thread_id"])
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(update(CandidateAssessment).where(
+            CandidateAssessment.assessment_id == config["configurable"]["thread_id"]
+        ).values(status="completed").returning(CandidateAssessment.candidate_uid))
+        candidate_uids = result.scalars().all()
+        await session.commit()
+    candidate_tests_cache.invalidate(*candidate_uids)
+
+
+async def create_submission_job(session, assessment_id: str, level: int, answers: List[dict]) -> SubmissionJob:
+    """
+    Store a level's answers as a queued job. A resubmit while the level's
+    previous job is still pending gets that job back.
+    """
+    result = await session.execute(select(SubmissionJob).where(
+        SubmissionJob.assessment_id == assessment_id,
+        SubmissionJob.level == level,
+        SubmissionJob.status.in_(PENDING),
+    ).limit(1))
+    job = result.scalar_one_or_none()
+    if job is not None:
+        return job
+    job = SubmissionJob(
+        job_id=str(uuid.uuid4()),
+        assessment_id=assessment_id,
+        level=level,
+        answers=json.dumps(answers),
+        status=QUEUED,
+    )
+    session.add(job)
+    await session.commit()
+    return job
+
+
+async def get_submission_job(job_id: str) -> Optional[SubmissionJob]:
+    async with AsyncSessionLocal() as session:
+        return await session.get(SubmissionJob, job_id)
+
+
+async def _set_status(job_id: str, status: str, error: Optional[str] = None):
+    async with AsyncSessionLocal() as session:
+        await session.execute(update(SubmissionJob).where(
+            SubmissionJob.job_id == job_id).values(status=status, error=error))
+        await session.commit()
+    # wake up the waiters, later ones wait on a new event
+    event = _changed.pop(job_id, None)
+    if status in PENDING:
+        _changed[job_id] = asyncio.Event()
+    if event is not None:
+        event.set()
+
+
+def schedule_submission_job(job: SubmissionJob, config: dict):
+    """Run a queued job in the background, unless this process already does."""
+    if job.job_id in _tasks or job.status not in PENDING:
+        return
+    _changed.setdefault(job.job_id, asyncio.Event())
+    task = asyncio.create_task(run_submission_job(
+        job.job_id, job.level, json.loads(job.answers), config, job.created_at))
+    _tasks[job.job_id] = task
+    task.add_done_callback(lambda _: _tasks.pop(job.job_id, None))
+
+
+async def run_submission_job(job_id: str, level: int, answers: List[dict], config: dict, created_at: Optional[datetime] = None):
+    global _slots
+    if _slots is None:
+        _slots = asyncio.Semaphore(SUBMISSION_WORKERS)
+    thread_id = config["configurable"]["thread_id"]
+    status = FAILED
+    async with _slots:
+        submission_jobs_running.inc()
+        try:
+            main_graph = await get_async_main_graph()
+            async with thread_lock(thread_id):
+                state = await get_state(main_graph, config)
+                current_level = state.values.get("current_level") if state.values else None
+                if current_level is None:
+                    raise ValueError("State not found for this assessment")
+                if current_level > level:
+                    # the answers were already applied, e.g. by this job
+                    # before the process restarted
+                    status = READY
+                    await _set_status(job_id, status)
+                    return
+                if not state.next:
+                    raise ValueError("Assessment already completed")
+                if current_level != level:
+                    raise ValueError(f"Current level is {current_level}, not {level}")
+
+                await _set_status(job_id, GRADING)
+                state_cache.invalidate(thread_id)
+                grading = True
+                async for chunk in main_graph.astream(
+                    Command(resume=answers),
+                    config=config,
+                    stream_mode="updates",
+                    checkpoint_during=CHECKPOINT_DURING,
+                ):
+                    if grading and "__interrupt__" not in chunk:
+                        grading = False
+                        await _set_status(job_id, GENERATING_NEXT_LEVEL)
+                await mark_completed_if_finished(config)
+            status = READY
+            await _set_status(job_id, status)
+        except Exception as e:
+            print(f"Submission job {job_id} failed: {e}")
+            await _set_status(job_id, FAILED, str(e))
+        finally:
+            if level == 1:
+                # taken by level 2 once the graph got there, a no-op then
+                discard_level2_prefetch(thread_id)
+            submission_jobs_running.dec()
+            submission_jobs_total.inc(status=status)
+            if created_at is not None:
+                submission_job_seconds.observe(
+                    (datetime.utcnow() - created_at).total_seconds())
+
+
+async def wait_for_submission_job(job_id: str, status: str, timeout: float) -> Optional[SubmissionJob]:
+    """The job once its status is no longer `status`, or after `timeout` seconds."""
+    deadline = time.monotonic() + timeout
+    while True:
+        # taken before reading the job, so a change in between isn't missed
+        event = _changed.get(job_id)
+        job = await get_submission_job(job_id)
+        remaining = deadline - time.monotonic()
+        if job is None or job.status != status or remaining <= 0:
+            return job
+        if event is None:
+            # running in another process
+            await asyncio.sleep(min(remaining, SUBMISSION_POLL_INTERVAL_SECONDS))
+            continue
+        try:
+            await asyncio.wait_for(event.wait(), remaining)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def submission_result(config: dict) -> dict:
+    """
+    The level the assessment is on after a submission, with its questions and
+    the context blocks they reference (see UserState.shared_context).
+    """
+    main_graph = await get_async_main_graph()
+    state = await get_state(main_graph, config)
+    values = state.values
+    current_level = values.get("current_level")
+    progress = values.get("progress", {}).get(current_level)
+    questions = progress.questions if progress else []
+    shared_context = values.get("shared_context") or {}
+    context_ids = {(q.metadata or {}).get("context_id") for q in questions}
+    return {
+        "current_level": current_level,
+        "unlocked_levels": values.get("unlocked_levels"),
+        "completed": not state.next,
+        "questions": questions,
+        "shared_context": {cid: block for cid, block in shared_context.items() if cid in context_ids},
+    }
+
+
+async def touch_submission_jobs() -> int:
+    """Mark the unfinished jobs of this process as alive."""
+    job_ids = list(_tasks)
+    if not job_ids:
+        return 0
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(update(SubmissionJob).where(
+            SubmissionJob.job_id.in_(job_ids),
+            SubmissionJob.status.in_(PENDING),
+        ).values(updated_at=datetime.utcnow()))
+        await session.commit()
+    return result.rowcount
+
+
+async def resume_submission_jobs() -> int:
+    """
+    Rerun unfinished jobs that haven't moved for SUBMISSION_JOB_STALE_SECONDS,
+    i.e. whose process died (live processes touch theirs every sweep). Each
+    is claimed with a conditional update, so only one process picks it up.
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=SUBMISSION_JOB_STALE_SECONDS)
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(
+            select(SubmissionJob, CandidateAssessment.test_id)
+            .join(CandidateAssessment, CandidateAssessment.assessment_id == SubmissionJob.assessment_id)
+            .where(SubmissionJob.status.in_(PENDING), SubmissionJob.updated_at < cutoff))
+        stale = result.all()
+        resumed = 0
+        for job, test_id in stale:
+            claimed = await session.execute(update(SubmissionJob).where(
+                SubmissionJob.job_id == job.job_id,
+                SubmissionJob.updated_at == job.updated_at,
+            ).values(status=QUEUED))
+            await session.commit()
+            if claimed.rowcount:
+                job.status = QUEUED
+                schedule_submission_job(job, graph_config(job.assessment_id, test_id))
+                resumed += 1
+    if resumed:
+        print(f"Resumed {resumed} stale submission jobs")
+    return resumed
+
+
+async def run_submission_job_sweep_forever():
+    """Background loop started with the app, one pass per SUBMISSION_JOB_SWEEP_INTERVAL_SECONDS."""
+    while True:
+        try:
+            await touch_submission_jobs()
+            await resume_submission_jobs()
+        except Exception as e:
+            print(f"Submission job sweep failed: {e}")
+        await asyncio.sleep(SUBMISSION_JOB_SWEEP_INTERVAL_SECONDS)
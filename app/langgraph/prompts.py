@@ -131,3 +131,91 @@ For MSQ (Multiple options are correct):
   "max_time_required": "Time in seconds"
 
 """)
+
+
+# Batched variants: one request covers several skills and returns a JSON
+# object keyed by skill, each value in the same format as the single-skill prompt.
+
+lvl1_batch_prompt_template = ChatPromptTemplate.from_template("""
+You are an expert technical evaluator. Your task is to assess a candidate’s knowledge at the beginner level in each of the following skills: {skills}.
+
+For every skill, generate {num} multiple choice questions (MCQs) that comprehensively evaluate their understanding of that skill.
+
+Strictly follow the JSON format provided below. Do not include any explanations, extra text, or surrounding Markdown such as json```. Your response must start with `{{` and end with `}}` representing an object that has exactly one key per skill, spelled exactly as given, whose value is an array of that skill's questions, and be valid JSON.
+
+JSON format for MCQ:
+  "question": "Your question text here",
+  "options": ["Option 1", "Option 2", "Option 3", "Option 4"],
+  "answer": "The correct option",
+  "max_time_required": "Time in seconds"
+
+JSON format of the response:
+{{
+  "Skill 1": [MCQ, MCQ, ...],
+  "Skill 2": [MCQ, MCQ, ...]
+}}
+""")
+
+
+lvl2_batch_prompt_template = ChatPromptTemplate.from_template("""
+Description: You are an expert technical evaluator. Your job is to evaluate the candiadte's knowledge at the intermidiate level in each of the following skills: {skills}, through multiple select questions. The candidate have done following projects {projects} and have following experience {experience}.
+
+Task: For every skill, generate {num} multiple select question, where multiple options may correct or only one option is correct.
+
+Instructions: Strictly follow the JSON format provided below. Do not include any explanations, extra text, or surrounding Markdown such as json```. Your response must start with `{{` and end with `}}` representing an object that has exactly one key per skill, spelled exactly as given, whose value is an array of that skill's questions, and must be valid JSON.
+
+JSON format for MSQ (answers is the list of correct options):
+  "question": "Your question text here",
+  "options": ["Option 1", "Option 2", "Option 3", "Option 4"],
+  "answers": ["Correct Option 1", "Correct Option 2"],
+  "max_time_required": "Time in seconds"
+
+JSON format of the response:
+{{
+  "Skill 1": [MSQ, MSQ, ...],
+  "Skill 2": [MSQ, MSQ, ...]
+}}
+""")
+
+
+lvl3_batch_prompt_template = ChatPromptTemplate.from_template("""
+You are an expert evaluator. Your task is to test whether a candidate is capable of performing a given job role based on its description. Use the job title, company, responsibilities, and qualifications to craft realistic, scenario-based questions.
+
+Job Description:
+Title: {title}
+Company: {company}
+Responsibilities: {responsibilities}
+Qualifications: {qualifications}
+
+Task: For each of the following skills: {skills}, generate {num} scenario-based questions. Each question must be derived directly from the job responsibilities and required qualifications. These scenarios should reflect real-world situations the candidate might face in this job and should test their practical thinking, problem-solving, and decision-making abilities.
+
+Instructions:
+1. For each question, randomly decide whether it should be a multiple choice question (MCQ) or a multiple select question (MSQ).
+2. Strictly follow the corresponding JSON format based on the type you choose.
+3. Do not mention whether it is MCQ or MSQ in the output.
+4. Do not include any explanations, extra text, or surrounding Markdown such as ```json. Your response must start with `{{` and end with `}}`, representing a valid JSON object that has exactly one key per skill, spelled exactly as given, whose value is an array of that skill's questions.
+5. Base each scenario on actual job responsibilities or qualifications.
+
+
+JSON Formats:
+
+For MCQ (Only one option is correct):
+  "Scenario" : "A real-world situation related to the job description where the candidate must apply relevant knowledge and skills.",
+  "question": "A question testing the candidate's ability to act or decide in that scenario.",
+  "options": ["Option 1", "Option 2", "Option 3", "Option 4", "Option 5"],
+  "answer": "The correct option",
+  "max_time_required": "Time in seconds"
+
+For MSQ (Multiple options are correct):
+  "Scenario" : "A real-world situation related to the job description where the candidate must apply relevant knowledge and skills.",
+  "question": "A question testing the candidate's ability to act or decide in that scenario.",
+  "options": ["Option 1", "Option 2", "Option 3", "Option 4", "Option 5"],
+  "answers": ["Correct Option 1", "Correct Option 2"],
+  "max_time_required": "Time in seconds"
+
+JSON format of the response:
+{{
+  "Skill 1": [question, question, ...],
+  "Skill 2": [question, question, ...]
+}}
+""")
@@ -1,10 +1,16 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.db.database import Base, engine
+from app.db.database import Base, engine, async_create_indexes
 from app.api.routes import auth
 from app.api.routes import test_assessment
+from app.api.routes import metrics
+import asyncio
 import threading
 from app.worker.queue import start_worker
+from app.core.checkpointer import close_async_memory
+from app.core.checkpoint_gc import run_checkpoint_gc_forever
+from app.core.config import CHECKPOINT_GC_ENABLED
+from app.langgraph.other.submission_jobs import run_submission_job_sweep_forever
 
 
 app = FastAPI()
@@ -17,7 +23,28 @@ app.add_middleware(
 )
 app.include_router(auth.router, prefix='/auth', tags=["Auth"])
 app.include_router(test_assessment.router, prefix='/test', tags=["Test"])
+app.include_router(metrics.router, tags=["Metrics"])
 
 # Start the worker in a separate thread
 worker_thread = threading.Thread(target=start_worker, daemon=True)
 worker_thread.start()
+
+
+_background_tasks = set()
+
+
+@app.on_event("startup")
+async def startup():
+    # indexes added to the models after their tables were created
+    await async_create_indexes()
+    # submissions left unfinished by a process that died, now and later on
+    _background_tasks.add(asyncio.create_task(run_submission_job_sweep_forever()))
+    if CHECKPOINT_GC_ENABLED:
+        _background_tasks.add(asyncio.create_task(run_checkpoint_gc_forever()))
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    for task in _background_tasks:
+        task.cancel()
+    await close_async_memory()
@@ -0,0 +1,39 @@
+import json
+from datetime import datetime
+from sqlalchemy import select
+from app.db.database import AsyncSessionLocal
+from app.db.models import QuestionPool
+from app.core.config import LEVEL1_QUESTIONS_PER_SKILL, LEVEL1_POOL_MULTIPLIER
+from app.langgraph.other.question_pool import generate_level1_pool
+from app.core.llm_limiter import BACKGROUND, llm_priority
+
+
+async def build_level1_pool(test_id: str, required_skills: list[str]):
+    """
+    Pre-generate the level 1 question pool for a test.
+    Runs as a background task after create_test has responded.
+    """
+    num_per_skill = LEVEL1_QUESTIONS_PER_SKILL * LEVEL1_POOL_MULTIPLIER
+    status = "ready"
+    try:
+        with llm_priority(BACKGROUND):
+            pool = await generate_level1_pool(
+                required_skills, num_per_skill, test_id=test_id)
+        print(
+            f"Generated level 1 pool for test {test_id}: {sum(len(q) for q in pool.values())} questions")
+    except Exception as e:
+        print(f"Error generating level 1 pool for test {test_id}: {e}")
+        pool = {}
+        status = "failed"
+
+    async with AsyncSessionLocal() as session:
+        query = await session.execute(select(QuestionPool).where(
+            QuestionPool.test_id == test_id, QuestionPool.level == 1))
+        question_pool = query.scalar_one_or_none()
+        if not question_pool:
+            question_pool = QuestionPool(test_id=test_id, level=1)
+            session.add(question_pool)
+        question_pool.status = status
+        question_pool.questions = json.dumps(pool)
+        question_pool.updated_at = datetime.utcnow()
+        await session.commit()
@@ -1,4 +1,5 @@
 import json
+from typing import List, Tuple
 import asyncio
 import time
 from app.worker.resume_worker import process_resume
@@ -22,6 +23,16 @@ async def enqueue_resume_task(candidate_uid: str, resume_link: str):
     print(f"Enqueued task for candidate {candidate_uid} in memory queue")
 
 
+async def enqueue_resume_tasks(tasks: List[Tuple[str, str]]):
+    """
+    Enqueue resume parsing tasks, (candidate_uid, resume_link) pairs, to the
+    in-memory queue in one go.
+    """
+    in_memory_queue.extend({"candidate_uid": candidate_uid, "resume_link": resume_link}
+                           for candidate_uid, resume_link in tasks)
+    print(f"Enqueued {len(tasks)} tasks in memory queue")
+
+
 async def process_queue():
     """
     Process tasks from the in-memory queue.
@@ -5,8 +5,12 @@ from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
 from app.db.models import Candidate
 from sqlalchemy import select
-import openai
-from app.core.config import OPENAI_API_KEY
+import asyncio
+from openai import AsyncOpenAI
+from app.core.config import OPENAI_API_KEY, LLM_COMPLETION_TOKENS_ESTIMATE, llm_limiter
+from app.core.llm_limiter import BACKGROUND, llm_priority
+from app.core.llm_metrics import record_llm_call
+import time
 from app.db.database import DATABASE_URL
 from app.langgraph.other.parse_resume import parse_resume
 
@@ -16,6 +20,20 @@ worker_engine = create_async_engine(DATABASE_URL)
 WorkerSessionLocal = sessionmaker(
     bind=worker_engine, class_=AsyncSession, expire_on_commit=False, autoflush=False, autocommit=False)
 
+# Raw OpenAI client for the vision call, it goes through the same limiter as
+# the langchain model. Created on first use so the app imports without a key
+# when LLM_BACKEND doesn't need one.
+_openai_client = None
+# upper bound of what a single high detail page image costs
+RESUME_IMAGE_TOKENS = 1105
+
+
+def get_openai_client() -> AsyncOpenAI:
+    global _openai_client
+    if _openai_client is None:
+        _openai_client = AsyncOpenAI(api_key=OPENAI_API_KEY)
+    return _openai_client
+
 
 def get_gdrive_download_url(view_url: str) -> str:
     """
@@ -50,7 +68,6 @@ async def convert_pdf_to_base64(pdf_bytes: bytes) -> str:
 
 async def parse_resume_with_openai(base64_img: str) -> str:
     print("Parsing resume with OpenAI")
-    openai.api_key = OPENAI_API_KEY
     messages = [
         {
             "role": "system",
@@ -68,15 +85,35 @@ async def parse_resume_with_openai(base64_img: str) -> str:
             ]
         }
     ]
-    response = openai.chat.completions.create(
-        model="gpt-4o",
-        messages=messages,
-    )
+    async with llm_limiter.alimit(RESUME_IMAGE_TOKENS + LLM_COMPLETION_TOKENS_ESTIMATE) as reservation:
+        # not a langchain model, so no metrics callback; recorded by hand
+        start = time.perf_counter()
+        try:
+            response = await get_openai_client().chat.completions.create(
+                model="gpt-4o",
+                messages=messages,
+            )
+        except Exception:
+            record_llm_call("gpt-4o", time.perf_counter() - start, status="error",
+                            graph="ingestion", node="resume_vision")
+            raise
+        usage = response.usage
+        record_llm_call(response.model, time.perf_counter() - start,
+                        usage.prompt_tokens if usage else 0,
+                        usage.completion_tokens if usage else 0,
+                        graph="ingestion", node="resume_vision")
+        reservation.record_usage(usage.total_tokens if usage else None)
 
     return response.choices[0].message.content
 
 
 async def process_resume(candidate_uid: str, resume_link: str):
+    # resume parsing yields to candidates waiting on their questions
+    with llm_priority(BACKGROUND):
+        await _process_resume(candidate_uid, resume_link)
+
+
+async def _process_resume(candidate_uid: str, resume_link: str):
     try:
         # 1. Download the resume PDF
         pdf_bytes = await download_resume_pdf(get_gdrive_download_url(resume_link))
@@ -88,7 +125,8 @@ async def process_resume(candidate_uid: str, resume_link: str):
         parsed_text = await parse_resume_with_openai(base64_img)
 
         # 4. convert the parsed text into formated text using openai
-        parsed_resume = parse_resume(resume_text=parsed_text)
+        # sync llm call, keep it (and any wait for the limiter) off the loop
+        parsed_resume = await asyncio.to_thread(parse_resume, resume_text=parsed_text)
 
         print(f"parsed resume {parsed_resume}")
 
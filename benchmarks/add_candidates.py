@@ -0,0 +1,157 @@
+"""
+Time and statements to add an upload of candidates to a test: the per-row
+loop /{test_id}/add-candidates used to run against the set-based path of
+app/db/onboarding.py.
+
+    python benchmarks/add_candidates.py
+    python benchmarks/add_candidates.py --rows 2000 50000 --legacy-max-rows 2000 --output onboarding.json
+    python benchmarks/add_candidates.py --database-url postgresql+asyncpg://...
+
+Every upload goes to a new test. 10% of its emails already belong to
+candidates and 1% of its rows repeat an earlier email. Both paths hash the
+generated passwords the same way, so the difference is the database work.
+The hashes use bcrypt cost --bcrypt-rounds (default 4) instead of the app's
+default, which would take hours for 50k rows on one core. Against a fresh
+SQLite file in --workdir by default.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+import uuid
+from collections import Counter
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+async def legacy_add_candidates(session, test_id: str, rows: list) -> list:
+    """The loop as it was: a select per email and per profile, a flush per new user."""
+    from datetime import datetime
+    from sqlalchemy import select
+    from app.core.security import generate_password, hash_password
+    from app.db.models import Candidate, CandidateAssessment, User
+
+    created = []
+    for row in rows:
+        existing_user = (await session.execute(select(User).where(User.email == row["email"]))).scalar_one_or_none()
+        if existing_user:
+            candidate_uid = existing_user.uid
+            (await session.execute(select(Candidate).where(Candidate.uid == candidate_uid))).scalar_one_or_none()
+        else:
+            user = User(uid=str(uuid.uuid4()), email=row["email"], role="candidate",
+                        password_hash=hash_password(generate_password()),
+                        name=row["email"].split('@')[0], created_at=datetime.utcnow(), updated_at=datetime.utcnow())
+            session.add(user)
+            await session.flush()
+            session.add(Candidate(uid=user.uid, resume_text="Waiting for resume parsing", created_at=datetime.utcnow()))
+            candidate_uid = user.uid
+        assessment = CandidateAssessment(assessment_id=str(uuid.uuid4()), candidate_uid=candidate_uid, test_id=test_id,
+                                         started_at=datetime.utcnow(), updated_at=datetime.utcnow(), status="not_started")
+        session.add(assessment)
+        created.append({"email": row["email"], "candidate_uid": candidate_uid})
+    await session.commit()
+    return created
+
+
+async def new_test(session_factory) -> str:
+    from app.db.models import Test
+
+    async with session_factory() as session:
+        test = Test(test_id=str(uuid.uuid4()), title="Bench", jd_text="{}")
+        session.add(test)
+        await session.commit()
+        return test.test_id
+
+
+def upload(rows: int, existing: list) -> list:
+    run = uuid.uuid4().hex[:8]
+    emails = [f"candidate{i}-{run}@bench.local" for i in range(rows - rows // 10 - rows // 100)]
+    emails += existing[:rows // 10]
+    emails += emails[:rows // 100]
+    return [{"email": email, "resume_link": "https://drive.google.com/file/d/bench/view"} for email in emails]
+
+
+async def run(args) -> dict:
+    from sqlalchemy import event
+    from app.core import security
+    from app.db import onboarding
+    from app.db.database import AsyncSessionLocal, async_create_all, engine
+    from app.db.onboarding import onboard_candidates
+
+    if args.bcrypt_rounds:
+        # both paths look hash_password up at call time
+        security.hash_password = onboarding.hash_password = \
+            security.pwd_context.handler("bcrypt").using(rounds=args.bcrypt_rounds).hash
+
+    await async_create_all()
+    statements = Counter()
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements["current"] += 1
+
+    # candidates that exist before the uploads
+    async with AsyncSessionLocal() as session:
+        seeded = [{"email": f"existing{i}-{uuid.uuid4().hex[:8]}@bench.local", "resume_link": "-"}
+                  for i in range(max(args.rows) // 10)]
+        await onboard_candidates(session, await new_test(AsyncSessionLocal), seeded)
+        await session.commit()
+    existing = [row["email"] for row in seeded]
+
+    results = {}
+    for rows in args.rows:
+        paths = {"bulk": onboard_candidates}
+        if rows <= args.legacy_max_rows:
+            paths["legacy"] = legacy_add_candidates
+        for name, add in paths.items():
+            test_id = await new_test(AsyncSessionLocal)
+            data = upload(rows, existing)
+            statements.clear()
+            start = time.perf_counter()
+            async with AsyncSessionLocal() as session:
+                outcomes = await add(session, test_id, data)
+                await session.commit()
+            seconds = time.perf_counter() - start
+            results[f"{name} {rows}"] = {
+                "rows": rows, "seconds": seconds, "statements": statements["current"],
+                "outcomes": dict(Counter(o.get("status", "added") for o in outcomes)),
+            }
+            print(f"{name:<7} {rows:>7} rows {seconds:>8.2f}s {statements['current']:>7} statements "
+                  f"{results[f'{name} {rows}']['outcomes']}")
+    await engine.dispose()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[2000, 50000])
+    parser.add_argument("--legacy-max-rows", type=int, default=2000,
+                        help="largest upload also run through the per-row loop")
+    parser.add_argument("--bcrypt-rounds", type=int, default=4,
+                        help="bcrypt cost of the generated passwords, 0 keeps the app's default")
+    parser.add_argument("--database-url", help="SQLAlchemy async URL, default a fresh SQLite file in --workdir")
+    parser.add_argument("--workdir", default=os.path.join(tempfile.gettempdir(), "ai_quiz_onboarding"))
+    parser.add_argument("--output", help="also write the results to this JSON file")
+    args = parser.parse_args()
+
+    # the app reads its configuration (and opens checkpoints.sqlite3) on import
+    os.makedirs(args.workdir, exist_ok=True)
+    os.chdir(args.workdir)
+    sys.path.insert(0, REPO_ROOT)
+    database = os.path.join(args.workdir, "onboarding.db")
+    if not args.database_url and os.path.exists(database):
+        os.remove(database)
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite+aiosqlite:///{database}"
+    os.environ.setdefault("LLM_BACKEND", "synthetic")
+
+    results = asyncio.run(run(args))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+"""
+Time to regrade a whole cohort with app.langgraph.other.bulk_grading,
+against grading every candidate with a Python loop.
+
+    python benchmarks/bulk_grading.py
+    python benchmarks/bulk_grading.py --candidates 1000 10000 100000 --output grading.json
+    python benchmarks/bulk_grading.py --database-url postgresql+asyncpg://...
+
+Every candidate answered 20 level 1 MCQs sampled from a pool of 200, and
+10 level 3 questions of their own, half of them MSQs. Answers are random.
+The in-memory pass grades the cohort from its submission entries. The
+end-to-end pass stores the cohort as graded levels of a test and times
+regrade_test: loading the levels, grading and writing the scores back.
+It runs against a fresh SQLite file in --workdir by default.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+from collections import Counter
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BATCH = 5000
+
+SKILLS = ["Python", "FastAPI", "PostgreSQL", "Docker", "AWS"]
+POOL_SIZE = 200
+LEVEL1_QUESTIONS = 20
+LEVEL3_QUESTIONS = 10
+
+
+def make_question(rng: random.Random, qid: str, level: int, msq: bool = False):
+    from app.langgraph.models import Question
+
+    options = [f"{qid} option {i}" for i in range(4)]
+    question = Question(id=qid, text=qid, options=options, level=level,
+                        metadata={"skill": SKILLS[rng.randrange(len(SKILLS))]})
+    if msq:
+        question.correct_answers = sorted(rng.sample(options, rng.randint(2, 3)))
+    else:
+        question.correct_answer = rng.choice(options)
+    return question
+
+
+def make_cohort(rng: random.Random, candidates: int):
+    from app.langgraph.models import LevelProgress
+
+    pool = [make_question(rng, f"pool-{i}", 1) for i in range(POOL_SIZE)]
+    cohort = []
+    for c in range(candidates):
+        level1 = rng.sample(pool, LEVEL1_QUESTIONS)
+        level3 = [make_question(rng, f"c{c}-l3-{i}", 3, msq=i % 2 == 0)
+                  for i in range(LEVEL3_QUESTIONS)]
+        progress = []
+        for level, questions in ((1, level1), (3, level3)):
+            answers = {q.id: rng.sample(q.options, rng.randint(1, 3)) if q.correct_answers
+                       else rng.choice(q.options) for q in questions}
+            progress.append(LevelProgress(level=level, questions=questions, answers=answers, completed=True))
+        cohort.append((f"assessment-{c}", progress))
+    return cohort
+
+
+def loop_grade(cohort) -> dict:
+    """
+    One candidate at a time, the way level1_evaluation scores a level, with
+    the same per level and per skill breakdown.
+    """
+    totals = {}
+    for assessment_id, progress in cohort:
+        credit, counted = Counter(), Counter()
+        for level_progress in progress:
+            for q in level_progress.questions:
+                answer = level_progress.answers.get(q.id)
+                key = q.correct_answers or q.correct_answer
+                if isinstance(key, list):
+                    chosen = set(answer or [])
+                    score = max(0, len(chosen & set(key)) - len(chosen - set(key))) / len(key)
+                else:
+                    score = answer == key
+                for group in ("total", ("level", q.level), ("skill", q.metadata["skill"])):
+                    credit[group] += score
+                    counted[group] += 1
+        totals[assessment_id] = {group: 100 * credit[group] / counted[group] for group in counted}
+    return totals
+
+
+def check(expected: dict, assessment_ids: list, grades: dict, skills: list):
+    for row, assessment_id in enumerate(assessment_ids):
+        scores = {"total": grades["total"][row]}
+        scores.update({("level", level): grades["levels"][row, level - 1] for level in (1, 3)})
+        scores.update({("skill", skill): grades["skills"][row, i] for i, skill in enumerate(skills)
+                       if ("skill", skill) in expected[assessment_id]})
+        assert scores.keys() == expected[assessment_id].keys(), assessment_id
+        for group, score in scores.items():
+            assert abs(expected[assessment_id][group] - score) < 1e-6, (assessment_id, group)
+
+
+def in_memory(cohort, expected: dict) -> dict:
+    from app.langgraph.other.answer_key import submission_entries
+    from app.langgraph.other.bulk_grading import AnswerMatrix, grade_matrix
+
+    submissions = [(assessment_id, p.level, submission_entries(p.questions, p.answers))
+                   for assessment_id, progress in cohort for p in progress]
+    start = time.perf_counter()
+    matrix = AnswerMatrix()
+    for assessment_id, level, entries in submissions:
+        matrix.add_entries(matrix.add_candidate(assessment_id), level, entries)
+    arrays = matrix.freeze()
+    built = time.perf_counter()
+    grades = grade_matrix(arrays, len(matrix.assessment_ids), len(matrix.skills))
+    graded = time.perf_counter()
+    check(expected, matrix.assessment_ids, grades, matrix.skills)
+    return {"answers": int(arrays["rows"].size), "build_seconds": built - start, "grade_seconds": graded - built}
+
+
+async def seed(cohort) -> str:
+    """A test with the cohort's assessments and graded levels."""
+    from sqlalchemy import insert
+    from app.db.database import AsyncSessionLocal
+    from app.db.models import Candidate, CandidateAssessment, LevelSubmission, Test, User
+    from app.langgraph.other.answer_key import submission_entries
+
+    run = uuid.uuid4().hex[:8]
+    test_id = str(uuid.uuid4())
+    async with AsyncSessionLocal() as session:
+        await session.execute(insert(Test), [{"test_id": test_id, "title": "Bench", "jd_text": "{}"}])
+        for start in range(0, len(cohort), BATCH):
+            batch = cohort[start:start + BATCH]
+            uids = [f"{assessment_id}-{run}" for assessment_id, _ in batch]
+            await session.execute(insert(User), [{
+                "uid": uid, "email": f"{uid}@bench.local", "password_hash": "-", "role": "candidate"} for uid in uids])
+            await session.execute(insert(Candidate), [{"uid": uid} for uid in uids])
+            await session.execute(insert(CandidateAssessment), [{
+                "assessment_id": f"{assessment_id}-{run}", "candidate_uid": uid, "test_id": test_id,
+                "status": "completed"} for (assessment_id, _), uid in zip(batch, uids)])
+            await session.execute(insert(LevelSubmission), [{
+                "assessment_id": f"{assessment_id}-{run}", "test_id": test_id, "level": p.level,
+                "entries": json.dumps(submission_entries(p.questions, p.answers))}
+                for assessment_id, progress in batch for p in progress])
+        await session.commit()
+    return test_id
+
+
+async def end_to_end(cohort, expected: dict) -> dict:
+    from app.langgraph.other.bulk_grading import regrade_test
+
+    test_id = await seed(cohort)
+    start = time.perf_counter()
+    report = await regrade_test(test_id, details=True)
+    seconds = time.perf_counter() - start
+    assert report["graded"] == len(cohort)
+    for assessment in report["assessments"]:
+        expected_total = expected[assessment["assessment_id"].rsplit("-", 1)[0]]["total"]
+        assert abs(assessment["score"] - round(expected_total, 2)) < 0.01, assessment["assessment_id"]
+    return {"regrade_seconds": seconds, **report["timings"]}
+
+
+async def run_all(args) -> dict:
+    from app.db.database import async_create_all, engine
+
+    if not args.in_memory_only:
+        await async_create_all()
+    results = {}
+    for candidates in args.candidates:
+        cohort = make_cohort(random.Random(args.seed), candidates)
+        start = time.perf_counter()
+        expected = loop_grade(cohort)
+        result = {"loop_seconds": time.perf_counter() - start, **in_memory(cohort, expected)}
+        if not args.in_memory_only:
+            result.update(await end_to_end(cohort, expected))
+        results[candidates] = result
+        print(f"{candidates:>10} {result['answers']:>9} {result['loop_seconds']:>8.2f}s {result['build_seconds']:>8.2f}s "
+              f"{result['grade_seconds']:>8.3f}s", end="")
+        if "regrade_seconds" in result:
+            print(f" {result['load_seconds']:>8.2f}s {result['write_seconds']:>8.2f}s {result['regrade_seconds']:>8.2f}s", end="")
+        print()
+    await engine.dispose()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--candidates", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--in-memory-only", action="store_true", help="skip the end-to-end regrade")
+    parser.add_argument("--database-url", help="SQLAlchemy async URL, default a fresh SQLite file in --workdir")
+    parser.add_argument("--workdir", default=os.path.join(tempfile.gettempdir(), "ai_quiz_grading"))
+    parser.add_argument("--output", help="also write the results to this JSON file")
+    args = parser.parse_args()
+
+    # the app reads its configuration (and opens checkpoints.sqlite3) on import
+    os.makedirs(args.workdir, exist_ok=True)
+    os.chdir(args.workdir)
+    sys.path.insert(0, REPO_ROOT)
+    database = os.path.join(args.workdir, "grading.db")
+    if not args.database_url and os.path.exists(database):
+        os.remove(database)
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite+aiosqlite:///{database}"
+    os.environ.setdefault("LLM_BACKEND", "synthetic")
+
+    print(f"{'candidates':>10} {'answers':>9} {'loop':>9} {'build':>9} {'grade':>9}"
+          + ("" if args.in_memory_only else f" {'load':>9} {'write':>9} {'regrade':>9}"))
+    results = asyncio.run(run_all(args))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""
+Checkpoint writes and bytes per assessment with each CHECKPOINT_DURABILITY
+mode.
+
+    python benchmarks/checkpoint_durability.py
+    python benchmarks/checkpoint_durability.py --skills 5 10 20 --output durability.json
+
+Every run takes one assessment through the main graph the way the API does:
+start (level 1 generated, stops at the level 1 interrupt), then the level 1
+submit (evaluation and level 2 generation, up to the end of the graph). LLM
+calls go to the synthetic backend without latency or rate limits, and
+checkpoints to a fresh SQLite file in --workdir with the app's serializer.
+Bytes are the serialized checkpoints and pending writes handed to the saver.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODES = {"step": True, "boundary": False}
+SKILLS = ["Python", "FastAPI", "PostgreSQL", "Docker", "AWS", "REST APIs", "System Design",
+          "Redis", "Kubernetes", "Testing", "Security", "Git", "Linux", "Kafka", "GraphQL",
+          "Terraform", "Observability", "Celery", "Microservices", "CI/CD"]
+
+
+class CountingSaver:
+    """Counts the calls and serialized bytes going to the wrapped saver."""
+
+    def __init__(self, saver):
+        self.saver = saver
+        self.calls = Counter()
+        self.bytes = Counter()
+        saver.aput = self._count("aput", saver.aput, self._checkpoint_bytes)
+        saver.aput_writes = self._count(
+            "aput_writes", saver.aput_writes, self._writes_bytes)
+
+    def _checkpoint_bytes(self, config, checkpoint, metadata, new_versions, *args, **kwargs):
+        return len(self.saver.serde.dumps_typed(checkpoint)[1])
+
+    def _writes_bytes(self, config, writes, *args, **kwargs):
+        return sum(len(self.saver.serde.dumps_typed(value)[1]) for _, value in writes)
+
+    def _count(self, operation, method, size):
+        async def counted(*args, **kwargs):
+            self.calls[operation] += 1
+            self.bytes[operation] += size(*args, **kwargs)
+            return await method(*args, **kwargs)
+        return counted
+
+
+def initial_state(skills):
+    from app.langgraph.models import JobDescription, Resume, userstate_initializer
+
+    state = userstate_initializer()
+    state.user_id = "bench"
+    state.job_description = JobDescription(
+        title="Senior Backend Engineer", company="Acme", required_skills=skills,
+        responsibilities=["Build and run backend services"],
+        qualifications=["4+ years of backend development"])
+    state.resume = Resume(
+        education=["BSc in Computer Science"], experience=["4 years as Software Engineer at Acme"],
+        skills=skills, projects=["payments API", "internal job scheduler"])
+    return state
+
+
+async def run_assessment(skills, checkpoint_during: bool, path: str) -> dict:
+    import aiosqlite
+    from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+    from langgraph.types import Command
+    from app.core.config import checkpoint_serde
+    from app.langgraph.graph.main import main_graph_builder
+
+    async with aiosqlite.connect(path) as conn:
+        counter = CountingSaver(AsyncSqliteSaver(conn, serde=checkpoint_serde))
+        graph = main_graph_builder.compile(checkpointer=counter.saver)
+        config = {"configurable": {"thread_id": f"bench-{len(skills)}"}}
+
+        start = time.perf_counter()
+        await graph.ainvoke(initial_state(skills), config=config,
+                            checkpoint_during=checkpoint_during)
+        state = await graph.aget_state(config)
+        answers = [{"question_id": q.id, "answer": q.options[0]}
+                   for q in state.values["progress"][1].questions]
+        await graph.ainvoke(Command(resume=answers), config=config,
+                            checkpoint_during=checkpoint_during)
+        duration = time.perf_counter() - start
+
+        state = await graph.aget_state(config)
+        assert not state.next, "the assessment should have run to the end"
+        return {
+            "questions": {level: len(progress.questions)
+                          for level, progress in state.values["progress"].items()},
+            "checkpoints": counter.calls["aput"],
+            "writes": counter.calls["aput_writes"],
+            "checkpoint_bytes": counter.bytes["aput"],
+            "write_bytes": counter.bytes["aput_writes"],
+            "seconds": duration,
+        }
+
+
+async def run(args) -> dict:
+    results = {}
+    for count in args.skills:
+        skills = SKILLS[:count]
+        key = f"{count} skills"
+        results[key] = {}
+        for mode, checkpoint_during in MODES.items():
+            path = os.path.join(args.workdir, f"durability-{mode}-{count}.sqlite3")
+            if os.path.exists(path):
+                os.remove(path)
+            results[key][mode] = await run_assessment(skills, checkpoint_during, path)
+    return results
+
+
+def print_report(results: dict):
+    print(f"{'assessment':<12} {'mode':<9} {'checkpoints':>11} {'writes':>7} {'bytes':>12} {'saved':>7} {'time':>8}")
+    for key, modes in results.items():
+        step_bytes = modes["step"]["checkpoint_bytes"] + modes["step"]["write_bytes"]
+        for mode, result in modes.items():
+            total = result["checkpoint_bytes"] + result["write_bytes"]
+            saved = 1 - total / step_bytes if step_bytes else 0.0
+            print(f"{key:<12} {mode:<9} {result['checkpoints']:>11} {result['writes']:>7} "
+                  f"{total / 1024:>8.1f} KiB {saved:>6.0%} {result['seconds'] * 1000:>6.0f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--skills", type=int, nargs="+", default=[5, 10, 20],
+                        help=f"required skills per assessment, up to {len(SKILLS)}")
+    parser.add_argument("--workdir", default=os.path.join(tempfile.gettempdir(), "ai_quiz_durability"))
+    parser.add_argument("--output", help="also write the results to this JSON file")
+    args = parser.parse_args()
+
+    # the app reads its configuration (and opens checkpoints.sqlite3) on import
+    os.makedirs(args.workdir, exist_ok=True)
+    os.chdir(args.workdir)
+    sys.path.insert(0, REPO_ROOT)
+    os.environ.update({
+        "LLM_BACKEND": "synthetic",
+        "LLM_SYNTHETIC_LATENCY_SECONDS": "0",
+        "LLM_CACHE_ENABLED": "false",
+        "LEVEL2_PREFETCH_ENABLED": "false",
+        # no rate limits, the time column then is graph and checkpoint overhead
+        "LLM_REQUESTS_PER_MINUTE": "0",
+        "LLM_TOKENS_PER_MINUTE": "0",
+    })
+
+    results = asyncio.run(run(args))
+    print_report(results)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
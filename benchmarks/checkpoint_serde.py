@@ -0,0 +1,70 @@
+"""
+Size and encode/decode time of a full assessment checkpoint with
+langgraph's default serializer and with app.core.checkpoint_serde.
+
+    python benchmarks/checkpoint_serde.py
+    python benchmarks/checkpoint_serde.py --levels 1 3 9 --output serde.json
+
+The checkpoints are the microbenchmark fixtures: 5 to 50 skills with 5 or
+10 questions per skill at each of the three levels.
+"""
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from microbench import QUICK_SIZES, SIZES, Fixture, format_seconds, time_call  # noqa: E402
+
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer  # noqa: E402
+from app.core.checkpoint_serde import CompactSerializer  # noqa: E402
+
+
+def measure(serde, checkpoint, min_time: float, repeats: int) -> dict:
+    serialized = serde.dumps_typed(checkpoint)
+    assert serde.loads_typed(serialized) == checkpoint
+    return {
+        "type": serialized[0],
+        "bytes": len(serialized[1]),
+        "dumps": time_call(lambda: serde.dumps_typed(checkpoint), min_time, repeats)["median"],
+        "loads": time_call(lambda: serde.loads_typed(serialized), min_time, repeats)["median"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--levels", type=int, nargs="+", default=[1],
+                        help="zstd compression levels to compare")
+    parser.add_argument("--quick", action="store_true",
+                        help="only the smallest and largest size")
+    parser.add_argument("--min-time", type=float, default=0.05,
+                        help="seconds per timing repeat")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--output", help="also write the results to this JSON file")
+    args = parser.parse_args()
+
+    serializers = {"jsonplus": JsonPlusSerializer()}
+    for level in args.levels:
+        serializers[f"compact/zstd-{level}"] = CompactSerializer(compression_level=level)
+
+    print(f"{'checkpoint':<12} {'serializer':<18} {'size':>12} {'ratio':>7} {'dumps':>10} {'loads':>10}")
+    results = {}
+    for skills, per_skill in QUICK_SIZES if args.quick else SIZES:
+        checkpoint = Fixture(skills, per_skill).checkpoint
+        key = f"{skills}x{per_skill}"
+        results[key] = {}
+        for name, serde in serializers.items():
+            result = measure(serde, checkpoint, args.min_time, args.repeats)
+            results[key][name] = result
+            ratio = results[key]["jsonplus"]["bytes"] / result["bytes"]
+            print(f"{key:<12} {name:<18} {result['bytes'] / 1024:>8.1f} KiB {ratio:>6.1f}x "
+                  f"{format_seconds(result['dumps']):>10} {format_seconds(result['loads']):>10}",
+                  flush=True)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"python": sys.version.split()[0], "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,450 @@
+"""
+HTTP load test for the assessment lifecycle.
+
+    python benchmarks/load_test.py --recruiters 4 --candidates 10 \\
+        --llm-latency 1.5 --llm-latency-distribution lognormal --output before.json
+    python benchmarks/load_test.py ... --output after.json --compare before.json
+
+Every simulated recruiter signs up, logs in, creates a test and adds its
+candidates. Every candidate logs in, waits for its resume to be parsed,
+starts the test and submits every level until the assessment is completed.
+
+By default the app is booted in this process (uvicorn on a free port, same
+event loop) against a fresh SQLite database in --workdir. LLM calls go to
+the synthetic backend, with the latency distribution and error rate given
+on the command line, and the resume download and vision steps are replaced
+by a stand-in with the same latency. Event loop lag is then measured on
+the server's loop. With --url the requests go to a running server instead;
+start it with LLM_BACKEND=synthetic, and note that lag is then measured on
+the client only.
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+
+import httpx
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+JD_TEXT = """Senior Backend Engineer
+We are looking for a backend engineer with strong Python and FastAPI skills,
+experience running PostgreSQL and Docker in production on AWS, and a good
+grasp of REST APIs and System Design."""
+
+RESUME_TEXT = """Jane Doe, Backend Engineer
+Education: BSc in Computer Science
+Experience: 4 years as Software Engineer at Acme, building Python and FastAPI
+services on PostgreSQL and Docker.
+Projects: payments API, internal job scheduler."""
+
+
+def percentile(sorted_values, p: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(int(round(p / 100 * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+def summarize(values) -> dict:
+    values = sorted(values)
+    return {
+        "count": len(values),
+        "mean": sum(values) / len(values) if values else 0.0,
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "max": values[-1] if values else 0.0,
+    }
+
+
+class FlowError(Exception):
+    pass
+
+
+class Recorder:
+    """Latency and status of every request, grouped by endpoint template."""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(Counter)
+
+    async def request(self, client: httpx.AsyncClient, method: str, endpoint: str, url: str, **kwargs) -> httpx.Response:
+        name = f"{method} {endpoint}"
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.HTTPError as e:
+            self.latencies[name].append(time.perf_counter() - start)
+            self.statuses[name][type(e).__name__] += 1
+            raise FlowError(f"{name}: {type(e).__name__}") from e
+        self.latencies[name].append(time.perf_counter() - start)
+        self.statuses[name][str(response.status_code)] += 1
+        if response.status_code >= 400:
+            raise FlowError(
+                f"{name}: {response.status_code} {response.text[:200]}")
+        return response
+
+    def report(self, duration: float) -> dict:
+        endpoints = {}
+        for name, latencies in sorted(self.latencies.items()):
+            statuses = self.statuses[name]
+            errors = sum(count for status, count in statuses.items()
+                         if not status.isdigit() or int(status) >= 400)
+            endpoints[name] = {
+                **summarize(latencies),
+                "errors": errors,
+                "requests_per_second": len(latencies) / duration if duration else 0.0,
+                "status_codes": dict(statuses),
+            }
+        return endpoints
+
+
+async def monitor_loop_lag(interval: float, samples: list, stop: asyncio.Event):
+    """How late the loop wakes up a sleeper, i.e. how long callbacks block it."""
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        start = loop.time()
+        await asyncio.sleep(interval)
+        samples.append(max(loop.time() - start - interval, 0.0))
+
+
+def auth(token: str) -> dict:
+    return {"Authorization": f"Bearer {token}"}
+
+
+async def candidate_flow(client, recorder: Recorder, test_id: str, candidate: dict, args, outcomes: Counter, limit: asyncio.Semaphore):
+    async with limit:
+        try:
+            response = await recorder.request(client, "POST", "/auth/login", "/auth/login", json={
+                "email": candidate["email"], "password": candidate["password"]})
+            token = response.json()["token"]
+            uid = response.json()["user"]["uid"]
+
+            # the test can only start once the resume worker has parsed the resume
+            deadline = time.monotonic() + args.resume_timeout
+            while True:
+                response = await recorder.request(client, "GET", "/auth/candidate/profile",
+                                                  "/auth/candidate/profile", params={"uid": uid})
+                with contextlib.suppress(TypeError, ValueError):
+                    if json.loads(response.json().get("resume_text") or ""):
+                        break
+                if time.monotonic() > deadline:
+                    raise FlowError("resume was not parsed in time")
+                await asyncio.sleep(args.poll_interval)
+
+            response = await recorder.request(client, "POST", "/test/candidate/test/{test_id}/start",
+                                              f"/test/candidate/test/{test_id}/start", headers=auth(token))
+            state = response.json()["questions"]
+            level = state.get("current_level", 1)
+            questions = (state.get("progress") or {}).get(
+                str(level), {}).get("questions") or []
+            while True:
+                answers = [{"question_id": q["id"], "answer": q["options"][0]}
+                           for q in questions if q.get("options")]
+                response = await recorder.request(client, "POST", "/test/candidate/test/{test_id}/level/{level}/submit",
+                                                  f"/test/candidate/test/{test_id}/level/{level}/submit",
+                                                  headers=auth(token), json=answers)
+                # the submission is graded and the next level generated in the
+                # background, long-poll until it is ready
+                job = response.json()
+                while job["status"] not in ("ready", "failed"):
+                    response = await recorder.request(
+                        client, "GET", "/test/candidate/test/{test_id}/submission/{job_id}",
+                        f"/test/candidate/test/{test_id}/submission/{job['job_id']}",
+                        headers=auth(token), params={"wait": 10})
+                    job = response.json()
+                if job["status"] == "failed":
+                    raise FlowError(f"level {level} submission failed: {job.get('error')}")
+                if job["completed"]:
+                    break
+                level, questions = job["current_level"], job["questions"] or []
+            outcomes["ok"] += 1
+        except FlowError as e:
+            outcomes["failed"] += 1
+            print(f"candidate {candidate['email']}: {e}", file=sys.stderr)
+
+
+async def recruiter_flow(client, recorder: Recorder, index: int, args, run_id: str, outcomes: dict, limit: asyncio.Semaphore):
+    email = f"recruiter{index}-{run_id}@loadtest.local"
+    password = "load-test-password"
+    try:
+        await recorder.request(client, "POST", "/auth/recruiter/signup", "/auth/recruiter/signup", json={
+            "name": f"Recruiter {index}", "email": email, "password": password,
+            "company": "Load Test Inc", "phone": "0000000000"})
+        response = await recorder.request(client, "POST", "/auth/login", "/auth/login",
+                                          json={"email": email, "password": password})
+        token = response.json()["token"]
+        response = await recorder.request(client, "POST", "/test/create-test", "/test/create-test",
+                                          headers=auth(token), json={"title": f"Load test {index}", "jd_text": JD_TEXT})
+        test_id = response.json()["test_id"]
+        response = await recorder.request(client, "POST", "/test/{test_id}/add-candidates",
+                                          f"/test/{test_id}/add-candidates", headers=auth(token), json=[
+                                              {"email": f"candidate{index}-{i}-{run_id}@loadtest.local",
+                                               "resume_link": args.resume_link}
+                                              for i in range(args.candidates)])
+        outcomes["recruiters"]["ok"] += 1
+    except FlowError as e:
+        outcomes["recruiters"]["failed"] += 1
+        print(f"recruiter {index}: {e}", file=sys.stderr)
+        return
+    await asyncio.gather(*(
+        candidate_flow(client, recorder, test_id, candidate,
+                       args, outcomes["candidates"], limit)
+        for candidate in response.json()["candidates"]
+    ))
+
+
+def configure_in_process(args):
+    """Environment for the in-process app, has to be set before it is imported."""
+    os.makedirs(args.workdir, exist_ok=True)
+    os.chdir(args.workdir)
+    sys.path.insert(0, REPO_ROOT)
+    os.environ.update({
+        "DATABASE_URL": f"sqlite+aiosqlite:///{os.path.join(args.workdir, 'load_test.db')}",
+        "LLM_BACKEND": "synthetic",
+        "LLM_SYNTHETIC_LATENCY_SECONDS": str(args.llm_latency),
+        "LLM_SYNTHETIC_LATENCY_DISTRIBUTION": args.llm_latency_distribution,
+        "LLM_SYNTHETIC_ERROR_RATE": str(args.llm_error_rate),
+        "LLM_CACHE_ENABLED": "true" if args.llm_cache else "false",
+    })
+    if args.llm_tokens_per_minute is not None:
+        os.environ["LLM_TOKENS_PER_MINUTE"] = str(args.llm_tokens_per_minute)
+    if args.llm_requests_per_minute is not None:
+        os.environ["LLM_REQUESTS_PER_MINUTE"] = str(
+            args.llm_requests_per_minute)
+
+
+def install_resume_stand_in(args):
+    """Replace the resume download and vision call, the text is still parsed by the (synthetic) LLM."""
+    from app.core.llm_backends import sample_latency
+    from app.worker import resume_worker
+
+    async def download_resume_pdf(resume_link: str) -> bytes:
+        return b""
+
+    async def convert_pdf_to_base64(pdf_bytes: bytes) -> str:
+        return ""
+
+    async def parse_resume_with_openai(base64_img: str) -> str:
+        await asyncio.sleep(sample_latency(args.llm_latency, args.llm_latency_distribution))
+        return RESUME_TEXT
+
+    resume_worker.download_resume_pdf = download_resume_pdf
+    resume_worker.convert_pdf_to_base64 = convert_pdf_to_base64
+    resume_worker.parse_resume_with_openai = parse_resume_with_openai
+
+
+@contextlib.asynccontextmanager
+async def in_process_server(args):
+    import uvicorn
+    from app.db.database import async_create_all
+    from app.main import app
+
+    install_resume_stand_in(args)
+    await async_create_all()
+    server = uvicorn.Server(uvicorn.Config(
+        app, host="127.0.0.1", port=0, log_level="warning"))
+    task = asyncio.create_task(server.serve())
+    while not server.started:
+        if task.done():
+            task.result()
+        await asyncio.sleep(0.05)
+    port = server.servers[0].sockets[0].getsockname()[1]
+    try:
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        server.should_exit = True
+        await task
+
+
+def llm_report() -> dict:
+    """LLM and limiter counters of the in-process app."""
+    from app.core.config import llm_limiter
+    from app.core.llm_metrics import llm_calls, llm_call_duration
+
+    calls = Counter()
+    for labels, value in llm_calls._values.items():
+        calls[labels[-1]] += value
+    durations = defaultdict(lambda: [0, 0.0])
+    for labels in llm_call_duration._values:
+        snapshot = llm_call_duration.snapshot(
+            **dict(zip(llm_call_duration.labelnames, labels)))
+        node = f"{labels[0]}/{labels[1]}"
+        durations[node][0] += snapshot["count"]
+        durations[node][1] += snapshot["sum"]
+    return {
+        "calls": dict(calls),
+        "by_node": {node: {"calls": count, "mean_seconds": total / count if count else 0.0}
+                    for node, (count, total) in sorted(durations.items())},
+        "limiter": llm_limiter.stats(),
+    }
+
+
+def checkpoint_report() -> dict:
+    """Checkpointer latency of the in-process app, per operation."""
+    from app.core.checkpointer import checkpoint_operation_seconds
+
+    report = {}
+    for labels in checkpoint_operation_seconds._values:
+        labels = dict(zip(checkpoint_operation_seconds.labelnames, labels))
+        snapshot = checkpoint_operation_seconds.snapshot(**labels)
+        report[labels["operation"]] = {
+            "backend": labels["backend"], "count": snapshot["count"],
+            "mean_seconds": snapshot["sum"] / snapshot["count"] if snapshot["count"] else 0.0}
+    return report
+
+
+def git_commit() -> str:
+    with contextlib.suppress(Exception):
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    return None
+
+
+async def run(args) -> dict:
+    recorder = Recorder()
+    outcomes = {"recruiters": Counter(), "candidates": Counter()}
+    limit = asyncio.Semaphore(
+        args.concurrency or args.recruiters * args.candidates or 1)
+    lag_samples = []
+    stop = asyncio.Event()
+    run_id = uuid.uuid4().hex[:8]
+
+    async with contextlib.AsyncExitStack() as stack:
+        if args.url:
+            base_url = args.url
+        else:
+            # the app prints a lot, keep it out of the report
+            log = stack.enter_context(
+                open(os.path.join(args.workdir, "server.log"), "w"))
+            stack.enter_context(contextlib.redirect_stdout(log))
+            base_url = await stack.enter_async_context(in_process_server(args))
+        client = await stack.enter_async_context(httpx.AsyncClient(
+            base_url=base_url, timeout=args.timeout,
+            limits=httpx.Limits(max_connections=None, max_keepalive_connections=None)))
+        monitor = asyncio.create_task(
+            monitor_loop_lag(args.lag_interval, lag_samples, stop))
+        started = time.perf_counter()
+        await asyncio.gather(*(recruiter_flow(client, recorder, i, args, run_id, outcomes, limit)
+                               for i in range(args.recruiters)))
+        duration = time.perf_counter() - started
+        stop.set()
+        await monitor
+        llm = None if args.url else llm_report()
+        checkpoints = None if args.url else checkpoint_report()
+
+    total_requests = sum(len(v) for v in recorder.latencies.values())
+    return {
+        "run": {
+            "started_at": datetime.now(timezone.utc).isoformat(),
+            "git_commit": git_commit(),
+            "target": args.url or "in-process",
+            "args": {k: v for k, v in vars(args).items() if k not in ("output", "compare")},
+        },
+        "duration_seconds": duration,
+        "throughput": {
+            "requests": total_requests,
+            "requests_per_second": total_requests / duration if duration else 0.0,
+            "candidate_flows_per_second": outcomes["candidates"]["ok"] / duration if duration else 0.0,
+        },
+        "flows": {kind: dict(counts) for kind, counts in outcomes.items()},
+        "endpoints": recorder.report(duration),
+        "event_loop_lag": {"measured_on": "client" if args.url else "server",
+                           "interval": args.lag_interval, **summarize(lag_samples)},
+        "llm": llm,
+        "checkpoints": checkpoints,
+    }
+
+
+def print_report(result: dict, baseline: dict = None):
+    def delta(new, old):
+        if not old:
+            return ""
+        return f" ({(new - old) / old * 100:+.0f}%)"
+
+    print(f"{result['throughput']['requests']} requests in {result['duration_seconds']:.1f}s, "
+          f"{result['throughput']['requests_per_second']:.1f} req/s, flows {result['flows']}")
+    print(f"{'endpoint':<58} {'n':>5} {'err':>4} {'p50':>8} {'p95':>8} {'p99':>8}")
+    for name, stats in result["endpoints"].items():
+        old = (baseline or {}).get("endpoints", {}).get(name, {})
+        print(f"{name:<58} {stats['count']:>5} {stats['errors']:>4} {stats['p50']:>8.3f} "
+              f"{stats['p95']:>8.3f}{delta(stats['p95'], old.get('p95'))} {stats['p99']:>8.3f}")
+    lag = result["event_loop_lag"]
+    old = (baseline or {}).get("event_loop_lag", {})
+    print(f"event loop lag ({lag['measured_on']}): p50 {lag['p50'] * 1000:.1f}ms "
+          f"p99 {lag['p99'] * 1000:.1f}ms{delta(lag['p99'], old.get('p99'))} max {lag['max'] * 1000:.1f}ms")
+    for operation, stats in (result.get("checkpoints") or {}).items():
+        old = ((baseline or {}).get("checkpoints") or {}).get(operation, {})
+        print(f"checkpoint {operation} ({stats['backend']}): {stats['count']} calls, "
+              f"mean {stats['mean_seconds'] * 1000:.1f}ms{delta(stats['mean_seconds'], old.get('mean_seconds'))}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Load test the assessment lifecycle over HTTP")
+    parser.add_argument("--url", help="target a running server instead of booting the app in process")
+    parser.add_argument("--recruiters", type=int, default=2,
+                        help="recruiters, one test each")
+    parser.add_argument("--candidates", type=int, default=5,
+                        help="candidates per test")
+    parser.add_argument("--concurrency", type=int, default=0,
+                        help="max concurrent candidate flows, 0 runs all at once")
+    parser.add_argument("--llm-latency", type=float, default=1.0,
+                        help="mean stand-in LLM latency in seconds")
+    parser.add_argument("--llm-latency-distribution", default="lognormal",
+                        choices=["fixed", "uniform", "exponential", "lognormal"])
+    parser.add_argument("--llm-error-rate", type=float, default=0.0,
+                        help="share of stand-in LLM calls that fail")
+    parser.add_argument("--llm-cache", action="store_true",
+                        help="keep the LLM response cache on")
+    parser.add_argument("--llm-tokens-per-minute", type=int,
+                        help="override LLM_TOKENS_PER_MINUTE, 0 disables it")
+    parser.add_argument("--llm-requests-per-minute", type=int,
+                        help="override LLM_REQUESTS_PER_MINUTE, 0 disables it")
+    parser.add_argument("--resume-link", default="https://drive.google.com/file/d/load-test/view",
+                        help="resume link sent with every candidate")
+    parser.add_argument("--resume-timeout", type=float, default=120,
+                        help="seconds a candidate waits for its resume to be parsed")
+    parser.add_argument("--poll-interval", type=float, default=0.5)
+    parser.add_argument("--timeout", type=float, default=300,
+                        help="per request timeout in seconds")
+    parser.add_argument("--lag-interval", type=float, default=0.01,
+                        help="event loop lag sampling interval in seconds")
+    parser.add_argument("--workdir", help="database, checkpoints and server log of the in-process app "
+                        "(default: a new temporary directory)")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="baseline results JSON to compare against")
+    args = parser.parse_args()
+    # the in-process app runs from the workdir
+    args.output = args.output and os.path.abspath(args.output)
+    args.compare = args.compare and os.path.abspath(args.compare)
+
+    if not args.url:
+        args.workdir = os.path.abspath(
+            args.workdir or tempfile.mkdtemp(prefix="load_test_"))
+        configure_in_process(args)
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+    result = asyncio.run(run(args))
+    print_report(result, baseline)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2, default=str)
+        print(f"results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,354 @@
+"""
+Microbenchmarks for the pure-Python hot paths of the assessment graphs:
+progress merging, the question list reducer, question construction in the
+validators, UserState initialisation and checkpoint serialisation.
+
+    python benchmarks/microbench.py --save     # record the baseline
+    python benchmarks/microbench.py            # compare, exit 1 on regressions
+
+Every case runs at 5 to 50 skills with 5 or 10 questions per skill, the
+questions carrying the same metadata the validators attach. Time is the
+median over several repeats; peak allocation is measured separately with
+tracemalloc, so tracing doesn't skew the timings. Regressions are judged
+on the fastest repeat, scaled by a fixed reference workload timed next to
+each case so a baseline from another machine stays usable. Shared runners
+are noisy, raise --time-tolerance there.
+"""
+import argparse
+import gc
+import json
+import operator
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import time
+import tracemalloc
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+# importing the app builds the chat model, which must not need a key here
+os.environ.setdefault("LLM_BACKEND", "synthetic")
+
+from langgraph.checkpoint.base import empty_checkpoint  # noqa: E402
+from langgraph.checkpoint.sqlite import SqliteSaver  # noqa: E402
+
+from app.core.checkpoint_serde import CompactSerializer  # noqa: E402
+from app.core.llm_backends import synthetic_mcq, synthetic_msq, synthetic_scenario  # noqa: E402
+from app.langgraph.models import (JobDescription, LevelProgress, Resume,  # noqa: E402
+                                  UserState, context_id, merge_progress_dicts, userstate_initializer)
+from app.langgraph.nodes.level1 import build_lvl1_question  # noqa: E402
+from app.langgraph.nodes.level2 import build_lvl2_question, lvl2_context  # noqa: E402
+from app.langgraph.nodes.level3 import build_lvl3_question, lvl3_context  # noqa: E402
+from app.langgraph.other.question_repair import validate_question_item  # noqa: E402
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(
+    os.path.abspath(__file__)), "microbench_baseline.json")
+SIZES = [(5, 5), (5, 10), (20, 5), (20, 10), (50, 5), (50, 10)]
+QUICK_SIZES = [(5, 5), (50, 10)]
+
+PROJECTS = ["Customer churn prediction", "Recommendation engine"]
+EXPERIENCE = ["2 years as Data Analyst at TechCorp"]
+RESPONSIBILITIES = ["Design backend services",
+                    "Review code", "Own the data model"]
+QUALIFICATIONS = ["BSc in Computer Science", "3+ years of experience"]
+CONTEXTS = {
+    2: lvl2_context(PROJECTS, EXPERIENCE),
+    3: lvl3_context("Backend Engineer", "TechCorp", RESPONSIBILITIES, QUALIFICATIONS),
+}
+CONTEXT_IDS = {level: context_id(block) for level, block in CONTEXTS.items()}
+
+
+class Fixture:
+    """Realistic inputs for one size, built outside the timed code."""
+
+    def __init__(self, skills: int, per_skill: int):
+        rng = random.Random(skills * 100 + per_skill)
+        self.skills = [f"Skill {i}" for i in range(skills)]
+        self.raw = {
+            1: {s: [synthetic_mcq(rng, s, i) for i in range(per_skill)] for s in self.skills},
+            2: {s: [synthetic_msq(rng, s, i) for i in range(per_skill)] for s in self.skills},
+            3: {s: [synthetic_scenario(rng, s, i) for i in range(per_skill)] for s in self.skills},
+        }
+        self.questions = {level: {s: build_questions(level, s, items) for s, items in by_skill.items()}
+                          for level, by_skill in self.raw.items()}
+        self.state = userstate_initializer()
+        self.state.job_description = JobDescription(
+            title="Backend Engineer", company="TechCorp", required_skills=self.skills,
+            responsibilities=RESPONSIBILITIES, qualifications=QUALIFICATIONS)
+        self.state.resume = Resume(
+            education=QUALIFICATIONS[:1], experience=EXPERIENCE, skills=self.skills,
+            projects=PROJECTS, certifications=[], summary="Backend engineer.")
+        self.state.progress = {
+            level: LevelProgress(level=level, questions=[q for qs in by_skill.values() for q in qs],
+                                 answers={}, score=None)
+            for level, by_skill in self.questions.items()
+        }
+        self.state.shared_context = {
+            CONTEXT_IDS[level]: block for level, block in CONTEXTS.items()}
+        self.state_dict = self.state.model_dump()
+        self.saver = SqliteSaver(sqlite3.connect(
+            ":memory:", check_same_thread=False), serde=CompactSerializer())
+        self.saver.setup()
+        self.checkpoint = empty_checkpoint()
+        self.checkpoint["channel_values"] = dict(self.state)
+        self.serialized = self.saver.serde.dumps_typed(self.state)
+
+
+def build_questions(level: int, skill: str, items):
+    questions = []
+    for item in items:
+        item = validate_question_item(item, level)
+        if item is None:
+            continue
+        if level == 1:
+            questions.append(build_lvl1_question(skill, item))
+        elif level == 2:
+            questions.append(build_lvl2_question(
+                skill, item, CONTEXT_IDS[2]))
+        else:
+            questions.append(build_lvl3_question(
+                skill, item, CONTEXT_IDS[3]))
+    return questions
+
+
+# -- cases ---------------------------------------------------------------
+# each returns a zero-argument callable doing one operation on the fixture
+
+def merge_fan_in(f: Fixture):
+    # every skill worker's update folded into the state, as the graph does
+    updates = [{1: LevelProgress(level=1, questions=qs, answers={})}
+               for qs in f.questions[1].values()]
+
+    def run():
+        progress = {}
+        for update in updates:
+            progress = merge_progress_dicts(progress, update)
+    return run
+
+
+def merge_resubmit(f: Fixture):
+    # a subgraph handing back the whole progress, every question a duplicate
+    def run():
+        merge_progress_dicts(f.state.progress, f.state.progress)
+    return run
+
+
+def level_progress_reducer(f: Fixture):
+    # the operator.add reducer on LevelProgress.questions, one batch per skill
+    batches = list(f.questions[2].values())
+
+    def run():
+        progress = LevelProgress(level=2, questions=[], answers={})
+        for batch in batches:
+            progress = LevelProgress(level=2, questions=operator.add(
+                progress.questions, batch), answers=progress.answers)
+    return run
+
+
+def question_construction(level: int):
+    def case(f: Fixture):
+        raw = f.raw[level]
+
+        def run():
+            for skill, items in raw.items():
+                build_questions(level, skill, items)
+        return run
+    return case
+
+
+def userstate_default(f: Fixture):
+    return userstate_initializer
+
+
+def userstate_from_dict(f: Fixture):
+    def run():
+        userstate_initializer(f.state_dict)
+    return run
+
+
+def serde_dumps(f: Fixture):
+    def run():
+        f.saver.serde.dumps_typed(f.state)
+    return run
+
+
+def serde_loads(f: Fixture):
+    def run():
+        f.saver.serde.loads_typed(f.serialized)
+    return run
+
+
+def saver_put(f: Fixture):
+    config = {"configurable": {"thread_id": "bench", "checkpoint_ns": ""}}
+    versions = {name: 1 for name in f.checkpoint["channel_values"]}
+
+    def run():
+        f.saver.put(config, f.checkpoint, {
+                    "source": "loop", "step": 1, "writes": None}, versions)
+    return run
+
+
+CASES = {
+    "merge_progress_dicts/fan_in": merge_fan_in,
+    "merge_progress_dicts/resubmit": merge_resubmit,
+    "level_progress/operator_add": level_progress_reducer,
+    "questions/level1": question_construction(1),
+    "questions/level2": question_construction(2),
+    "questions/level3": question_construction(3),
+    "userstate_initializer/default": userstate_default,
+    "userstate_initializer/from_dict": userstate_from_dict,
+    "sqlite_serde/dumps": serde_dumps,
+    "sqlite_serde/loads": serde_loads,
+    "sqlite_saver/put": saver_put,
+}
+
+
+def time_call(fn, min_time: float, repeats: int) -> dict:
+    # calibrate the loop count so one repeat takes at least min_time
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+        loops *= 2 if elapsed == 0 else max(2, int(min_time / elapsed) + 1)
+    timings = [elapsed / loops]
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeats - 1):
+            start = time.perf_counter()
+            for _ in range(loops):
+                fn()
+            timings.append((time.perf_counter() - start) / loops)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    return {"median": statistics.median(timings), "min": min(timings), "loops": loops}
+
+
+def reference_workload():
+    # fixed mix of dict, list and str work; its speed stands in for the
+    # machine's, so baselines survive a slower or busier runner
+    table = {}
+    for i in range(2000):
+        table[str(i)] = [i] * 3
+    sorted(table.items(), reverse=True)
+
+
+def peak_allocation(fn) -> int:
+    fn()  # warm caches so they don't count as the operation's allocations
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        current = tracemalloc.get_traced_memory()[0]
+        fn()
+        return tracemalloc.get_traced_memory()[1] - current
+    finally:
+        tracemalloc.stop()
+
+
+def run_benchmarks(sizes, only: str, min_time: float, repeats: int) -> dict:
+    results = {}
+    for skills, per_skill in sizes:
+        fixture = Fixture(skills, per_skill)
+        for name, case in CASES.items():
+            if only and only not in name:
+                continue
+            key = f"{name}[{skills}x{per_skill}]"
+            fn = case(fixture)
+            timing = time_call(fn, min_time, repeats)
+            # measured right next to the case, the machine's speed drifts
+            reference = time_call(
+                reference_workload, min_time, repeats)["min"]
+            results[key] = {**timing, "reference": reference,
+                            "peak_bytes": peak_allocation(fn)}
+            print(f"  {key:<48} {format_seconds(results[key]['median']):>10} "
+                  f"{results[key]['peak_bytes'] / 1024:>10.1f} KiB", flush=True)
+    return results
+
+
+def format_seconds(seconds: float) -> str:
+    if seconds < 1e-3:
+        return f"{seconds * 1e6:.1f}us"
+    if seconds < 1:
+        return f"{seconds * 1e3:.2f}ms"
+    return f"{seconds:.2f}s"
+
+
+def compare(results: dict, baseline: dict, time_tolerance: float, memory_tolerance: float):
+    """
+    Cases slower or allocating more than the baseline allows, as messages.
+    Times are scaled by the reference workload measured with each case.
+    """
+    regressions = []
+    for key, result in results.items():
+        base = baseline.get(key)
+        if base is None:
+            continue
+        # the fastest repeat is the least disturbed by the rest of the machine;
+        # small absolute floors keep timer and allocator noise out
+        expected = base["min"] * result["reference"] / base["reference"]
+        if result["min"] > expected * (1 + time_tolerance) and result["min"] - expected > 2e-6:
+            regressions.append(f"{key}: {format_seconds(result['min'])} vs "
+                               f"{format_seconds(expected)} ({(result['min'] / expected - 1) * 100:+.0f}%)")
+        if result["peak_bytes"] > base["peak_bytes"] * (1 + memory_tolerance) and result["peak_bytes"] - base["peak_bytes"] > 1024:
+            regressions.append(f"{key}: peak {result['peak_bytes'] / 1024:.1f} KiB vs "
+                               f"{base['peak_bytes'] / 1024:.1f} KiB")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save", action="store_true",
+                        help="write the results as the new baseline, replacing it")
+    parser.add_argument("--quick", action="store_true",
+                        help="only the smallest and largest size")
+    parser.add_argument("--filter", default="",
+                        help="only cases whose name contains this")
+    parser.add_argument("--min-time", type=float, default=0.05,
+                        help="seconds per timing repeat")
+    parser.add_argument("--repeats", type=int, default=7)
+    parser.add_argument("--time-tolerance", type=float, default=0.25,
+                        help="allowed slowdown before a case counts as a regression")
+    parser.add_argument("--memory-tolerance", type=float, default=0.10,
+                        help="allowed growth of the peak allocation")
+    parser.add_argument("--output", help="also write the results to this JSON file")
+    args = parser.parse_args()
+
+    print(f"{'case':<50} {'median':>10} {'peak':>14}")
+    results = run_benchmarks(QUICK_SIZES if args.quick else SIZES,
+                             args.filter, args.min_time, args.repeats)
+    document = {"python": sys.version.split()[0], "results": results}
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(document, f, indent=2)
+
+    if args.save:
+        with open(args.baseline, "w") as f:
+            json.dump(document, f, indent=2, sort_keys=True)
+        print(f"baseline written to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"no baseline at {args.baseline}, run with --save to create one")
+        return
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare(
+        results, baseline["results"], args.time_tolerance, args.memory_tolerance)
+    if regressions:
+        print(f"{len(regressions)} regression(s) against {args.baseline}:")
+        for regression in regressions:
+            print(f"  {regression}")
+        sys.exit(1)
+    print(f"no regressions against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
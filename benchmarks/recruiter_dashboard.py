@@ -0,0 +1,178 @@
+"""
+Latency of GET /test/recruiter/tests: the per-test count queries it used to
+run against the grouped, keyset paginated query of app/db/queries.py.
+
+    python benchmarks/recruiter_dashboard.py
+    python benchmarks/recruiter_dashboard.py --tests 1000 --candidates 10000 --output dashboard.json
+    python benchmarks/recruiter_dashboard.py --database-url postgresql+asyncpg://...
+
+One recruiter owns --tests tests, each with a parsed JD of about 2 KB.
+--candidates candidates each have an assessment for a random test, with a
+random status. Against a fresh SQLite file in --workdir by default; with
+--database-url the tables are created in that database and the rows are
+left there.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+STATUSES = ["not_started", "in_progress", "completed"]
+BATCH = 5000
+
+
+def jd_text(i: int) -> str:
+    return json.dumps({
+        "title": f"Backend Engineer {i}", "company": "Acme",
+        "required_skills": ["Python", "FastAPI", "PostgreSQL", "Docker", "AWS"],
+        "responsibilities": [f"Build and run backend service {n} with a focus on reliability" for n in range(12)],
+        "qualifications": [f"{n}+ years of backend development in production" for n in range(12)],
+        "description": "x" * 400,
+    })
+
+
+async def seed(session_factory, tests: int, candidates: int, seed: int) -> str:
+    from sqlalchemy import insert
+    from app.db.models import Candidate, CandidateAssessment, Recruiter, Test, User
+
+    rng = random.Random(seed)
+    recruiter_uid = f"recruiter-{uuid.uuid4()}"
+    now = datetime.utcnow()
+    async with session_factory() as session:
+        await session.execute(insert(User), [{
+            "uid": recruiter_uid, "email": f"{recruiter_uid}@bench.local",
+            "password_hash": "-", "role": "recruiter"}])
+        await session.execute(insert(Recruiter), [{"uid": recruiter_uid, "name": "Bench"}])
+        test_ids = [str(uuid.uuid4()) for _ in range(tests)]
+        await session.execute(insert(Test), [{
+            "test_id": test_id, "recruiter_uid": recruiter_uid, "title": f"Test {i}", "jd_text": jd_text(i),
+            "created_at": now - timedelta(minutes=i), "updated_at": now,
+            "scheduled_start": now, "scheduled_end": now + timedelta(hours=1),
+        } for i, test_id in enumerate(test_ids)])
+        for start in range(0, candidates, BATCH):
+            uids = [f"candidate-{uuid.uuid4()}" for _ in range(min(BATCH, candidates - start))]
+            await session.execute(insert(User), [{
+                "uid": uid, "email": f"{uid}@bench.local", "password_hash": "-", "role": "candidate"} for uid in uids])
+            await session.execute(insert(Candidate), [{"uid": uid} for uid in uids])
+            await session.execute(insert(CandidateAssessment), [{
+                "assessment_id": str(uuid.uuid4()), "candidate_uid": uid, "test_id": rng.choice(test_ids),
+                "status": rng.choice(STATUSES)} for uid in uids])
+        await session.commit()
+    return recruiter_uid
+
+
+async def legacy_listing(session, recruiter_uid: str) -> list:
+    """The listing as it was: every test, then every assessment row of each test."""
+    from sqlalchemy import select
+    from app.db.models import CandidateAssessment, Test
+
+    tests = (await session.execute(select(Test).filter_by(recruiter_uid=recruiter_uid))).scalars().all()
+    result = []
+    for t in tests:
+        total_candidates = len((await session.execute(
+            select(CandidateAssessment).filter_by(test_id=t.test_id))).scalars().all())
+        duration = None
+        if t.scheduled_start and t.scheduled_end:
+            duration = (t.scheduled_end - t.scheduled_start).total_seconds() // 60
+        result.append({
+            "test_id": t.test_id, "title": t.title, "jd_text": t.jd_text, "created_at": t.created_at,
+            "updated_at": t.updated_at, "scheduled_end": t.scheduled_end, "scheduled_start": t.scheduled_start,
+            "total_candidates": total_candidates, "duration_minutes": duration,
+        })
+    return result
+
+
+def response_bytes(body) -> int:
+    from fastapi.encoders import jsonable_encoder
+    return len(json.dumps(jsonable_encoder(body)))
+
+
+async def timed(repeat: int, fn):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = await fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+async def run(args) -> dict:
+    from app.db.database import AsyncSessionLocal, async_create_all, engine
+    from app.db.queries import list_recruiter_tests_page
+
+    await async_create_all()
+    start = time.perf_counter()
+    recruiter_uid = await seed(AsyncSessionLocal, args.tests, args.candidates, args.seed)
+    print(f"seeded {args.tests} tests and {args.candidates} candidates in {time.perf_counter() - start:.1f}s")
+
+    results = {}
+    async with AsyncSessionLocal() as session:
+        seconds, legacy = await timed(args.repeat, lambda: legacy_listing(session, recruiter_uid))
+        results["legacy, all tests"] = {"seconds": seconds, "bytes": response_bytes(legacy)}
+
+        seconds, first = await timed(args.repeat, lambda: list_recruiter_tests_page(
+            session, recruiter_uid, limit=args.page_size))
+        results["first page"] = {"seconds": seconds, "bytes": response_bytes(first)}
+
+        async def walk():
+            pages, cursor, counts = [], None, {}
+            while True:
+                page = await list_recruiter_tests_page(session, recruiter_uid, limit=args.page_size, cursor=cursor)
+                pages.append(page)
+                counts.update({t["test_id"]: t["total_candidates"] for t in page["tests"]})
+                cursor = page["next_cursor"]
+                if cursor is None:
+                    return pages, counts
+        seconds, (pages, counts) = await timed(args.repeat, walk)
+        results[f"all {len(pages)} pages"] = {"seconds": seconds, "bytes": sum(map(response_bytes, pages))}
+
+        seconds, last = await timed(args.repeat, lambda: list_recruiter_tests_page(
+            session, recruiter_uid, limit=args.page_size, cursor=pages[-2]["next_cursor"] if len(pages) > 1 else None))
+        results["last page"] = {"seconds": seconds, "bytes": response_bytes(last)}
+
+    assert counts == {t["test_id"]: t["total_candidates"] for t in legacy}, "counts differ from the legacy listing"
+    await engine.dispose()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--tests", type=int, default=1000)
+    parser.add_argument("--candidates", type=int, default=10000)
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=3, help="best of this many runs")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--database-url", help="SQLAlchemy async URL, default a fresh SQLite file in --workdir")
+    parser.add_argument("--workdir", default=os.path.join(tempfile.gettempdir(), "ai_quiz_dashboard"))
+    parser.add_argument("--output", help="also write the results to this JSON file")
+    args = parser.parse_args()
+
+    # the app reads its configuration (and opens checkpoints.sqlite3) on import
+    os.makedirs(args.workdir, exist_ok=True)
+    os.chdir(args.workdir)
+    sys.path.insert(0, REPO_ROOT)
+    database = os.path.join(args.workdir, "dashboard.db")
+    if not args.database_url and os.path.exists(database):
+        os.remove(database)
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite+aiosqlite:///{database}"
+    os.environ.setdefault("LLM_BACKEND", "synthetic")
+
+    results = asyncio.run(run(args))
+    print(f"{'listing':<18} {'time':>10} {'response':>12}")
+    for name, result in results.items():
+        print(f"{name:<18} {result['seconds'] * 1000:>8.1f}ms {result['bytes'] / 1024:>8.1f} KiB")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -50,7 +50,7 @@ if __name__ == "__main__":
     )
 
     # # Now you can run the graph
-    result = level1_graph.invoke(user_state)
+    result = asyncio.run(level1_graph.ainvoke(user_state))
     print(result)
 
     # Run the async function with asyncio